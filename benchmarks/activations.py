@@ -0,0 +1,41 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero.functions as F
+from dezero import Variable
+
+
+ACTIVATIONS = (F.sigmoid_simple, F.sigmoid, F.tanh, F.relu, F.leaky_relu, F.elu, F.gelu)
+
+
+def measure(activation, x, gy, iters):
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iters):
+            h = Variable(x)
+            y = activation(h)
+            y.grad = gy
+            y.backward()
+        best = min(best, (time.perf_counter() - start) / iters)
+    return best
+
+
+def main():
+    np.random.seed(0)
+    for batch_size, hidden in ((64, 100), (256, 1024), (1024, 4096)):
+        x = np.random.randn(batch_size, hidden).astype(np.float32)
+        gy = Variable(np.random.randn(batch_size, hidden).astype(np.float32))
+        iters = max(5, 2000000 // (batch_size * hidden))
+        print(f'layer {batch_size}x{hidden} (float32), forward+backward')
+        for activation in ACTIVATIONS:
+            t = measure(activation, x, gy, iters)
+            print(f'  {activation.__name__:15s} {t * 1e3:9.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero.functions as F
+from dezero import Variable
+
+
+# y = sin(x0) + sin(x1) + ... + sin(xn): every Sin stays pending in the
+# backward queue until the whole Add chain has been processed.
+def unrolled_sum(depth):
+    xs = [Variable(np.array(float(i))) for i in range(depth)]
+    y = F.sin(xs[0])
+    for x in xs[1:]:
+        y = y + F.sin(x)
+    return y
+
+
+# y = tanh(tanh(...tanh(x)...)): one pending Function at a time.
+def chain(depth):
+    y = Variable(np.array(0.5))
+    for _ in range(depth):
+        y = F.tanh(y)
+    return y
+
+
+def measure(build, depth, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        y = build(depth)
+        start = time.perf_counter()
+        y.backward()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    for build in (unrolled_sum, chain):
+        print(build.__name__)
+        for depth in (1000, 2000, 4000, 8000, 16000, 32000):
+            t = measure(build, depth)
+            print(f'  depth={depth:6d}  backward={t * 1e3:8.2f} ms  '
+                  f'per node={t / depth * 1e6:6.2f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable, Parameter
+
+
+def measure(fn, iters=10):
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iters):
+            fn()
+        best = min(best, (time.perf_counter() - start) / iters)
+    return best
+
+
+def main():
+    np.random.seed(0)
+    B, S, k, m = 64, 128, 256, 256
+    x = np.random.randn(B, S, k).astype(np.float32)
+    W = Parameter(np.random.randn(k, m).astype(np.float32))
+    Ws = Parameter(np.random.randn(B, k, m).astype(np.float32))
+
+    def shared_loop():
+        W.cleargrad()
+        v = Variable(x)
+        ys = [F.matmul(v[i], W) for i in range(B)]
+        F.sum(ys[0]).backward()
+        for y in ys[1:]:
+            F.sum(y).backward()
+
+    def shared_batched():
+        W.cleargrad()
+        F.sum(F.matmul(Variable(x), W)).backward()
+
+    def per_example_loop():
+        Ws.cleargrad()
+        v = Variable(x)
+        for i in range(B):
+            F.sum(F.matmul(v[i], Ws[i])).backward()
+
+    def per_example_batched():
+        Ws.cleargrad()
+        F.sum(F.matmul(Variable(x), Ws)).backward()
+
+    def per_example_vmap():
+        Ws.cleargrad()
+        F.sum(dezero.vmap(F.matmul)(x, Ws)).backward()
+
+    print(f'x=({B}, {S}, {k}) float32, forward + backward')
+    print(f'  W=({k}, {m})     loop over sequences {measure(shared_loop) * 1e3:8.2f} ms'
+          f'  one matmul {measure(shared_batched) * 1e3:8.2f} ms')
+    print(f'  W=({B}, {k}, {m}) loop over sequences {measure(per_example_loop) * 1e3:8.2f} ms'
+          f'  one matmul {measure(per_example_batched) * 1e3:8.2f} ms'
+          f'  vmap {measure(per_example_vmap) * 1e3:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
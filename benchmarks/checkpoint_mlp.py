@@ -0,0 +1,46 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import tracemalloc
+import numpy as np
+import dezero.functions as F
+from dezero.models import MLP
+
+
+def run(x, t, checkpoint, iters=5):
+    np.random.seed(0)
+    model = MLP((256,) * 8 + (10,), activation=F.tanh, checkpoint=checkpoint)
+    model(x)  # initialise the weights outside of the measurement
+
+    tracemalloc.start()
+    model.cleargrads()
+    loss = F.mean_squared_error(model(x), t)
+    loss.backward()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best = float('inf')
+    for _ in range(iters):
+        start = time.perf_counter()
+        model.cleargrads()
+        loss = F.mean_squared_error(model(x), t)
+        loss.backward()
+        best = min(best, time.perf_counter() - start)
+    return peak, best
+
+
+def main():
+    np.random.seed(0)
+    x = np.random.rand(8192, 256).astype(np.float32)
+    t = np.random.rand(8192, 10).astype(np.float32)
+    for checkpoint in (None, 1, 3, 9):
+        peak, elapsed = run(x, t, checkpoint)
+        print(f'checkpoint={checkpoint!s:4}  peak={peak / 2 ** 20:7.2f} MiB  '
+              f'forward+backward={elapsed * 1e3:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero.functions as F
+import dezero.layers as L
+from dezero import Variable, no_grad
+from dezero.functions_conv import Conv2dPlan, get_conv_plan, im2col_array, col2im_array
+
+
+def measure(fn, iters=3):
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(iters):
+            fn()
+        best = min(best, (time.perf_counter() - start) / iters)
+    return best
+
+
+def col2im_add_at(col, plan):
+    """col2im with np.add.at on gather indices, for comparison."""
+    N, C, OH, OW, KH, KW = col.shape
+    _, _, Hp, Wp = plan.padded_shape
+    SH, SW = plan.stride
+    rows = (np.arange(OH) * SH)[:, None, None, None] + np.arange(KH)[None, None, :, None]
+    cols = (np.arange(OW) * SW)[None, :, None, None] + np.arange(KW)[None, None, None, :]
+    img = np.zeros(plan.padded_shape, col.dtype).reshape(N, C, -1)
+    np.add.at(img, (slice(None), slice(None), rows * Wp + cols), col)
+    (PH, PW), (_, _, H, W) = plan.pad, plan.x_shape
+    return img.reshape(plan.padded_shape)[:, :, PH:PH + H, PW:PW + W]
+
+
+def main():
+    np.random.seed(0)
+    N = 128
+    x = np.random.randn(N, 3, 32, 32).astype(np.float32)
+    print(f'CIFAR-sized batch x={x.shape} float32')
+
+    layers = [
+        ('conv 3->32 k3 p1', L.Conv2d(32, 3, pad=1), x),
+        ('conv 32->64 k3 p1', L.Conv2d(64, 3, pad=1),
+         np.random.randn(N, 32, 32, 32).astype(np.float32)),
+        ('conv 64->128 k3 s2 p1', L.Conv2d(128, 3, stride=2, pad=1),
+         np.random.randn(N, 64, 16, 16).astype(np.float32)),
+    ]
+    for name, layer, data in layers:
+        with no_grad():
+            gy = Variable(np.random.randn(*layer(data).shape).astype(np.float32))
+
+        def forward():
+            with no_grad():
+                layer(data)
+
+        def train_step():
+            layer.cleargrads()
+            y = layer(Variable(data))
+            y.grad = gy
+            y.backward()
+
+        fwd, step = measure(forward), measure(train_step)
+        print(f'  {name:22s} forward {fwd * 1e3:8.1f} ms ({N / fwd:7.0f} img/s)  '
+              f'forward+backward {step * 1e3:8.1f} ms ({N / step:7.0f} img/s)')
+
+    h = np.random.randn(N, 64, 32, 32).astype(np.float32)
+    for name, f in (('max pooling 2x2', F.pooling), ('average pooling 2x2', F.average_pooling)):
+        gy = Variable(np.random.randn(N, 64, 16, 16).astype(np.float32))
+
+        def pool_step():
+            y = f(Variable(h), 2, 2)
+            y.grad = gy
+            y.backward()
+        t = measure(pool_step)
+        print(f'  {name:22s} forward+backward {t * 1e3:8.1f} ms ({N / t:7.0f} img/s)')
+
+    plan = get_conv_plan(h[:16].shape, 3, 1, 1)
+    col = np.ascontiguousarray(im2col_array(h[:16], plan))
+    assert np.allclose(col2im_add_at(col, plan), col2im_array(col, plan), atol=1e-4)
+    t_at = measure(lambda: col2im_add_at(col, plan), iters=1)
+    t_strided = measure(lambda: col2im_array(col, plan))
+    print(f'col2im x=(16, 64, 32, 32) k3 p1: np.add.at {t_at * 1e3:8.1f} ms  '
+          f'strided adds {t_strided * 1e3:8.1f} ms')
+
+    t_build = measure(lambda: Conv2dPlan(h.shape, (3, 3), (1, 1), (1, 1)), iters=1000)
+    t_cached = measure(lambda: get_conv_plan(h.shape, 3, 1, 1), iters=1000)
+    print(f'plan: build {t_build * 1e6:6.1f} us  cached {t_cached * 1e6:6.1f} us')
+
+
+if __name__ == '__main__':
+    main()
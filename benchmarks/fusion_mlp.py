@@ -0,0 +1,52 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import tracemalloc
+import numpy as np
+import dezero.functions as F
+from dezero.models import MLP
+from dezero.static import capture
+
+
+def run(x, t, fuse, iters=200):
+    np.random.seed(0)
+    model = MLP((256, 256, 10), activation=F.sigmoid_simple)
+
+    tracemalloc.start()
+    step = capture(lambda x, t: F.mean_squared_error(model(x), t), fuse=fuse)
+    model.cleargrads()
+    step(x, t)
+    held = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.reset_peak()
+    model.cleargrads()
+    step(x, t)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(iters):
+        model.cleargrads()
+        loss = step(x, t)
+    elapsed = (time.perf_counter() - start) / iters
+    return elapsed, held, peak, float(loss.data)
+
+
+def main():
+    np.random.seed(0)
+    for batch_size in (64, 512, 2048):
+        x = np.random.rand(batch_size, 32)
+        t = np.random.rand(batch_size, 10)
+        print(f'batch={batch_size}')
+        for fuse in (False, True):
+            elapsed, held, peak, loss = run(x, t, fuse)
+            print(f'  fuse={fuse!s:5}  step={elapsed * 1e3:7.2f} ms  '
+                  f'graph held={held / 2 ** 20:6.2f} MiB  '
+                  f'step peak={peak / 2 ** 20:6.2f} MiB  loss={loss:.6f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+from dezero.functions import scatter_add_array
+
+
+def add_at(gy, slices, shape, dtype=None):
+    gx = np.zeros(shape)
+    np.add.at(gx, slices, gy)
+    return gx
+
+
+def measure(scatter, gy, slices, shape, iters=5):
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(iters):
+            scatter(gy, slices, shape, gy.dtype)
+        best = min(best, (time.perf_counter() - start) / iters)
+    return best
+
+
+def main():
+    np.random.seed(0)
+    N, C, V, D = 4096, 1000, 10000, 256
+    t = np.random.randint(0, C, N)
+    tokens = np.random.randint(0, V, 16384)
+    x_nc = np.random.rand(N, C).astype(np.float32)
+    x_vd = np.random.rand(V, D).astype(np.float32)
+    x_v = np.random.rand(V).astype(np.float32)
+    cases = [
+        ('slice x[:, 10:500]', x_nc, (slice(None), slice(10, 500))),
+        ('mask x[x > 0.5]', x_nc, x_nc > 0.5),
+        ('labels x[arange(N), t]', x_nc, (np.arange(N), t)),
+        ('rows x[perm]', x_vd, np.random.permutation(V)),
+        ('embedding x[tokens]', x_vd, tokens),
+        ('1-D x[tokens]', x_v, tokens),
+        ('columns x[:, t]', x_nc, (slice(None), t)),
+    ]
+    for name, x, slices in cases:
+        gy = np.random.rand(*x[slices].shape).astype(np.float32)
+        ref = add_at(gy, slices, x.shape)
+        gx = scatter_add_array(gy, slices, x.shape)
+        assert gx.dtype == x.dtype and np.allclose(gx, ref, rtol=1e-4, atol=1e-4)
+        before = measure(add_at, gy, slices, x.shape)
+        after = measure(scatter_add_array, gy, slices, x.shape)
+        print(f'{name:24s} np.add.at {before * 1e3:8.3f} ms  '
+              f'scatter_add_array {after * 1e3:8.3f} ms  x{before / after:6.1f}')
+
+
+if __name__ == '__main__':
+    main()
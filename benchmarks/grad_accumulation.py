@@ -0,0 +1,55 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero.functions as F
+from dezero import Variable, Parameter
+
+
+# One weight shared by `fan_out` uses, like an unrolled RNN or a tied
+# embedding: W receives fan_out gradient contributions.
+def shared_weight(fan_out, size):
+    W = Parameter(np.random.rand(size, size))
+    x = Variable(np.random.rand(size, size), requires_grad=False)
+    y = 0
+    for _ in range(fan_out):
+        y = y + F.sum(W * x)
+    return y
+
+
+# One intermediate read by `fan_out` consumers: h receives fan_out
+# contributions before its creator can run.
+def wide_fan_out(fan_out, size):
+    x = Parameter(np.random.rand(size, size))
+    h = F.tanh(x)
+    y = 0
+    for i in range(fan_out):
+        y = y + F.sum(h * float(i))
+    return y
+
+
+def measure(build, fan_out, size, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        y = build(fan_out, size)
+        start = time.perf_counter()
+        y.backward()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    np.random.seed(0)
+    for build in (shared_weight, wide_fan_out):
+        print(build.__name__)
+        for fan_out, size in ((100, 64), (100, 512), (1000, 128)):
+            t = measure(build, fan_out, size)
+            print(f'  fan_out={fan_out:5d}  size={size:4d}x{size:<4d} '
+                  f' backward={t * 1e3:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable
+from dezero.models import MLP
+
+
+# Curvature of a trained model's output with respect to its input, the
+# kind of second-order query used for input sensitivity analysis.
+def with_backward(model, x):
+    model.cleargrads()
+    x.cleargrad()
+    y = F.sum(model(x))
+    y.backward(create_graph=True)
+    gx = x.grad
+    model.cleargrads()
+    x.cleargrad()
+    F.sum(gx).backward()
+    return gx, x.grad
+
+
+def with_grad(model, x):
+    y = F.sum(model(x))
+    gx = dezero.grad(y, x, create_graph=True)
+    return gx, dezero.grad(F.sum(gx), x)
+
+
+def measure(fn, model, x, repeat=20):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(model, x)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    np.random.seed(0)
+    for width in (10, 100, 500):
+        model = MLP((width, width, 1), activation=F.tanh)
+        x = Variable(np.random.rand(64, 1))
+        t0, (gx0, h0) = measure(with_backward, model, x)
+        t1, (gx1, h1) = measure(with_grad, model, x)
+        assert np.allclose(gx0.data, gx1.data) and np.allclose(h0.data, h1.data)
+        print(f'width={width:4d}  backward={t0 * 1e3:7.2f} ms  '
+              f'grad={t1 * 1e3:7.2f} ms  speedup={t0 / t1:4.2f}x')
+
+
+if __name__ == '__main__':
+    main()
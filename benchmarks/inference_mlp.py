@@ -0,0 +1,35 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero
+from dezero.models import MLP
+
+
+def measure(model, x, iters):
+    best = float('inf')
+    with dezero.no_grad():
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(iters):
+                model(x)
+            best = min(best, (time.perf_counter() - start) / iters)
+    return best
+
+
+def main():
+    np.random.seed(0)
+    model = MLP((100, 100, 10))
+    for batch_size in (1, 4, 16, 64, 256, 1024, 4096):
+        x = np.random.rand(batch_size, 20).astype(np.float32)
+        iters = max(10, 20000 // batch_size)
+        t = measure(model, x, iters)
+        print(f'batch={batch_size:5d}  forward={t * 1e6:9.1f} us  '
+              f'per sample={t / batch_size * 1e6:8.3f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable
+
+
+def make_fn(n_in, n_out, hidden=64):
+    np.random.seed(0)
+    W1 = np.random.randn(n_in, hidden)
+    W2 = np.random.randn(hidden, n_out) / np.sqrt(hidden)
+
+    def f(x):
+        h = F.tanh(F.matmul(x, W1))
+        return F.sin(F.matmul(h, W2))
+    return f
+
+
+def jacobian_reverse(f, x, n_out):
+    x = Variable(x)
+    y = f(x)
+    rows = []
+    for i in range(n_out):
+        e = np.zeros(y.shape)
+        e[0, i] = 1
+        rows.append(dezero.grad(y, x, grad_outputs=e).data[0])
+    return np.stack(rows)
+
+
+def jacobian_forward(f, x):
+    cols = []
+    for j in range(x.shape[1]):
+        e = np.zeros(x.shape)
+        e[0, j] = 1
+        cols.append(dezero.jvp(f, [x], [e])[1].data[0])
+    return np.stack(cols, axis=1)
+
+
+def measure(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    for n_in, n_out in ((4, 100), (4, 1000), (16, 1000), (64, 64)):
+        f = make_fn(n_in, n_out)
+        x = np.random.rand(1, n_in)
+        assert np.allclose(jacobian_reverse(f, x, n_out), jacobian_forward(f, x))
+        t_rev = measure(lambda: jacobian_reverse(f, x, n_out))
+        t_fwd = measure(lambda: jacobian_forward(f, x))
+        print(f'inputs={n_in:3d} outputs={n_out:5d}  reverse={t_rev * 1e3:8.2f} ms  '
+              f'forward (jvp)={t_fwd * 1e3:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero.functions as F
+from dezero import Variable, Parameter
+
+
+def measure(fn, x, W, b, gy, iters):
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iters):
+            W.cleargrad()
+            if b is not None:
+                b.cleargrad()
+            v = Variable(x)
+            y = fn(v, W, b)
+            y.grad = gy
+            y.backward()
+        best = min(best, (time.perf_counter() - start) / iters)
+    return best
+
+
+def main():
+    np.random.seed(0)
+    for shape in ((64, 100, 100), (512, 1024, 1024), (4096, 256, 256), (32, 64, 512, 512)):
+        *lead, I, O = shape
+        x = np.random.randn(*lead, I).astype(np.float32)
+        W = Parameter(np.random.randn(I, O).astype(np.float32))
+        b = Parameter(np.zeros(O, np.float32))
+        gy = Variable(np.random.randn(*lead, O).astype(np.float32))
+        iters = max(5, 20000000 // int(np.prod(shape)))
+
+        line = f'x={tuple(x.shape)!s:18s} W=({I}, {O})'
+        for name, fn, bias in (('matmul + add', F.linear_simple, b),
+                               ('linear', F.linear, b),
+                               ('linear nobias', F.linear, None)):
+            if len(lead) > 1 and fn is F.linear_simple:
+                line += f'  {name}=      n/a'
+                continue
+            line += f'  {name}={measure(fn, x, W, bias, gy, iters) * 1e3:8.3f} ms'
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero.models import MLP
+
+
+def train_step(model, x, t):
+    model.cleargrads()
+    loss = F.mean_squared_error(model(x), t)
+    loss.backward()
+
+
+def measure(model, x, t, iters):
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iters):
+            train_step(model, x, t)
+        best = min(best, (time.perf_counter() - start) / iters)
+    return best
+
+
+def main():
+    np.random.seed(0)
+    for batch_size, width in ((64, 100), (1024, 512), (4096, 1024)):
+        model = MLP((width, width, 1))
+        x = np.random.rand(batch_size, width)
+        t = np.random.rand(batch_size, 1)
+        iters = max(3, 200000 // (batch_size * width) * 10)
+
+        base = measure(model, x, t, iters)
+        pool = dezero.MemoryPool()
+        with dezero.using_memory_pool(pool):
+            pooled = measure(model, x, t, iters)
+        stats = pool.stats()
+        print(f'batch={batch_size:5d} width={width:5d}  '
+              f'no pool={base * 1e3:8.2f} ms  pool={pooled * 1e3:8.2f} ms  '
+              f'hits={stats["hits"]} misses={stats["misses"]} '
+              f'pooled={(stats["bytes_held"] + stats["bytes_in_use"]) / 2**20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
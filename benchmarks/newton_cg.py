@@ -0,0 +1,79 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import optimizers
+from dezero.core import HessianVectorProduct
+from dezero.models import MLP
+
+
+def make_data(n=200):
+    np.random.seed(0)
+    x = np.random.rand(n, 1)
+    y = np.sin(2 * np.pi * x)
+    return x, y
+
+
+def hvp_cost(model, x, y, k=20):
+    params = list(model.params())
+    vs = [[np.random.rand(*p.shape) for p in params] for _ in range(k)]
+
+    def loss_fn(*params):
+        return F.mean_squared_error(model(x), y)
+
+    start = time.perf_counter()
+    for v in vs:
+        dezero.hvp(loss_fn, params, v)
+    rebuild = time.perf_counter() - start
+
+    start = time.perf_counter()
+    product = HessianVectorProduct(loss_fn(), params)
+    for v in vs:
+        product(v)
+    reuse = time.perf_counter() - start
+    return rebuild, reuse
+
+
+def train(optimizer, model, x, y, seconds):
+    optimizer.setup(model)
+
+    def loss_fn():
+        return F.mean_squared_error(model(x), y)
+
+    start = time.perf_counter()
+    steps = 0
+    while time.perf_counter() - start < seconds:
+        if isinstance(optimizer, optimizers.NewtonCG):
+            optimizer.update(loss_fn)
+        else:
+            model.cleargrads()
+            loss_fn().backward()
+            optimizer.update()
+        steps += 1
+    with dezero.no_grad():
+        return float(loss_fn().data), steps
+
+
+def main():
+    x, y = make_data()
+    model = MLP((10, 1))
+    model(x)
+    rebuild, reuse = hvp_cost(model, x, y)
+    print(f'20 Hessian-vector products: rebuild graph={rebuild * 1e3:7.2f} ms  '
+          f'reuse graph={reuse * 1e3:7.2f} ms')
+
+    for name, optimizer in (('SGD(lr=0.2)', optimizers.SGD(lr=0.2)),
+                            ('MomentumSGD', optimizers.MomentumSGD(lr=0.2)),
+                            ('NewtonCG', optimizers.NewtonCG(cg_iters=20, damping=1e-2))):
+        np.random.seed(1)
+        loss, steps = train(optimizer, MLP((10, 1)), x, y, seconds=2.0)
+        print(f'{name:12s}  loss after 2 s={loss:.2e}  ({steps} updates)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import gc
+import time
+import tracemalloc
+import numpy as np
+import dezero.functions as F
+from dezero import Variable
+
+
+# Every step adds one Function and one output Variable to the graph. The
+# array is 0-dim so that the numbers are dominated by the graph objects.
+def build(n):
+    x = Variable(np.array(0.5))
+    y = x
+    for _ in range(n):
+        y = F.sin(y)
+    return y
+
+
+def memory_per_node(n=20000):
+    gc.collect()
+    tracemalloc.start()
+    y = build(n)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del y
+    return size / n
+
+
+def construction_time(n=20000, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        y = build(n)
+        best = min(best, time.perf_counter() - start)
+        del y
+    return best / n
+
+
+def instance_size(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def main():
+    print(f'memory per node (Function + Variable + 0-dim array): '
+          f'{memory_per_node():.0f} bytes')
+    print(f'construction time per node: {construction_time() * 1e6:.2f} us')
+    y = F.sin(Variable(np.array(0.5)))
+    print(f'Variable instance: {instance_size(y)} bytes, '
+          f'Sin instance: {instance_size(y.creator)} bytes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero.functions as F
+import dezero.layers as L
+
+
+def measure(fn, iters=3):
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(iters):
+            fn()
+        best = min(best, (time.perf_counter() - start) / iters)
+    return best
+
+
+def count_funcs(y):
+    funcs, stack = set(), [y.creator]
+    while stack:
+        f = stack.pop()
+        if f is None or f in funcs:
+            continue
+        funcs.add(f)
+        stack.extend(x.creator for x in f.inputs)
+    return len(funcs)
+
+
+def sigmoid_simple(x):
+    # F.sigmoid_simple with a float32 one: its Python 1 makes the result float64
+    return (F.exp(-x) + np.array(1, np.float32)) ** -1
+
+
+class ComposedLSTM(L.Layer):
+    """LSTM written with one Linear per gate and sigmoid_simple, for comparison."""
+    def __init__(self, hidden_size, in_size):
+        super().__init__()
+        H, I = hidden_size, in_size
+        self.x2f, self.x2i, self.x2o, self.x2u = [L.Linear(H, in_size=I) for _ in range(4)]
+        self.h2f, self.h2i, self.h2o, self.h2u = [L.Linear(H, in_size=H, nobias=True)
+                                                  for _ in range(4)]
+        # L.Linear scales its float32 weights by a float64 scalar
+        for param in self.params():
+            param.data = param.data.astype(np.float32)
+        self.h = self.c = None
+
+    def reset_state(self):
+        self.h = self.c = None
+
+    def forward(self, x):
+        if self.h is None:
+            f, i = sigmoid_simple(self.x2f(x)), sigmoid_simple(self.x2i(x))
+            o, u = sigmoid_simple(self.x2o(x)), F.tanh(self.x2u(x))
+            c = i * u
+        else:
+            f = sigmoid_simple(self.x2f(x) + self.h2f(self.h))
+            i = sigmoid_simple(self.x2i(x) + self.h2i(self.h))
+            o = sigmoid_simple(self.x2o(x) + self.h2o(self.h))
+            u = F.tanh(self.x2u(x) + self.h2u(self.h))
+            c = f * self.c + i * u
+        self.c, self.h = c, o * F.tanh(c)
+        return self.h
+
+
+def main():
+    np.random.seed(0)
+    N, T = 32, 35
+    for I, H in ((32, 32), (128, 256)):
+        xs = np.random.randn(T, N, I).astype(np.float32)
+        print(f'x=({N}, {I}) hidden={H} float32, {T} steps then backward')
+
+        layers = [('composed LSTM', ComposedLSTM(H, I)), ('L.LSTM', L.LSTM(H, in_size=I)),
+                  ('L.GRU', L.GRU(H, in_size=I)), ('L.RNN', L.RNN(H, in_size=I))]
+        for name, layer in layers:
+            layer.reset_state()
+            layer(xs[0])
+            n = count_funcs(layer.h)
+            layer(xs[1])
+            per_step = count_funcs(layer.h) - n
+
+            def window():
+                layer.reset_state()
+                layer.cleargrads()
+                for x in xs:
+                    y = layer(x)
+                F.sum(y).backward()
+
+            t = measure(window)
+            print(f'  {name:14s} {per_step:3d} Functions/step  '
+                  f'forward+backward {t * 1e3:8.1f} ms')
+
+    # truncated BPTT over a long sequence: the graph stays one window long
+    layer = L.LSTM(H, in_size=I)
+    for unchain in (False, True):
+        layer.reset_state()
+        sizes = []
+        for t in range(4 * T):
+            y = layer(xs[t % T])
+            if (t + 1) % T == 0:
+                loss = F.sum(y)
+                sizes.append(count_funcs(loss))
+                layer.cleargrads()
+                loss.backward()
+                if unchain:
+                    layer.unchain()
+        print(f'  LSTM {4 * T} steps, backward every {T}, unchain={unchain!s:5s}: '
+              f'graph size {sizes}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero.functions as F
+from dezero import Variable
+
+
+def step(loss_fn, x, t):
+    x = Variable(x)
+    loss = loss_fn(x, t)
+    loss.backward()
+    return loss
+
+
+def measure(loss_fn, x, t, iters):
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iters):
+            step(loss_fn, x, t)
+        best = min(best, (time.perf_counter() - start) / iters)
+    return best
+
+
+def main():
+    np.random.seed(0)
+    N = 128
+    for C in (10, 100, 1000, 10000):
+        x = np.random.randn(N, C).astype(np.float32)
+        t = np.random.randint(0, C, N)
+        iters = max(5, 200000 // C)
+        simple = measure(F.softmax_cross_entropy_simple, x, t, iters)
+        fused = measure(F.softmax_cross_entropy, x, t, iters)
+        print(f'N={N} C={C:6d}  simple={simple * 1e3:8.3f} ms  fused={fused * 1e3:8.3f} ms  '
+              f'({N / fused / 1e3:8.1f} k samples/s, x{simple / fused:.1f})')
+
+
+if __name__ == '__main__':
+    main()
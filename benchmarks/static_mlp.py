@@ -0,0 +1,44 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero.functions as F
+from dezero.models import MLP
+from dezero.static import capture
+
+
+def train(x, t, static, iters=1000, lr=0.2):
+    np.random.seed(0)
+    model = MLP((10, 10, 1))
+    step = capture(lambda x, t: F.mean_squared_error(model(x), t))
+
+    start = time.perf_counter()
+    for _ in range(iters):
+        model.cleargrads()
+        if static:
+            loss = step(x, t)
+        else:
+            loss = F.mean_squared_error(model(x), t)
+            loss.backward()
+        for p in model.params():
+            p.data -= lr * p.grad.data
+    return time.perf_counter() - start, float(loss.data)
+
+
+def main():
+    np.random.seed(0)
+    for batch_size in (1, 16, 100, 1000):
+        x = np.random.rand(batch_size, 1)
+        t = np.sin(2 * np.pi * x) + np.random.rand(batch_size, 1)
+        eager, loss_e = train(x, t, static=False)
+        static, loss_s = train(x, t, static=True)
+        print(f'batch={batch_size:5d}  eager={eager * 1e3:8.1f} ms  '
+              f'static={static * 1e3:8.1f} ms  speedup={eager / static:4.2f}x  '
+              f'(loss {loss_e:.6f} / {loss_s:.6f})')
+
+
+if __name__ == '__main__':
+    main()
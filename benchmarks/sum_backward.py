@@ -0,0 +1,44 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import tracemalloc
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable
+
+
+def measure(x_data, axis, create_graph, iters=10):
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(iters):
+            x = Variable(x_data)
+            gx, = dezero.grad(F.sum(x, axis=axis), [x], create_graph=create_graph)
+        best = min(best, (time.perf_counter() - start) / iters)
+
+    x = Variable(x_data)
+    y = F.sum(x, axis=axis)
+    tracemalloc.start()
+    gx, = dezero.grad(y, [x], create_graph=create_graph)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    np.random.seed(0)
+    x = np.random.randn(4096, 4096).astype(np.float32)
+    print(f'x={x.shape} float32, {x.nbytes / 2**20:.0f} MiB')
+    for axis in (0, 1, None):
+        for create_graph in (False, True):
+            t, peak = measure(x, axis, create_graph)
+            print(f'sum axis={axis!s:4s} create_graph={create_graph!s:5s} '
+                  f'backward {t * 1e3:8.3f} ms  peak {peak / 2**20:8.2f} MiB')
+
+
+if __name__ == '__main__':
+    main()
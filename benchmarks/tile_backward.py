@@ -0,0 +1,54 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero.functions as F
+from dezero import Variable
+
+
+def block_loop(x_shape, reps, gy):
+    """Add the tiles up one by one (one slice and add per tile)."""
+    gx = np.zeros(x_shape, gy.dtype)
+    for block in np.ndindex(*reps):
+        gx += gy[tuple(slice(b * n, (b + 1) * n) for b, n in zip(block, x_shape))]
+    return gx
+
+
+def measure(fn, iters=20):
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iters):
+            fn()
+        best = min(best, (time.perf_counter() - start) / iters)
+    return best
+
+
+def main():
+    np.random.seed(0)
+    for shape, reps in (((256, 256), (8, 8)), ((64, 64, 16), (4, 4, 4)),
+                        ((16, 16, 16), (16, 16, 16)), ((1024, 1), (1, 512))):
+        x = np.random.rand(*shape).astype(np.float32)
+        gy = np.random.rand(*np.tile(x, reps).shape).astype(np.float32)
+
+        v = Variable(x)
+        y = F.tile(v, reps)
+
+        def tile_backward():
+            v.cleargrad()
+            y.grad = Variable(gy)
+            y.backward()
+            return v.grad.data
+
+        assert np.allclose(tile_backward(), block_loop(shape, reps, gy), rtol=1e-4)
+        loop = measure(lambda: block_loop(shape, reps, gy))
+        fused = measure(tile_backward)
+        print(f'x={shape!s:14s} reps={reps!s:14s} per-tile loop {loop * 1e3:8.3f} ms  '
+              f'Tile backward {fused * 1e3:8.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+if '__file__' in globals():
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable
+from dezero.models import MLP
+
+
+def f(x):
+    return x ** 4 - 2 * x ** 2
+
+
+def newton(x, iters=10):
+    for _ in range(iters):
+        y = f(x)
+        gx = dezero.grad(y, x, create_graph=True)
+        gx2 = dezero.grad(gx, x)
+        x.data = x.data - gx.data / gx2.data
+    return x.data
+
+
+def newton_loop(starts):
+    return np.array([newton(Variable(np.array(x0))) for x0 in starts])
+
+
+def newton_vmap(starts):
+    # f is elementwise, so the batched y is differentiated as a whole:
+    # seeding with ones gives every example its own derivative
+    batched_f = dezero.vmap(f)
+    x = Variable(starts.copy())
+    for _ in range(10):
+        y = batched_f(x)
+        gx = dezero.grad(y, x, create_graph=True)
+        gx2 = dezero.grad(gx, x)
+        x.data = x.data - gx.data / gx2.data
+    return x.data
+
+
+def per_sample_grads_loop(model, x, t):
+    grads = []
+    for xi, ti in zip(x, t):
+        xi = Variable(xi[None])
+        F.mean_squared_error(model(xi), ti[None]).backward()
+        grads.append(xi.grad.data[0])
+    return np.stack(grads)
+
+
+def per_sample_grads_vmap(model, x, t):
+    x = Variable(x[:, None])
+    loss = dezero.vmap(lambda x, t: F.mean_squared_error(model(x), t))(x, t[:, None])
+    F.sum(loss).backward()
+    return x.grad.data[:, 0]
+
+
+def measure(fn, *args):
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    np.random.seed(0)
+    for n in (10, 100, 1000):
+        starts = np.random.uniform(0.5, 3.0, n)
+        t_loop, r_loop = measure(newton_loop, starts)
+        t_vmap, r_vmap = measure(newton_vmap, starts)
+        assert np.allclose(r_loop, r_vmap)
+        print(f'newton  points={n:5d}  loop={t_loop * 1e3:8.2f} ms  vmap={t_vmap * 1e3:6.2f} ms')
+
+    model = MLP((100, 10))
+    for n in (10, 100, 1000):
+        x, t = np.random.rand(n, 20), np.random.rand(n, 10)
+        model(x[:1])
+        t_loop, r_loop = measure(per_sample_grads_loop, model, x, t)
+        t_vmap, r_vmap = measure(per_sample_grads_vmap, model, x, t)
+        assert np.allclose(r_loop, r_vmap)
+        print(f'per-sample input grads  n={n:5d}  loop={t_loop * 1e3:8.2f} ms  '
+              f'vmap={t_vmap * 1e3:6.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,12 @@ else:
     from dezero.core import as_variable
     from dezero.core import setup_variable
     from dezero.core import Parameter
+    from dezero.core import grad
+    from dezero.core import jvp
+    from dezero.core import hvp
+    from dezero.core import vmap
+    from dezero.core import using_memory_pool
+    from dezero.memory import MemoryPool
     from dezero.models import Model
 
 
@@ -1,28 +1,80 @@
+import heapq
 import weakref
 import contextlib
+import itertools
+import contextvars
 import numpy as np
 
 import dezero
+from dezero import utils
+from dezero.memory import MemoryPool
 
 
-class Config:
-    enable_backprop = True
+class ContextConfig:
+    """Settings that are local to the current thread (or asyncio task).
+
+    Each setting is backed by a ContextVar, so `using_config` in one thread
+    never changes the mode seen by another. Settings are read as attributes,
+    e.g. `Config.enable_backprop`.
+    """
+    def __init__(self, **defaults):
+        variables = {name: contextvars.ContextVar(name, default=value)
+                     for name, value in defaults.items()}
+        object.__setattr__(self, '_variables', variables)
+
+    def variable(self, name):
+        try:
+            return self._variables[name]
+        except KeyError:
+            raise AttributeError(f"Config has no setting '{name}'.") from None
+
+    def __getattr__(self, name):
+        return self.variable(name).get()
+
+    def __setattr__(self, name, value):
+        self.variable(name).set(value)
+
+
+Config = ContextConfig(enable_backprop=True, memory_pool=None, tangents=None,
+                       batched=None)
+
+# Function.__call__ reads the ContextVar directly instead of going through
+# Config.__getattr__, which keeps the per-call check cheap.
+_enable_backprop = Config.variable('enable_backprop')
+_memory_pool = Config.variable('memory_pool')
+_tangents = Config.variable('tangents')
+_batched = Config.variable('batched')
 
 
 @contextlib.contextmanager
 def using_config(name, value):
-    old_value = getattr(Config, name)
-    setattr(Config, name, value)
+    variable = Config.variable(name)
+    token = variable.set(value)
     try:
         yield
     finally:
-        setattr(Config, name, old_value)
+        variable.reset(token)
+
+
+def using_memory_pool(pool=None):
+    """Draw the arrays of forward and backward from a MemoryPool.
+
+    Without an argument a new pool is used for the block.
+    """
+    return using_config('memory_pool', MemoryPool() if pool is None else pool)
 
 
 class Variable:
+    # Graphs hold a Variable per op output, so keep instances compact.
+    # __weakref__ is needed by Function.outputs.
+    __slots__ = ('data', 'name', 'grad', 'creator', 'generation', 'requires_grad',
+                 '__weakref__')
     __array__priority__ = 200
 
-    def __init__(self, data, name=None):
+    # requires_grad: whether gradients flow to this Variable. Functions whose
+    # inputs all have it False are not recorded in the graph. Arrays wrapped
+    # implicitly by as_variable (training data, targets, constants) get False.
+    def __init__(self, data, name=None, requires_grad=True):
         if data is not None:
             if not isinstance(data, np.ndarray):
                 raise TypeError(f"{type(data)} is not supported.")
@@ -32,6 +84,7 @@ class Variable:
         self.grad = None
         self.creator = None
         self.generation = 0
+        self.requires_grad = requires_grad
 
     def __len__(self):
         return len(self.data)
@@ -64,21 +117,46 @@ class Variable:
 
     def backward(self, retain_grad=False, create_graph=False):
         if self.grad is None:
-            self.grad = Variable(np.ones_like(self.data))
+            self.grad = Variable(ones_like_array(self.data), requires_grad=False)
 
+        # funcs is a max-heap on generation. Entries are (-generation, order, f)
+        # so that functions of the same generation pop in insertion order and
+        # the Function objects themselves are never compared.
         funcs = []
         seen_set = set()
+        counter = itertools.count()
 
         def add_func(f):
             if f not in seen_set:
-                funcs.append(f)
+                heapq.heappush(funcs, (-f.generation, next(counter), f))
                 seen_set.add(f)
-                funcs.sort(key=lambda x: x.generation)
 
+        # A leaf's gradient is the seed itself. It must not go through the
+        # accumulator, which would add the seed to .grad a second time.
+        if self.creator is None:
+            return
         add_func(self.creator)
+
+        # Without create_graph nobody differentiates the gradients again, so
+        # run Function.backward_array on plain ndarrays instead of building
+        # Variables and Functions for every step of the backward pass.
+        if not create_graph:
+            grads = GradientAccumulator()
+            grads.add(self, self.grad.data)
+            with using_config("enable_backprop", False):
+                while funcs:
+                    f = heapq.heappop(funcs)[2]
+                    for x in backward_step(f, grads, retain_grad):
+                        add_func(x.creator)
+            grads.write_leaf_grads()
+            return
+
         while funcs:
-            f = funcs.pop()
-            gys = [output().grad for output in f.outputs]
+            f = heapq.heappop(funcs)[2]
+            # an output nobody holds any more (e.g. the unused c of an LSTM
+            # step) passes None
+            ys = [output() for output in f.outputs]
+            gys = [None if y is None else y.grad for y in ys]
             
             with using_config("enable_backprop", create_graph):
                 gxs = f.backward(*gys)
@@ -86,6 +164,9 @@ class Variable:
                     gxs = (gxs,)
 
                 for x, gx in zip(f.inputs, gxs):
+                    if gx is None or not x.requires_grad:
+                        continue
+
                     if x.grad is None:
                         x.grad = gx
                     else:
@@ -95,12 +176,32 @@ class Variable:
                         add_func(x.creator)
 
             if not retain_grad:
-                for y in f.outputs:
-                    y().grad = None
+                for y in ys:
+                    if y is not None:
+                        y.grad = None
 
     def cleargrad(self):
         self.grad = None
 
+    # Truncated backprop: the Variable keeps its data but becomes a leaf,
+    # so a later backward stops here.
+    def unchain(self):
+        self.creator = None
+
+    def unchain_backward(self):
+        """Unchain every Variable of the graph behind this one, so that the
+        Functions and intermediate arrays can be freed."""
+        if self.creator is None:
+            return
+        funcs = [self.creator]
+        self.unchain()
+        while funcs:
+            f = funcs.pop()
+            for x in f.inputs:
+                if x.creator is not None:
+                    funcs.append(x.creator)
+                    x.unchain()
+
     # In order to make dezero.reshape and numpy.reshape more alike
     def reshape(self, *shape):
         if len(shape) == 1 and isinstance(shape[0], (tuple, list)):
@@ -110,8 +211,12 @@ class Variable:
     def tile(self, reps):
         return dezero.functions.tile(self, reps)
     
-    def transpose(self):
-        return dezero.functions.transpose(self)
+    def transpose(self, *axes):
+        if len(axes) == 0:
+            axes = None
+        elif len(axes) == 1 and (isinstance(axes[0], (tuple, list)) or axes[0] is None):
+            axes = axes[0]
+        return dezero.functions.transpose(self, axes)
     
     @property
     def T(self):
@@ -123,22 +228,55 @@ class Variable:
 
 
 class Function:
+    # Subclasses list the attributes they set in __slots__ as well.
+    __slots__ = ('inputs', 'outputs', 'generation')
+
     def __call__(self, *inputs):
+        batched = _batched.get()
+        if batched is not None:
+            flags = [isinstance(x, Variable) and x in batched for x in inputs]
+            if any(flags):
+                return apply_batch_rule(self, inputs, flags, batched)
+
+        if not _enable_backprop.get():
+            # Nothing is recorded without backprop, so skip wrapping the
+            # inputs and never keep them or the generation on the Function.
+            xs = [x.data if isinstance(x, Variable) else x for x in inputs]
+            ys = self.forward(*xs)
+            if not isinstance(ys, tuple):
+                output = Variable(ys if type(ys) is np.ndarray else as_array(ys),
+                                  requires_grad=False)
+                tangents = _tangents.get()
+                if tangents is not None:
+                    push_tangents(self, inputs, xs, [output], tangents)
+                return output
+            outputs = [Variable(as_array(y), requires_grad=False) for y in ys]
+            tangents = _tangents.get()
+            if tangents is not None:
+                push_tangents(self, inputs, xs, outputs, tangents)
+            return outputs if len(outputs) > 1 else outputs[0]
+
         inputs = [as_variable(x) for x in inputs]
         xs = [x.data for x in inputs]
         ys = self.forward(*xs)
         if not isinstance(ys, tuple):
             ys = (ys,)
-        
-        # outputs = [Variable(as_array(y)) for y in ys]
-        outputs = [as_variable(as_array(y)) for y in ys]
 
-        if Config.enable_backprop:
-            self.generation = max([x.generation for x in inputs])
-            for output in outputs:
-                output.set_creator(self)
-            self.inputs = inputs
-            self.outputs = [weakref.ref(output) for output in outputs]
+        # Record the Function only if a gradient can flow to one of its
+        # inputs, so that backward never visits constant subgraphs.
+        requires_grad = any([x.requires_grad for x in inputs])
+        outputs = [Variable(as_array(y), requires_grad=requires_grad) for y in ys]
+        tangents = _tangents.get()
+        if tangents is not None:
+            push_tangents(self, inputs, xs, outputs, tangents)
+        if not requires_grad:
+            return outputs if len(outputs) > 1 else outputs[0]
+
+        self.generation = max([x.generation for x in inputs])
+        for output in outputs:
+            output.set_creator(self)
+        self.inputs = inputs
+        self.outputs = [weakref.ref(output) for output in outputs]
 
         return outputs if len(outputs) > 1 else outputs[0]
 
@@ -147,10 +285,439 @@ class Function:
 
     def backward(self, gys):
         raise NotImplementedError()
-    
+
+    # Tangent rule of forward-mode differentiation (see `jvp`). xs and ys
+    # are the input and output ndarrays, txs the tangents of the inputs
+    # (None for a zero tangent, but never all None). Returns the tangents
+    # of the outputs.
+    def jvp(self, xs, ys, txs):
+        raise NotImplementedError(f'{type(self).__name__} has no tangent rule.')
+
+    # Batching rule of `vmap`. inputs are the arguments of __call__, where
+    # batched tells which of them carry the batch as an extra leading axis.
+    # Returns the batched outputs, computed by ordinary Function calls.
+    def batch_rule(self, inputs, batched):
+        raise NotImplementedError(f'{type(self).__name__} has no batching rule.')
+
+    # Same as backward, but takes and returns ndarrays. It is used when the
+    # graph of the backward pass itself is not needed (create_graph=False).
+    # Subclasses override it to skip the Variable-level ops of backward.
+    def backward_array(self, *gys):
+        gys = [None if gy is None else Variable(as_array(gy), requires_grad=False)
+               for gy in gys]
+        gxs = self.backward(*gys)
+        if not isinstance(gxs, tuple):
+            return as_data(gxs)
+        return tuple(as_data(gx) for gx in gxs)
+
+
+class GradientAccumulator:
+    """Gradients (ndarrays) collected by an ndarray backward pass.
+
+    The first gradient a Variable receives is stored as is. It may be the
+    array a Function passed through (Add returns gy for both inputs) or one
+    that another Variable also holds, so it is never written to. The second
+    contribution allocates a new array owned by the accumulator, and every
+    later one is added into that array in place.
+
+    Gradients of leaves are kept here as well until `write_leaf_grads`
+    stores them in `.grad`, so that a weight used many times gets a single
+    buffer instead of a new array and Variable per use.
+    """
+    __slots__ = ('grads', 'owned', 'leaves')
+
+    def __init__(self):
+        self.grads = {}
+        self.owned = set()
+        self.leaves = {}
+
+    def __contains__(self, x):
+        return id(x) in self.grads
+
+    def add(self, x, gx):
+        key = id(x)
+        if x.creator is None:
+            self.leaves[key] = x
+
+        g = self.grads.get(key)
+        if g is None:
+            self.grads[key] = gx
+        elif key in self.owned and _addable_in_place(g, gx):
+            np.add(g, gx, out=g)
+        else:
+            g = apply_ufunc(np.add, g, gx)
+            self.grads[key] = g
+            if isinstance(g, np.ndarray):
+                self.owned.add(key)
+
+    def pop(self, x):
+        key = id(x)
+        self.owned.discard(key)
+        return self.grads.pop(key, None)
+
+    def write_leaf_grads(self):
+        for x in self.leaves.values():
+            gx = self.pop(x)
+            gx = gx if x.grad is None else x.grad.data + gx
+            x.grad = Variable(as_array(gx), requires_grad=False)
+        self.leaves.clear()
+
+
+def _addable_in_place(g, gx):
+    if g.shape == gx.shape and g.dtype == gx.dtype:
+        return True
+    return g.shape == np.broadcast_shapes(g.shape, gx.shape) and \
+        np.result_type(g, gx) == g.dtype
+
+
+def backward_step(f, grads, retain_grad=False):
+    """Run one step of the ndarray backward pass.
+
+    Args:
+        f (Function): Function to backpropagate through.
+        grads (GradientAccumulator): Pending gradients. Those of f's outputs
+            are consumed and those of f's inputs are accumulated.
+        retain_grad (bool): Whether to store the gradients of f's outputs in
+            their `.grad`.
+
+    Returns:
+        list: The inputs of f that have a creator and received a gradient.
+    """
+    outputs = [output() for output in f.outputs]
+    gys = [None if y is None else grads.pop(y) for y in outputs]
+    gxs = f.backward_array(*gys)
+    if not isinstance(gxs, tuple):
+        gxs = (gxs,)
+
+    for y, gy in zip(outputs, gys):
+        if y is not None:
+            if retain_grad and gy is not None:
+                y.grad = Variable(as_array(gy), requires_grad=False)
+            else:
+                y.grad = None
+
+    nodes = []
+    for x, gx in zip(f.inputs, gxs):
+        if gx is None or not x.requires_grad:
+            continue
+
+        if x.creator is not None:
+            # a gradient left on x by an earlier backward with retain_grad
+            if x.grad is not None and x not in grads:
+                grads.add(x, x.grad.data)
+            nodes.append(x)
+        grads.add(x, gx)
+    return nodes
+
+
+def grad(outputs, inputs, grad_outputs=None, create_graph=False):
+    """Compute the gradients of outputs with respect to inputs.
+
+    Unlike `Variable.backward`, only the Functions on a path from an input to
+    an output are run, the gradients are returned instead of being stored,
+    and no `.grad` is modified.
+
+    Args:
+        outputs (Variable or list of Variables): Values to differentiate.
+        inputs (Variable or list of Variables): Variables to differentiate
+            with respect to. They may be leaves or intermediate Variables.
+        grad_outputs (list or None): Gradients of the outputs. None (for all
+            of them or for one output) means ones.
+        create_graph (bool): Whether to build the graph of the backward pass,
+            so that the returned gradients can be differentiated again.
+
+    Returns:
+        Variable or list of Variables: The gradients, in the same structure
+        as inputs. The gradient of an input no output depends on is None.
+    """
+    single = isinstance(inputs, Variable)
+    inputs = [inputs] if single else list(inputs)
+    outputs = [outputs] if isinstance(outputs, Variable) else list(outputs)
+    if grad_outputs is None:
+        grad_outputs = [None] * len(outputs)
+    elif not isinstance(grad_outputs, (list, tuple)):
+        grad_outputs = [grad_outputs]
+
+    targets = {id(x) for x in inputs}
+    # A Function below the lowest generation of the inputs cannot lie on a
+    # path from an input, so the search does not go below it.
+    min_generation = min(x.generation for x in inputs)
+
+    funcs = []
+    seen_set = set()
+    stack = [y.creator for y in outputs]
+    while stack:
+        f = stack.pop()
+        if f is None or f in seen_set or f.generation < min_generation:
+            continue
+        seen_set.add(f)
+        funcs.append(f)
+        stack.extend(x.creator for x in f.inputs)
+
+    # Producers come before consumers in generation order, so one pass
+    # finds every Function that leads to an input.
+    funcs.sort(key=lambda f: f.generation)
+    on_path = set()
+    for f in funcs:
+        for x in f.inputs:
+            if id(x) in targets or x.creator in on_path:
+                on_path.add(f)
+                break
+
+    grads = {}
+
+    def accumulate(x, gx):
+        key = id(x)
+        grads[key] = gx if key not in grads else grads[key] + gx
+
+    for y, gy in zip(outputs, grad_outputs):
+        if gy is None:
+            gy = ones_like_array(y.data)
+        if create_graph:
+            accumulate(y, as_variable(as_array(gy)))
+        else:
+            accumulate(y, as_data(gy))
+
+    with using_config("enable_backprop", create_graph):
+        for f in reversed(funcs):
+            if f not in on_path:
+                continue
+
+            ys = [output() for output in f.outputs]
+            gys = [None if y is None else grads.get(id(y)) for y in ys]
+            if all(gy is None for gy in gys):
+                continue
+            for y in ys:
+                if y is not None and id(y) not in targets:
+                    grads.pop(id(y), None)
+
+            if create_graph:
+                gxs = f.backward(*gys)
+            else:
+                gxs = f.backward_array(*gys)
+            if not isinstance(gxs, tuple):
+                gxs = (gxs,)
+
+            for x, gx in zip(f.inputs, gxs):
+                if gx is not None and (id(x) in targets or x.creator in on_path):
+                    accumulate(x, gx)
+
+    gxs = []
+    for x in inputs:
+        gx = grads.get(id(x))
+        if gx is not None and not isinstance(gx, Variable):
+            gx = Variable(as_array(gx), requires_grad=False)
+        gxs.append(gx)
+    return gxs[0] if single else gxs
+
+
+class HessianVectorProduct:
+    """Hessian-vector products of a scalar y at the current inputs.
+
+    The gradient of y is computed once with create_graph=True. Each call
+    then differentiates that gradient again along v (reverse over reverse),
+    so any number of products share the graph of the first pass, and none
+    of them builds a graph of its own.
+
+    Args:
+        y (Variable): Scalar built with backprop enabled.
+        inputs (Variable or list of Variables): Variables to differentiate
+            with respect to, e.g. `list(model.params())`.
+    """
+    def __init__(self, y, inputs):
+        self.single = isinstance(inputs, Variable)
+        self.inputs = [inputs] if self.single else list(inputs)
+        self.grads = grad(y, self.inputs, create_graph=True)
+
+    def gradient(self):
+        """The gradient of y as ndarrays (zeros where y does not depend on an input)."""
+        return [np.zeros_like(x.data) if g is None else g.data
+                for x, g in zip(self.inputs, self.grads)]
+
+    def __call__(self, v):
+        vs = [v] if self.single else list(v)
+        outputs, grad_outputs = [], []
+        for g, vi in zip(self.grads, vs):
+            # an input whose gradient has no graph has a zero Hessian row
+            if g is not None and g.creator is not None:
+                outputs.append(g)
+                grad_outputs.append(as_data(vi))
+
+        hvs = grad(outputs, self.inputs, grad_outputs) if outputs else [None] * len(vs)
+        hvs = [Variable(np.zeros_like(x.data), requires_grad=False) if hv is None else hv
+               for x, hv in zip(self.inputs, hvs)]
+        return hvs[0] if self.single else hvs
+
+
+def hvp(f, inputs, v):
+    """Return the product of the Hessian of f at inputs with v.
+
+    f is called with the inputs as positional arguments and must return a
+    scalar. To multiply many vectors by the same Hessian, build a
+    `HessianVectorProduct` once and call it for each vector.
+    """
+    single = not isinstance(inputs, (list, tuple))
+    inputs = [inputs] if single else list(inputs)
+    inputs = [x if isinstance(x, Variable) else Variable(as_array(x)) for x in inputs]
+    with using_config('enable_backprop', True):
+        y = f(*inputs)
+    return HessianVectorProduct(y, inputs[0] if single else inputs)(v)
+
+
+# ---------------------------------------------------------
+# forward mode
+# ---------------------------------------------------------
+def push_tangents(f, inputs, xs, outputs, tangents):
+    txs = [tangents.get(x) if isinstance(x, Variable) else None for x in inputs]
+    if all(tx is None for tx in txs):
+        return
+    tys = f.jvp(xs, [y.data for y in outputs], txs)
+    if not isinstance(tys, tuple):
+        tys = (tys,)
+    for y, ty in zip(outputs, tys):
+        if ty is not None:
+            tangents[y] = as_array(ty)
+
+
+def add_tangents(shape, *ts):
+    """Sum the tangents that are not None, broadcast to shape."""
+    ts = [t for t in ts if t is not None]
+    t = ts[0]
+    for u in ts[1:]:
+        t = t + u
+    return t if np.shape(t) == shape else np.broadcast_to(t, shape)
+
+
+def jvp(f, primals, tangents):
+    """Evaluate f and its directional derivative in one forward pass.
+
+    Each Function computes the tangents of its outputs from those of its
+    inputs (`Function.jvp`) right after its forward, and the tangents are
+    dropped together with the Variables. The forward pass runs without
+    backprop, so no graph is built.
+
+    Args:
+        f (callable): Takes the primals as positional arguments and returns
+            a Variable or a list/tuple of Variables.
+        primals (list): Inputs of f (Variables or ndarrays).
+        tangents (list): Directions, one per primal (ndarrays, Variables or
+            None for zero).
+
+    Returns:
+        tuple: (outputs, output tangents). outputs is what f returned; the
+        tangents are Variables in the same structure.
+    """
+    primals = [x if isinstance(x, Variable) else Variable(as_array(x), requires_grad=False)
+               for x in primals]
+    table = weakref.WeakKeyDictionary()
+    for x, t in zip(primals, tangents):
+        if t is not None:
+            table[x] = np.broadcast_to(as_array(as_data(t)), x.shape)
+
+    with no_grad(), using_config('tangents', table):
+        outputs = f(*primals)
+
+    single = isinstance(outputs, Variable)
+    ys = [outputs] if single else list(outputs)
+    tys = []
+    for y in ys:
+        ty = table.get(y)
+        ty = np.zeros_like(y.data) if ty is None else ty
+        tys.append(Variable(as_array(ty), requires_grad=False))
+    return outputs, tys[0] if single else tys
+
+
+# ---------------------------------------------------------
+# vectorization
+# ---------------------------------------------------------
+def apply_batch_rule(f, inputs, flags, batched):
+    # The rule works on the batched arrays as they are, so the Functions it
+    # calls must not be batched again.
+    with using_config('batched', None):
+        outputs = f.batch_rule(inputs, flags)
+    for y in (outputs if isinstance(outputs, (list, tuple)) else [outputs]):
+        batched.add(y)
+    return outputs
+
+
+def align_batched(inputs, batched):
+    """Insert axes after the batch axis of the batched inputs so that
+    broadcasting lines up the example axes of all inputs."""
+    ndims = [x.ndim - 1 if b else np.ndim(x) for x, b in zip(inputs, batched)]
+    ndim = max(ndims)
+    aligned = []
+    for x, b, n in zip(inputs, batched, ndims):
+        if b and n < ndim:
+            x = dezero.functions.reshape(x, (x.shape[0],) + (1,) * (ndim - n) + x.shape[1:])
+        aligned.append(x)
+    return aligned
+
+
+def batch_elementwise(f, inputs, batched):
+    return f(*align_batched(inputs, batched))
+
+
+def vmap(fn, in_axes=0):
+    """Vectorize fn, written for a single example, over a batch.
+
+    The returned function takes the same arguments as fn, where the mapped
+    ones carry a stack of examples along axis 0. fn runs once on the whole
+    stack: each Function it calls is replaced by its batched counterpart
+    (`Function.batch_rule`), so the result is a single set of vectorized
+    ops and ordinary graph, and `backward` gives the same gradients as
+    calling fn per example. Since the examples are independent, the
+    gradient of the sum of the outputs with respect to a mapped input holds
+    the per-example gradients.
+
+    fn sees the batched Variables, so it must not rely on their `.shape`
+    or `.data`.
+
+    Args:
+        fn (callable): Returns a Variable or a list/tuple of Variables.
+        in_axes (int, None or tuple): 0 to map an argument, None to pass it
+            to every example as is. A single value applies to all arguments.
+
+    Returns:
+        callable: The batched function. Its outputs have the batch on
+        axis 0.
+    """
+    def batched_fn(*args):
+        axes = in_axes if isinstance(in_axes, (list, tuple)) else [in_axes] * len(args)
+        if len(axes) != len(args):
+            raise ValueError(f'in_axes has {len(axes)} entries for {len(args)} arguments.')
+
+        table = weakref.WeakSet()
+        inputs = []
+        size = None
+        for x, axis in zip(args, axes):
+            if axis is None:
+                inputs.append(x)
+                continue
+            if axis != 0:
+                raise ValueError(f'vmap maps over axis 0 only, got in_axes={axis}.')
+            if not isinstance(x, Variable):
+                x = Variable(as_array(x), requires_grad=False)
+            if size is not None and len(x) != size:
+                raise ValueError(f'Mapped inputs have batch sizes {size} and {len(x)}.')
+            size = len(x)
+            table.add(x)
+            inputs.append(x)
+
+        with using_config('batched', table):
+            outputs = fn(*inputs)
+
+        single = isinstance(outputs, Variable)
+        ys = [outputs] if single else list(outputs)
+        # an output that does not depend on a mapped input is the same for
+        # every example
+        ys = [y if y in table else
+              dezero.functions.broadcast_to(y, (size,) + y.shape) for y in ys]
+        return ys[0] if single else type(outputs)(ys)
+    return batched_fn
+
 
 class Parameter(Variable):
-    pass
+    __slots__ = ()
 
 
 def as_array(x):
@@ -162,7 +729,53 @@ def as_array(x):
 def as_variable(obj):
     if isinstance(obj, Variable):
         return obj
-    return Variable(obj)
+    return Variable(obj, requires_grad=False)
+
+
+def as_data(obj):
+    if isinstance(obj, Variable):
+        return obj.data
+    return obj
+
+
+def sum_to_array(x, shape):
+    if x.shape == shape:
+        return x
+    return utils.sum_to(x, shape)
+
+
+# ---------------------------------------------------------
+# array helpers: the result is written into a buffer of the active
+# MemoryPool (see using_memory_pool), or freshly allocated without one
+# ---------------------------------------------------------
+def apply_ufunc(ufunc, *args):
+    pool = _memory_pool.get()
+    if pool is None:
+        return ufunc(*args)
+    dtype = np.result_type(*args)
+    if dtype.kind != 'f':
+        # e.g. int / int, whose result type differs from result_type
+        return ufunc(*args)
+    shape = np.broadcast_shapes(*[np.shape(a) for a in args])
+    return ufunc(*args, out=pool.empty(shape, dtype))
+
+
+def matmul_array(a, b):
+    pool = _memory_pool.get()
+    if pool is None or a.ndim < 2 or b.ndim < 2:
+        return np.matmul(a, b)
+    shape = np.broadcast_shapes(a.shape[:-2], b.shape[:-2]) + (a.shape[-2], b.shape[-1])
+    return np.matmul(a, b, out=pool.empty(shape, np.result_type(a, b)))
+
+
+def ones_like_array(x):
+    pool = _memory_pool.get()
+    return np.ones_like(x) if pool is None else pool.ones_like(as_array(x))
+
+
+def zeros_array(shape, dtype=np.float64):
+    pool = _memory_pool.get()
+    return np.zeros(shape, dtype) if pool is None else pool.zeros(shape, dtype)
 
 
 def no_grad():
@@ -170,17 +783,30 @@ def no_grad():
 
 
 class Add(Function):
+    __slots__ = ('x0_shape', 'x1_shape')
+
     def forward(self, x0, x1):
         self.x0_shape, self.x1_shape = x0.shape, x1.shape
-        return x0 + x1
+        return apply_ufunc(np.add, x0, x1)
 
     def backward(self, gy):
-        gx0, gx1 = gy, gy
-        if self.x0_shape != self.x1_shape:
-            gx0 = dezero.functions.sum_to(gx0, self.x0_shape)
-            gx1 = dezero.functions.sum_to(gx1, self.x1_shape)
+        x0, x1 = self.inputs
+        gx0 = dezero.functions.sum_to(gy, self.x0_shape) if x0.requires_grad else None
+        gx1 = dezero.functions.sum_to(gy, self.x1_shape) if x1.requires_grad else None
+        return gx0, gx1
+
+    def backward_array(self, gy):
+        x0, x1 = self.inputs
+        gx0 = sum_to_array(gy, self.x0_shape) if x0.requires_grad else None
+        gx1 = sum_to_array(gy, self.x1_shape) if x1.requires_grad else None
         return gx0, gx1
 
+    def jvp(self, xs, ys, txs):
+        return add_tangents(ys[0].shape, *txs)
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
 
 def add(x0, x1):
     # Suppose x1 is not ndarray. e.g. x0 + x1 = Vairable(np.array(2.0)) + 3.0
@@ -189,17 +815,36 @@ def add(x0, x1):
 
 
 class Mul(Function):
+    __slots__ = ()
+
     def forward(self, x0, x1):
-        return x0 * x1
+        return apply_ufunc(np.multiply, x0, x1)
 
     def backward(self, gy):
         x0, x1 = self.inputs
-        gx0, gx1 = x1 * gy, x0 * gy
-        if x0.shape != x1.shape:
-            gx0 = dezero.functions.sum_to(gx0, x0.shape)
-            gx1 = dezero.functions.sum_to(gx1, x1.shape)
+        gx0 = gx1 = None
+        if x0.requires_grad:
+            gx0 = dezero.functions.sum_to(x1 * gy, x0.shape)
+        if x1.requires_grad:
+            gx1 = dezero.functions.sum_to(x0 * gy, x1.shape)
+        return gx0, gx1
+
+    def backward_array(self, gy):
+        x0, x1 = self.inputs
+        gx0 = gx1 = None
+        if x0.requires_grad:
+            gx0 = sum_to_array(apply_ufunc(np.multiply, x1.data, gy), x0.shape)
+        if x1.requires_grad:
+            gx1 = sum_to_array(apply_ufunc(np.multiply, x0.data, gy), x1.shape)
         return gx0, gx1
-        
+
+    def jvp(self, xs, ys, txs):
+        (x0, x1), (t0, t1) = xs, txs
+        return add_tangents(ys[0].shape, None if t0 is None else t0 * x1,
+                            None if t1 is None else x0 * t1)
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
 
 
 def mul(x0, x1):
@@ -209,28 +854,53 @@ def mul(x0, x1):
 
 
 class Neg(Function):
+    __slots__ = ()
+
     def forward(self, x):
-        return -x
+        return apply_ufunc(np.negative, x)
 
     def backward(self, gy):
         return -gy
 
+    def backward_array(self, gy):
+        return -gy
+
+    def jvp(self, xs, ys, txs):
+        return -txs[0]
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
 
 def neg(x):
     return Neg()(x)
 
 
 class Sub(Function):
+    __slots__ = ('x0_shape', 'x1_shape')
+
     def forward(self, x0, x1):
         self.x0_shape, self.x1_shape = x0.shape, x1.shape
-        return x0 - x1
+        return apply_ufunc(np.subtract, x0, x1)
 
     def backward(self, gy):
-        gx0, gx1 = gy, gy
-        if self.x0_shape != self.x1_shape:
-            gx0 = dezero.functions.sum_to(gx0, self.x0_shape)
-            gx1 = dezero.functions.sum_to(gx1, self.x1_shape)
-        return gx0, -gx1
+        x0, x1 = self.inputs
+        gx0 = dezero.functions.sum_to(gy, self.x0_shape) if x0.requires_grad else None
+        gx1 = -dezero.functions.sum_to(gy, self.x1_shape) if x1.requires_grad else None
+        return gx0, gx1
+
+    def backward_array(self, gy):
+        x0, x1 = self.inputs
+        gx0 = sum_to_array(gy, self.x0_shape) if x0.requires_grad else None
+        gx1 = -sum_to_array(gy, self.x1_shape) if x1.requires_grad else None
+        return gx0, gx1
+
+    def jvp(self, xs, ys, txs):
+        t0, t1 = txs
+        return add_tangents(ys[0].shape, t0, None if t1 is None else -t1)
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
 
 
 def sub(x0, x1):
@@ -246,18 +916,39 @@ def rsub(x0, x1):
 
 
 class Div(Function):
+    __slots__ = ()
+
     def forward(self, x0, x1):
-        return x0 / x1
+        return apply_ufunc(np.divide, x0, x1)
 
     def backward(self, gy):
         x0, x1 = self.inputs
-        gx0 = gy / x1
-        gx1 = gy * (-x0) / (x1 ** 2)
-        if x0.shape != x1.shape:
-            gx0 = dezero.functions.sum_to(gx0, x0.shape)
-            gx1 = dezero.functions.sum_to(gx1, x1.shape)
+        gx0 = gx1 = None
+        if x0.requires_grad:
+            gx0 = dezero.functions.sum_to(gy / x1, x0.shape)
+        if x1.requires_grad:
+            gx1 = dezero.functions.sum_to(gy * (-x0) / (x1 ** 2), x1.shape)
         return gx0, gx1
 
+    def backward_array(self, gy):
+        x0, x1 = self.inputs
+        gx0 = gx1 = None
+        g = gy / x1.data
+        if x1.requires_grad:
+            gx1 = sum_to_array(-g * x0.data / x1.data, x1.shape)
+        if x0.requires_grad:
+            gx0 = sum_to_array(g, x0.shape)
+        return gx0, gx1
+
+    def jvp(self, xs, ys, txs):
+        # d(x0 / x1) = (dx0 - y * dx1) / x1
+        (x0, x1), (t0, t1) = xs, txs
+        t = add_tangents(ys[0].shape, t0, None if t1 is None else -ys[0] * t1)
+        return t / x1
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
 
 def div(x0, x1):
     # Suppose x1 is not ndarray. e.g. x0 / x1 = Vairable(np.array(1.0)) / 3.0
@@ -272,11 +963,13 @@ def rdiv(x0, x1):
 
 
 class Pow(Function):
+    __slots__ = ('c',)
+
     def __init__(self, c):
         self.c = c
 
     def forward(self, x):
-        return x ** self.c
+        return apply_ufunc(np.power, x, self.c)
 
     def backward(self, gy):
         x, = self.inputs
@@ -284,6 +977,18 @@ class Pow(Function):
         gx = c * gy * (x ** (c - 1))
         return gx
 
+    def backward_array(self, gy):
+        x = self.inputs[0].data
+        c = self.c
+        return c * gy * (x ** (c - 1))
+
+    def jvp(self, xs, ys, txs):
+        c = self.c
+        return c * xs[0] ** (c - 1) * txs[0]
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
 
 def pow(x, c):
     return Pow(c)(x)
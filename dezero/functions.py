@@ -5,56 +5,98 @@ if '__file__' in globals():
 
 import numpy as np
 from dezero import utils
-from dezero.core import Function, as_variable
+from dezero.core import Function, Variable, as_variable, as_array, sum_to_array
+from dezero.core import apply_ufunc, matmul_array, zeros_array
+from dezero.core import Add, align_batched, batch_elementwise, vmap
+from dezero.core import using_config, no_grad, grad, add_tangents, Config
 
 # ---------------------------------------------------------
 # basic functions: sin / cos / tanh / exp
 # ---------------------------------------------------------
 class Sin(Function):
+    __slots__ = ()
+
     def forward(self, x):
-        return  np.sin(x)
+        return apply_ufunc(np.sin, x)
     
     def backward(self, gy):
         x, = self.inputs
         gx = gy * cos(x)
         return gx
 
+    def backward_array(self, gy):
+        x = self.inputs[0].data
+        return gy * np.cos(x)
+
+    def jvp(self, xs, ys, txs):
+        return np.cos(xs[0]) * txs[0]
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
 
 def sin(x):
     return Sin()(x)
 
 
 class Cos(Function):
+    __slots__ = ()
+
     def forward(self, x):
-        return np.cos(x)
+        return apply_ufunc(np.cos, x)
     
     def backward(self, gy):
         x, = self.inputs
         gx = gy * (-sin(x))
         return gx
 
+    def backward_array(self, gy):
+        x = self.inputs[0].data
+        return gy * -np.sin(x)
+
+    def jvp(self, xs, ys, txs):
+        return -np.sin(xs[0]) * txs[0]
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
 
 def cos(x):
     return Cos()(x)
 
 
 class Tanh(Function):
+    __slots__ = ()
+
     def forward(self, x):
-        return np.tanh(x)
+        return apply_ufunc(np.tanh, x)
     
     def backward(self, gy):
         y = self.outputs[0]()  # weakref
         gx = gy * (1 - y * y)
         return gx
 
+    def backward_array(self, gy):
+        y = self.outputs[0]().data
+        return gy * (1 - y * y)
+
+    def jvp(self, xs, ys, txs):
+        y = ys[0]
+        return (1 - y * y) * txs[0]
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
 
 def tanh(x):
     return Tanh()(x)
 
 
 class Exp(Function):
+    __slots__ = ()
+
     def forward(self, x):
-        return np.exp(x)
+        return apply_ufunc(np.exp, x)
     
 
     def backward(self, gy):
@@ -62,28 +104,52 @@ class Exp(Function):
         gx = y * gy
         return gx
 
+    def backward_array(self, gy):
+        y = self.outputs[0]().data
+        return y * gy
+
+    def jvp(self, xs, ys, txs):
+        return ys[0] * txs[0]
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
 
 def exp(x):
     return Exp()(x)
 
 
 class Log(Function):
+    __slots__ = ()
+
     def forward(self, x):
-        return np.log(x)
+        return apply_ufunc(np.log, x)
     
     def backward(self, gy):
         x, = self.inputs
         gx = gy / x
         return gx
 
+    def backward_array(self, gy):
+        x = self.inputs[0].data
+        return gy / x
+
+    def jvp(self, xs, ys, txs):
+        return txs[0] / xs[0]
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
 
 def log(x):
     return Log()(x)
 
 # ---------------------------------------------------------
-# tensor operations: reshape / transpose / get_item
+# tensor operations: reshape / transpose / concat / get_item
 # ---------------------------------------------------------
 class Reshape(Function):
+    __slots__ = ('shape', 'x_shape')
+
     def __init__(self, shape):
         self.shape = shape
 
@@ -94,7 +160,17 @@ class Reshape(Function):
     
     def backward(self, gy):
         return reshape(gy, self.x_shape)
-    
+
+    def backward_array(self, gy):
+        return gy.reshape(self.x_shape)
+
+    def jvp(self, xs, ys, txs):
+        return self.forward(*txs)
+
+    def batch_rule(self, inputs, batched):
+        x, = inputs
+        return Reshape((x.shape[0],) + tuple(self.shape))(x)
+
 
 def reshape(x, shape):
     if x.shape == shape:
@@ -103,19 +179,112 @@ def reshape(x, shape):
 
 
 class Transpose(Function):
+    __slots__ = ('axes',)
+
+    def __init__(self, axes=None):
+        self.axes = axes
+
     def forward(self, x):
-        return np.transpose(x)
+        return np.transpose(x, self.axes)
     
     def backward(self, gy):
-        gx = transpose(gy)
+        gx = transpose(gy, self.inverse_axes())
         return gx
-    
 
-def transpose(x):
-    return Transpose()(x)
+    def backward_array(self, gy):
+        return np.transpose(gy, self.inverse_axes())
+
+    def inverse_axes(self):
+        if self.axes is None:
+            return None
+        n = len(self.axes)
+        return tuple(np.argsort([a % n for a in self.axes]).tolist())
+
+    def jvp(self, xs, ys, txs):
+        return self.forward(*txs)
+
+    def batch_rule(self, inputs, batched):
+        x, = inputs
+        n = x.ndim - 1
+        if self.axes is None:
+            axes = tuple(range(n, 0, -1))
+        else:
+            axes = tuple(a % n + 1 for a in self.axes)
+        return transpose(x, (0,) + axes)
+
+
+def transpose(x, axes=None):
+    return Transpose(axes)(x)
+
+
+class SwapAxes(Function):
+    __slots__ = ('axis1', 'axis2')
+
+    def __init__(self, axis1, axis2):
+        self.axis1 = axis1
+        self.axis2 = axis2
+
+    def forward(self, x):
+        return np.swapaxes(x, self.axis1, self.axis2)
+
+    def backward(self, gy):
+        return swapaxes(gy, self.axis1, self.axis2)
+
+    def backward_array(self, gy):
+        return np.swapaxes(gy, self.axis1, self.axis2)
+
+    def jvp(self, xs, ys, txs):
+        return self.forward(*txs)
+
+    def batch_rule(self, inputs, batched):
+        # the axes count in the example, which lacks the batch axis
+        x, = inputs
+        n = x.ndim - 1
+        return SwapAxes(self.axis1 % n + 1, self.axis2 % n + 1)(x)
+
+
+def swapaxes(x, axis1, axis2):
+    return SwapAxes(axis1, axis2)(x)
+
+
+class Concat(Function):
+    """Join the inputs along axis. backward splits gy back into views."""
+    __slots__ = ('axis', 'sections')
+
+    def __init__(self, axis=0):
+        self.axis = axis
+
+    def forward(self, *xs):
+        self.sections = np.cumsum([x.shape[self.axis] for x in xs[:-1]]).tolist()
+        return np.concatenate(xs, axis=self.axis)
+
+    def backward(self, gy):
+        axis = self.axis % gy.ndim
+        bounds = [0] + self.sections + [gy.shape[axis]]
+        return tuple(get_item(gy, (slice(None),) * axis + (slice(start, stop),))
+                     for start, stop in zip(bounds[:-1], bounds[1:]))
+
+    def backward_array(self, gy):
+        return tuple(np.split(gy, self.sections, axis=self.axis))
+
+    def jvp(self, xs, ys, txs):
+        return np.concatenate([np.zeros_like(x) if tx is None else tx
+                               for x, tx in zip(xs, txs)], axis=self.axis)
+
+    def batch_rule(self, inputs, batched):
+        B = next(x.shape[0] for x, b in zip(inputs, batched) if b)
+        xs = [x if b else broadcast_to(x, (B,) + x.shape) for x, b in zip(inputs, batched)]
+        axis = self.axis + 1 if self.axis >= 0 else self.axis
+        return Concat(axis)(*xs)
+
+
+def concat(xs, axis=0):
+    return Concat(axis)(*xs)
 
 
 class GetItem(Function):
+    __slots__ = ('slices',)
+
     def __init__(self, slices):
         self.slices = slices
     
@@ -126,30 +295,130 @@ class GetItem(Function):
         x, = self.inputs
         f = GetItemGrad(self.slices, x.shape)
         return f(gy)
-    
+
+    def backward_array(self, gy):
+        x, = self.inputs
+        return scatter_add_array(gy, self.slices, x.shape, x.dtype)
+
+    def jvp(self, xs, ys, txs):
+        return self.forward(*txs)
+
+    def batch_rule(self, inputs, batched):
+        return GetItem(_batch_slices(self.slices))(*inputs)
+
 
 class GetItemGrad(Function):
+    __slots__ = ('slices', 'in_shape')
+
     def __init__(self, slices, in_shape):
         self.slices = slices
         self.in_shape = in_shape
     
     def forward(self, gy):
-        gx = np.zeros(self.in_shape)
-        np.add.at(gx, self.slices, gy)
-        return gx
+        return scatter_add_array(gy, self.slices, self.in_shape)
     
     def backward(self, ggx):
         return get_item(ggx, self.slices)
 
+    def backward_array(self, ggx):
+        return ggx[self.slices]
+
+    def jvp(self, xs, ys, txs):
+        return self.forward(*txs)
+
+    def batch_rule(self, inputs, batched):
+        gy, = inputs
+        in_shape = (gy.shape[0],) + tuple(self.in_shape)
+        return GetItemGrad(_batch_slices(self.slices), in_shape)(gy)
+
 
 def get_item(x, slices):
     return GetItem(slices)(x)
 
 
+def _batch_slices(slices):
+    if not isinstance(slices, tuple):
+        slices = (slices,)
+    return (slice(None),) + slices
+
+
+def scatter_add_array(gy, slices, shape, dtype=None):
+    """Return gx of the given shape with gx[slices] += gy (the backward of
+    x[slices]).
+
+    The strategy depends on the index:
+    - basic indices (ints, slices, Ellipsis, None) and a single boolean mask
+      select every element at most once, so gy is written into gx[slices];
+    - integer arrays on adjacent axes, with only full slices around them,
+      are raveled into one index along one axis. Duplicates are summed with
+      np.bincount when gy is 1-D and the index is dense in x; otherwise the
+      index is sorted and runs of duplicates are summed with np.add.reduceat
+      (or gy is just written when there are none);
+    - any other advanced index goes through np.add.at.
+
+    Args:
+        gy (ndarray): Gradient of x[slices].
+        slices: The index used at forward.
+        shape (tuple): Shape of x.
+        dtype: dtype of the result, gy's dtype if None.
+
+    Returns:
+        ndarray: gx.
+    """
+    dtype = gy.dtype if dtype is None else dtype
+    gx = zeros_array(shape, dtype)
+    index = slices if isinstance(slices, tuple) else (slices,)
+    index = tuple(np.asarray(i) if isinstance(i, list) else i for i in index)
+    arrays = [k for k, i in enumerate(index) if isinstance(i, np.ndarray)]
+
+    if not arrays or (len(arrays) == 1 and index[arrays[0]].dtype == bool):
+        gx[index] = gy
+        return gx
+
+    k, m = arrays[0], len(arrays)
+    full = slice(None)
+    if arrays != list(range(k, k + m)) or \
+            any(index[a].dtype.kind not in 'iu' for a in arrays) or \
+            any(i != full for i in index[:k]) or \
+            any(i is not Ellipsis and i != full for i in index[k + m:]):
+        np.add.at(gx, index, gy)
+        return gx
+
+    # one flat index into the m indexed axes of x
+    dims = shape[k:k + m]
+    idx = np.ravel_multi_index([a.ravel() for a in np.broadcast_arrays(*index[k:k + m])],
+                               dims, mode='wrap')
+    if idx.size == 0:
+        return gx
+    rest = shape[k + m:]
+    gx_flat = gx.reshape(shape[:k] + (-1,) + rest)
+    gy = np.reshape(gy, shape[:k] + (idx.size,) + rest)
+
+    if gy.ndim == 1 and 4 * idx.size >= gx.size:
+        gx[...] = np.bincount(idx, weights=gy, minlength=gx.size).reshape(shape)
+        return gx
+
+    order = np.argsort(idx, kind='stable')
+    sorted_idx = idx[order]
+    first = np.empty(idx.size, dtype=bool)
+    first[0] = True
+    np.not_equal(sorted_idx[1:], sorted_idx[:-1], out=first[1:])
+    axes = (full,) * k
+    if first.all():
+        gx_flat[axes + (idx,)] = gy
+    else:
+        starts = np.flatnonzero(first)
+        gy = np.add.reduceat(np.take(gy, order, axis=k), starts, axis=k)
+        gx_flat[axes + (sorted_idx[starts],)] = gy
+    return gx
+
+
 # ---------------------------------------------------------
 # aggregation functions: sum / broadcast_to / sum_to / tile / matmul
 # ---------------------------------------------------------
 class Sum(Function):
+    __slots__ = ('axis', 'keepdims', 'x_shape')
+
     def __init__(self, axis, keepdims):
         self.axis = axis
         self.keepdims = keepdims
@@ -163,12 +432,95 @@ class Sum(Function):
         gx = broadcast_to(gy, self.x_shape)
         return gx
 
+    def backward_array(self, gy):
+        gy = utils.reshape_sum_backward(gy, self.x_shape, self.axis, self.keepdims)
+        return np.broadcast_to(gy, self.x_shape)
+
+    def jvp(self, xs, ys, txs):
+        return self.forward(*txs)
+
+    def batch_rule(self, inputs, batched):
+        x, = inputs
+        return Sum(_batch_axis(self.axis, x.ndim), self.keepdims)(x)
+
 
 def sum(x, axis=None, keepdims=False):
     return Sum(axis, keepdims)(x)
 
 
+def mean(x, axis=None, keepdims=False):
+    x = as_variable(x)
+    y = sum(x, axis, keepdims)
+    # a scale of y's float dtype, so that float32 stays float32
+    dtype = y.dtype if y.dtype.kind == 'f' else np.float64
+    return y * np.array(y.data.size / x.data.size, dtype)
+
+
+class Max(Function):
+    """Maximum over `axis`. Ties share the gradient, as in Chainer."""
+    __slots__ = ('axis', 'keepdims', 'y')
+
+    def __init__(self, axis=None, keepdims=False):
+        self.axis = axis
+        self.keepdims = keepdims
+
+    def forward(self, x):
+        y = x.max(axis=self.axis, keepdims=self.keepdims)
+        # y with the reduced axes kept, a view used to build the mask
+        self.y = utils.reshape_sum_backward(y, x.shape, self.axis, self.keepdims)
+        return y
+
+    def mask(self, x):
+        return x == self.y
+
+    def backward(self, gy):
+        x, = self.inputs
+        gy = utils.reshape_sum_backward(gy, x.shape, self.axis, self.keepdims)
+        mask = Variable(self.mask(x.data).astype(gy.dtype), requires_grad=False)
+        return gy * mask
+
+    def backward_array(self, gy):
+        x, = self.inputs
+        gy = utils.reshape_sum_backward(gy, x.shape, self.axis, self.keepdims)
+        return gy * self.mask(x.data)
+
+    def jvp(self, xs, ys, txs):
+        ty = txs[0] * self.mask(xs[0])
+        return ty.sum(axis=self.axis, keepdims=self.keepdims)
+
+    def batch_rule(self, inputs, batched):
+        x, = inputs
+        return type(self)(_batch_axis(self.axis, x.ndim), self.keepdims)(x)
+
+
+class Min(Max):
+    __slots__ = ()
+
+    def forward(self, x):
+        y = x.min(axis=self.axis, keepdims=self.keepdims)
+        self.y = utils.reshape_sum_backward(y, x.shape, self.axis, self.keepdims)
+        return y
+
+
+def max(x, axis=None, keepdims=False):
+    return Max(axis, keepdims)(x)
+
+
+def min(x, axis=None, keepdims=False):
+    return Min(axis, keepdims)(x)
+
+
+def _batch_axis(axis, ndim):
+    """Shift a reduction axis of one example past the batch axis."""
+    if axis is None:
+        return tuple(range(1, ndim))
+    axis = (axis,) if isinstance(axis, int) else axis
+    return tuple(a + 1 if a >= 0 else a for a in axis)
+
+
 class BroadcastTo(Function):
+    __slots__ = ('shape', 'x_shape')
+
     def __init__(self, shape):
         self.shape = shape
 
@@ -180,6 +532,18 @@ class BroadcastTo(Function):
         gx = sum_to(gy, self.x_shape)
         return gx
 
+    def backward_array(self, gy):
+        return sum_to_array(gy, self.x_shape)
+
+    def jvp(self, xs, ys, txs):
+        return self.forward(*txs)
+
+    def batch_rule(self, inputs, batched):
+        x, = inputs
+        n = x.ndim - 1
+        x = reshape(x, x.shape[:1] + (1,) * (len(self.shape) - n) + x.shape[1:])
+        return broadcast_to(x, x.shape[:1] + tuple(self.shape))
+
 
 def broadcast_to(x, shape):
     if x.shape == shape:
@@ -188,6 +552,8 @@ def broadcast_to(x, shape):
 
 
 class SumTo(Function):
+    __slots__ = ('shape', 'x_shape')
+
     def __init__(self, shape):
         self.shape = shape
 
@@ -199,6 +565,18 @@ class SumTo(Function):
         gx = broadcast_to(gy, self.x_shape)
         return gx
 
+    def backward_array(self, gy):
+        return np.broadcast_to(gy, self.x_shape)
+
+    def jvp(self, xs, ys, txs):
+        return self.forward(*txs)
+
+    def batch_rule(self, inputs, batched):
+        x, = inputs
+        size, shape = x.shape[0], tuple(self.shape)
+        y = sum_to(x, (size,) + (1,) * (x.ndim - 1 - len(shape)) + shape)
+        return reshape(y, (size,) + shape)
+
 
 def sum_to(x, shape):
     if x.shape == shape:
@@ -207,20 +585,46 @@ def sum_to(x, shape):
 
 
 class Tile(Function):
+    """np.tile. Backward views gy as (reps_0, shape_0, reps_1, shape_1, ...)
+    and sums it over the rep axes, for any rank and reps."""
+    __slots__ = ('reps', 'x_shape', 'blocks', 'rep_axes')
+
     def __init__(self, reps):
         self.reps = reps
 
     def forward(self, x):
+        reps = (self.reps,) if isinstance(self.reps, int) else tuple(self.reps)
+        shape = (1,) * (len(reps) - x.ndim) + x.shape
+        reps = (1,) * (x.ndim - len(reps)) + reps
         self.x_shape = x.shape
-        self.x_ndim = x.ndim
+        self.blocks = tuple(n for pair in zip(reps, shape) for n in pair)
+        self.rep_axes = tuple(2 * i for i, r in enumerate(reps) if r != 1)
         return np.tile(x, self.reps)
-    
+
     def backward(self, gy):
-        if self.x_ndim == 1:
-            gx = gy[0, :self.shape[0]]
-        else:
-            gx = gy[:self.shape[0], :self.shape[1]]
-        return gx
+        gx = reshape(gy, self.blocks)
+        if self.rep_axes:
+            gx = sum(gx, axis=self.rep_axes)
+        return reshape(gx, self.x_shape)
+
+    def backward_array(self, gy):
+        gx = gy.reshape(self.blocks)
+        # One pass per tiled axis, outermost first: numpy reduces a leading
+        # axis as whole-block adds, which is several times faster than a
+        # single sum over the interleaved axes.
+        for axis in self.rep_axes:
+            gx = gx.sum(axis=axis, keepdims=True)
+        return gx.reshape(self.x_shape)
+
+    def jvp(self, xs, ys, txs):
+        return self.forward(*txs)
+
+    def batch_rule(self, inputs, batched):
+        x, = inputs
+        reps = (self.reps,) if isinstance(self.reps, int) else tuple(self.reps)
+        n = x.ndim - 1
+        x = reshape(x, x.shape[:1] + (1,) * (len(reps) - n) + x.shape[1:])
+        return tile(x, (1,) * (x.ndim - len(reps)) + reps)
 
 
 def tile(x, reps):
@@ -228,25 +632,118 @@ def tile(x, reps):
 
 
 class MatMul(Function):
+    """np.matmul, with its broadcasting over the leading (batch) axes.
+
+    As in np.matmul a 1-D x is a row vector and a 1-D W a column vector.
+    backward reduces each gradient back to its input's shape with sum_to;
+    when a 2-D W is shared by a full batch of x, gW is computed as one GEMM
+    over the folded batch instead of one product per batch entry.
+    """
+    __slots__ = ()
+
     def forward(self, x, W):
-        y = np.matmul(x, W)
+        y = matmul_array(x, W)
         return y
     
     def backward(self, gy):
         x, W = self.inputs
-        gx = matmul(gy, W.T)
-        gW= matmul(x.T, gy)
+        xm = reshape(x, (1,) + x.shape) if x.ndim == 1 else x
+        Wm = reshape(W, W.shape + (1,)) if W.ndim == 1 else W
+        gy = reshape(gy, _matmul_shape(xm.shape, Wm.shape))
+        gx = gW = None
+        if x.requires_grad:
+            gx = matmul(gy, swapaxes(Wm, -1, -2))
+            gx = reshape(sum_to(gx, xm.shape), x.shape)
+        if W.requires_grad:
+            if Wm.ndim == 2 and xm.shape[:-2] == gy.shape[:-2]:
+                gW = matmul(reshape(xm, (-1, xm.shape[-1])).T,
+                            reshape(gy, (-1, gy.shape[-1])))
+            else:
+                gW = sum_to(matmul(swapaxes(xm, -1, -2), gy), Wm.shape)
+            gW = reshape(gW, W.shape)
+        return gx, gW
+
+    def backward_array(self, gy):
+        x, W = self.inputs
+        xm = x.data.reshape((1,) + x.shape) if x.ndim == 1 else x.data
+        Wm = W.data.reshape(W.shape + (1,)) if W.ndim == 1 else W.data
+        gy = gy.reshape(_matmul_shape(xm.shape, Wm.shape))
+        gx = gW = None
+        if x.requires_grad:
+            gx = matmul_array(gy, np.swapaxes(Wm, -1, -2))
+            gx = sum_to_array(gx, xm.shape).reshape(x.shape)
+        if W.requires_grad:
+            if Wm.ndim == 2 and xm.shape[:-2] == gy.shape[:-2]:
+                gW = matmul_array(xm.reshape(-1, xm.shape[-1]).T,
+                                  gy.reshape(-1, gy.shape[-1]))
+            else:
+                gW = sum_to_array(matmul_array(np.swapaxes(xm, -1, -2), gy), Wm.shape)
+            gW = gW.reshape(W.shape)
         return gx, gW
 
+    def jvp(self, xs, ys, txs):
+        (x, W), (tx, tW) = xs, txs
+        return add_tangents(ys[0].shape, None if tx is None else np.matmul(tx, W),
+                            None if tW is None else np.matmul(x, tW))
+
+    def batch_rule(self, inputs, batched):
+        return _batch_matmul(inputs[0], inputs[1], batched[0], batched[1])
+
 
 def matmul(x, W):
     return MatMul()(x, W)
 
 
+def _matmul_shape(x_shape, W_shape):
+    """Shape of np.matmul of (at least 2-D) x and W."""
+    return np.broadcast_shapes(x_shape[:-2], W_shape[:-2]) + (x_shape[-2], W_shape[-1])
+
+
+def _batch_matmul(x, W, x_batched, W_batched):
+    """matmul of one example applied to a batch, where a batched operand
+    carries the batch on axis 0."""
+    if not W_batched and W.ndim <= 2:
+        # W has no batch axes of its own, so plain broadcasting is right;
+        # a 2-D W is one GEMM over the folded batch
+        if W.ndim == 2:
+            return _fold_batch(x, lambda x: matmul(x, W))
+        return matmul(x, W)
+
+    # Promote 1-D examples as np.matmul does, then pad both examples to the
+    # same rank right after the batch axis (as align_batched does) so that
+    # their batch axes pair up instead of broadcasting against each other.
+    B = x.shape[0] if x_batched else W.shape[0]
+    x_shape = x.shape[1:] if x_batched else x.shape
+    W_shape = W.shape[1:] if W_batched else W.shape
+    x_vec, W_vec = len(x_shape) == 1, len(W_shape) == 1
+    if x_vec:
+        x_shape = (1,) + x_shape
+    if W_vec:
+        W_shape = W_shape + (1,)
+    n = len(x_shape) if len(x_shape) > len(W_shape) else len(W_shape)
+    x = reshape(x, (B if x_batched else 1,) + (1,) * (n - len(x_shape)) + x_shape)
+    W = reshape(W, (B if W_batched else 1,) + (1,) * (n - len(W_shape)) + W_shape)
+
+    y = matmul(x, W)
+    shape = y.shape[:-2] + (() if x_vec else y.shape[-2:-1]) + (() if W_vec else y.shape[-1:])
+    return reshape(y, shape)
+
+
+def _fold_batch(x, f):
+    """Apply f, written for 2-D x, to x of shape (B, ..., k) by folding the
+    leading axes into one."""
+    if x.ndim <= 2:
+        return f(x)
+    y = f(reshape(x, (-1, x.shape[-1])))
+    return reshape(y, x.shape[:-1] + y.shape[-1:])
+
+
 # ---------------------------------------------------------
 # loss functions: mse / softmax_cross_entropy
 # ---------------------------------------------------------
 class MeanSquaredError(Function):
+    __slots__ = ()
+
     def forward(self, x0, x1):
         diff = x0 - x1
         return (diff ** 2).sum() / len(diff)
@@ -254,10 +751,31 @@ class MeanSquaredError(Function):
     def backward(self, gy):
         x0, x1 = self.inputs
         diff = x0 - x1
-        gx0 = gy * diff * (2. / len(diff))
-        gx1 = -gx0
+        g = gy * diff * (2. / len(diff))
+        gx0 = g if x0.requires_grad else None
+        gx1 = -g if x1.requires_grad else None
         return gx0, gx1
 
+    def backward_array(self, gy):
+        x0, x1 = self.inputs
+        diff = x0.data - x1.data
+        g = gy * diff * (2. / len(diff))
+        gx0 = g if x0.requires_grad else None
+        gx1 = -g if x1.requires_grad else None
+        return gx0, gx1
+
+    def jvp(self, xs, ys, txs):
+        (x0, x1), (t0, t1) = xs, txs
+        diff = x0 - x1
+        tdiff = add_tangents(diff.shape, t0, None if t1 is None else -t1)
+        return (diff * tdiff).sum() * (2. / len(diff))
+
+    def batch_rule(self, inputs, batched):
+        x0, x1 = align_batched(inputs, batched)
+        diff = x0 - x1
+        axis = tuple(range(1, diff.ndim))
+        return sum(diff ** 2, axis) / diff.shape[1]
+
 
 def mean_squared_error(x0, x1):
     return MeanSquaredError()(x0, x1)
@@ -283,23 +801,130 @@ def softmax_cross_entropy_simple(x, t):
     y = -1 * sum(tlog_p) / N
     return y
 
+
+def _pick_labels(a, t):
+    # a[..., n, t[..., n]], indexed through the flattened rows
+    return a.reshape(-1, a.shape[-1])[np.arange(t.size), t.ravel()].reshape(t.shape)
+
+
+class SoftmaxCrossEntropy(Function):
+    """Mean softmax cross entropy of logits x (N, C) and labels t (N,).
+
+    The loss is computed with log-sum-exp, so no probability is clipped and
+    large logits do not overflow. Only the softmax probabilities (N, C) are
+    kept for backward, which is (p - onehot(t)) / N. Leading axes of x and t
+    give one loss each, which is how the batch rule maps it over examples.
+    """
+    __slots__ = ('p',)
+
+    def forward(self, x, t):
+        N = x.shape[-2]
+        z = x - x.max(axis=-1, keepdims=True)
+        z_t = _pick_labels(z, t)
+        # integer logits: exp makes a new float array instead
+        p = np.exp(z, out=z) if _writable_float(z) else np.exp(z)
+        s = p.sum(axis=-1, keepdims=True)
+        p /= s
+        self.p = p
+        # log p[t] = z[t] - log(sum(exp(z)))
+        return (np.log(s)[..., 0].sum(axis=-1) - z_t.sum(axis=-1)) / N
+
+    def backward(self, gy):
+        x, t = self.inputs
+        N, C = x.shape[-2:]
+        onehot = np.eye(C, dtype=x.dtype)[t.data]
+        return (softmax(x, axis=-1) - onehot) * (reshape(gy, gy.shape + (1, 1)) / N), None
+
+    def backward_array(self, gy):
+        t = self.inputs[1].data
+        N, C = self.p.shape[-2:]
+        g = np.asarray(gy / N)[..., None, None]
+        # one (..., N, C) allocation; the onehot is subtracted in place
+        gx = self.p * g
+        gx.reshape(-1, C)[np.arange(t.size), t.ravel()] -= np.repeat(g.ravel(), N)
+        return gx, None
+
+    def jvp(self, xs, ys, txs):
+        t = xs[1]
+        tx = txs[0]
+        if tx is None:
+            return None
+        N = t.shape[-1]
+        return ((self.p * tx).sum(axis=(-2, -1)) - _pick_labels(tx, t).sum(axis=-1)) / N
+
+    def batch_rule(self, inputs, batched):
+        # the loss is per leading index, so the unbatched side is broadcast
+        B = next(x.shape[0] for x, b in zip(inputs, batched) if b)
+        x, t = [x if b else broadcast_to(x, (B,) + x.shape) for x, b in zip(inputs, batched)]
+        return SoftmaxCrossEntropy()(x, t)
+
+
+def softmax_cross_entropy(x, t):
+    return SoftmaxCrossEntropy()(x, t)
+
 # ---------------------------------------------------------
 # transformation functions: linear
 # ---------------------------------------------------------
 class Linear(Function):
+    """y = x @ W + b, computed on the raw arrays.
+
+    forward writes the GEMM into a fresh output buffer and adds b to it in
+    place. backward is two GEMMs (gx and gW) and one reduction (gb). x may
+    have any number of leading axes, which backward folds into the rows,
+    and b may be None.
+    """
+    __slots__ = ()
+
     def forward(self, x, W, b):
-        y = matmul(x, W)
+        y = matmul_array(x, W)
         if b is not None:
             y += b
         return y
-    
+
     def backward(self, gy):
         x, W, b = self.inputs
-        gb = None if b.data is None else sum_to(gy, b.shape)
-        gx = matmul(gy, W.T)
-        gW= matmul(x.T, gy)
+        gx = gW = gb = None
+        if x.requires_grad:
+            gx = matmul(gy, W.T)
+        gy2 = reshape(gy, (-1, gy.shape[-1]))
+        if W.requires_grad:
+            gW = matmul(reshape(x, (-1, x.shape[-1])).T, gy2)
+        if b.data is not None and b.requires_grad:
+            if b.size == gy2.shape[1]:
+                gb = reshape(sum_to(gy2, (1, gy2.shape[1])), b.shape)
+            else:
+                gb = sum_to(gy, b.shape)
         return gx, gW, gb
 
+    def backward_array(self, gy):
+        x, W, b = self.inputs
+        gx = gW = gb = None
+        if x.requires_grad:
+            gx = matmul_array(gy, W.data.T)
+        gy2 = gy.reshape(-1, gy.shape[-1])
+        if W.requires_grad:
+            gW = matmul_array(x.data.reshape(-1, x.shape[-1]).T, gy2)
+        if b.data is not None and b.requires_grad:
+            if b.size == gy2.shape[1]:
+                gb = gy2.sum(axis=0).reshape(b.shape)
+            else:
+                gb = sum_to_array(gy, b.shape)
+        return gx, gW, gb
+
+    def jvp(self, xs, ys, txs):
+        (x, W, b), (tx, tW, tb) = xs, txs
+        return add_tangents(ys[0].shape, None if tx is None else np.matmul(tx, W),
+                            None if tW is None else np.matmul(x, tW), tb)
+
+    def batch_rule(self, inputs, batched):
+        x, W, b = inputs
+        if not batched[1] and not batched[2]:
+            return _fold_batch(x, lambda x: linear(x, W, b))
+        y = _batch_matmul(x, W, batched[0], batched[1])
+        if b is None or (isinstance(b, Variable) and b.data is None):
+            return y
+        return batch_elementwise(Add(), [y, b], [True, batched[2]])
+
 
 def linear(x, W, b=None):
     return Linear()(x, W, b)
@@ -324,17 +949,269 @@ def sigmoid_simple(x):
     return y
 
 
-# TODO: refactor to class
+class Sigmoid(Function):
+    __slots__ = ()
+
+    def forward(self, x):
+        # tanh form: exp(-x) would overflow for large negative x
+        y = apply_ufunc(np.tanh, x * 0.5)
+        y *= 0.5
+        y += 0.5
+        return y
+
+    def backward(self, gy):
+        y = self.outputs[0]()  # weakref
+        gx = gy * y * (1 - y)
+        return gx
+
+    def backward_array(self, gy):
+        y = self.outputs[0]().data
+        return gy * y * (1 - y)
+
+    def jvp(self, xs, ys, txs):
+        y = ys[0]
+        return y * (1 - y) * txs[0]
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
+
+def sigmoid(x):
+    return Sigmoid()(x)
+
+
 def softmax_simple(x, axis=1):
     x = as_variable(x)
     y = exp(x)
     sum_y = sum(y, axis=axis, keepdims=True)
     return y / sum_y
 
+
+class Softmax(Function):
+    __slots__ = ('axis',)
+
+    def __init__(self, axis=1):
+        self.axis = axis
+
+    def forward(self, x):
+        y = x - x.max(axis=self.axis, keepdims=True)
+        y = np.exp(y, out=y) if _writable_float(y) else np.exp(y)
+        y /= y.sum(axis=self.axis, keepdims=True)
+        return y
+
+    def backward(self, gy):
+        y = self.outputs[0]()  # weakref
+        gx = y * gy
+        sumdx = gx.sum(axis=self.axis, keepdims=True)
+        gx = gx - y * sumdx
+        return gx
+
+    def backward_array(self, gy):
+        y = self.outputs[0]().data
+        gx = y * gy
+        gx -= y * gx.sum(axis=self.axis, keepdims=True)
+        return gx
+
+    def jvp(self, xs, ys, txs):
+        y = ys[0]
+        ty = y * txs[0]
+        ty -= y * ty.sum(axis=self.axis, keepdims=True)
+        return ty
+
+    def batch_rule(self, inputs, batched):
+        axis = self.axis + 1 if self.axis >= 0 else self.axis
+        return Softmax(axis)(*inputs)
+
+
+def softmax(x, axis=1):
+    return Softmax(axis)(x)
+
+
+# ---------------------------------------------------------
+# activation functions: relu / leaky_relu / elu / gelu
+# ---------------------------------------------------------
+class ReLU(Function):
+    """max(x, 0). backward only needs the boolean mask x > 0 (one byte per
+    element), which is computed once in forward."""
+    __slots__ = ('mask',)
+
+    def forward(self, x):
+        self.mask = x > 0
+        return apply_ufunc(np.maximum, x, 0)
+
+    def backward(self, gy):
+        return gy * self.mask
+
+    def backward_array(self, gy):
+        return gy * self.mask
+
+    def jvp(self, xs, ys, txs):
+        return txs[0] * self.mask
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
+
+def relu(x):
+    return ReLU()(x)
+
+
+class LeakyReLU(Function):
+    __slots__ = ('slope', 'mask')
+
+    def __init__(self, slope=0.2):
+        self.slope = slope
+
+    def forward(self, x):
+        self.mask = x > 0
+        return x * self.derivative(x.dtype if x.dtype.kind == 'f' else np.float64)
+
+    def derivative(self, dtype):
+        # 1 where x > 0, slope elsewhere; arithmetic rather than np.where,
+        # which is several times slower on a random mask
+        d = self.mask.astype(dtype)
+        d *= 1 - self.slope
+        d += self.slope
+        return d
+
+    def backward(self, gy):
+        return gy * self.derivative(gy.dtype)
+
+    def backward_array(self, gy):
+        d = self.derivative(gy.dtype)
+        d *= gy
+        return d
+
+    def jvp(self, xs, ys, txs):
+        return txs[0] * self.derivative(ys[0].dtype)
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
+
+def leaky_relu(x, slope=0.2):
+    return LeakyReLU(slope)(x)
+
+
+class ELU(Function):
+    """x for x > 0, alpha * (exp(x) - 1) otherwise. The derivative, 1 or
+    y + alpha, is taken from the saved output (y > 0 exactly where x > 0)."""
+    __slots__ = ('alpha',)
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+
+    def forward(self, x):
+        y = np.minimum(x, 0)
+        # out= needs an ndarray of float dtype (0-d inputs give scalars)
+        y = np.expm1(y, out=y) if _writable_float(y) else np.expm1(y)
+        y *= self.alpha
+        y += np.maximum(x, 0)
+        return y
+
+    def backward(self, gy):
+        y = self.outputs[0]()  # weakref
+        pos = (y.data > 0).astype(y.dtype)
+        return gy * ((y + self.alpha) * (1 - pos) + pos)
+
+    def backward_array(self, gy):
+        d = self.derivative_array(self.outputs[0]().data)
+        d *= gy
+        return d
+
+    def derivative_array(self, y):
+        # min(y, 0) + alpha is y + alpha where y <= 0 and alpha where y > 0
+        d = np.minimum(y, 0)
+        d += self.alpha
+        if self.alpha != 1:
+            pos = (y > 0).astype(d.dtype)
+            pos *= 1 - self.alpha
+            d += pos
+        return d
+
+    def jvp(self, xs, ys, txs):
+        return txs[0] * self.derivative_array(ys[0])
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
+
+def elu(x, alpha=1.0):
+    return ELU(alpha)(x)
+
+
+def _writable_float(x):
+    return isinstance(x, np.ndarray) and x.dtype.kind == 'f'
+
+
+class GELU(Function):
+    """GELU, tanh approximation. The tanh term is saved so that backward
+    does not evaluate tanh again (the derivative also depends on x)."""
+    __slots__ = ('t',)
+
+    C = float(np.sqrt(2 / np.pi))
+    K = 0.044715
+
+    def forward(self, x):
+        if x.dtype.kind != 'f':
+            x = x.astype(np.float64)
+        # x * x * x: x ** 3 goes through the much slower np.power
+        t = x * x
+        t *= self.K
+        t += 1
+        t *= x
+        t *= self.C
+        t = np.tanh(t, out=t) if _writable_float(t) else np.tanh(t)
+        self.t = t
+        y = t + 1
+        y *= x
+        y *= 0.5
+        return y
+
+    def backward(self, gy):
+        x, = self.inputs
+        t = tanh(self.C * (x + self.K * x * x * x))
+        d = 0.5 * (1 + t) + 0.5 * x * (1 - t * t) * self.C * (1 + 3 * self.K * x * x)
+        return gy * d
+
+    def backward_array(self, gy):
+        d = self.derivative_array(self.inputs[0].data)
+        d *= gy
+        return d
+
+    def derivative_array(self, x):
+        # 0.5 * (1 + t) + 0.5 * x * (1 - t^2) * C * (1 + 3K x^2)
+        if x.dtype.kind != 'f':
+            x = x.astype(np.float64)  # as in forward
+        t = self.t
+        d = x * x
+        d *= 3 * self.K
+        d += 1
+        d *= x
+        d *= (1 - t * t)
+        d *= self.C
+        d += 1
+        d += t
+        d *= 0.5
+        return d
+
+    def jvp(self, xs, ys, txs):
+        return txs[0] * self.derivative_array(xs[0])
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
+
+def gelu(x):
+    return GELU()(x)
+
+
 # ---------------------------------------------------------
 # utility functions: clip
 # ---------------------------------------------------------
 class Clip(Function):
+    __slots__ = ('x_min', 'x_max')
+
     def __init__(self, x_min, x_max):
         self.x_min = x_min
         self.x_max = x_max
@@ -348,6 +1225,93 @@ class Clip(Function):
         gx = gy * mask
         return gx
 
+    def backward_array(self, gy):
+        x = self.inputs[0].data
+        mask = (x >= self.x_min) * (x <= self.x_max)
+        return gy * mask
+
+    def jvp(self, xs, ys, txs):
+        x = xs[0]
+        return txs[0] * ((x >= self.x_min) * (x <= self.x_max))
+
+    def batch_rule(self, inputs, batched):
+        return batch_elementwise(self, inputs, batched)
+
 
 def clip(x, x_min, x_max):
     return Clip(x_min, x_max)(x)
+
+
+# ---------------------------------------------------------
+# memory saving: checkpoint
+# ---------------------------------------------------------
+class Checkpoint(Function):
+    """Run fn without keeping its graph and recompute it in backward.
+
+    Only the input of fn and its output survive the forward pass; the
+    intermediate Variables are rebuilt from the input when the gradient is
+    needed. The Parameters fn uses are passed as extra inputs so that their
+    gradients flow through this Function like any other input's. Without
+    create_graph the recomputed graph is differentiated once and dropped;
+    with it the recomputation is kept, so the gradients can be
+    differentiated again.
+    """
+    __slots__ = ('fn',)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def forward(self, x, *params):
+        # Tangents, if any, are computed by jvp on a second run of fn.
+        with no_grad(), using_config('tangents', None):
+            y = self.fn(Variable(x))
+        return y.data
+
+    def backward(self, gy):
+        # recompute on the inputs themselves, so that the graph of the
+        # gradients leads back to them
+        inputs = self.inputs
+        with using_config('enable_backprop', True):
+            y = self.fn(inputs[0])
+            return tuple(grad(y, inputs, grad_outputs=gy, create_graph=True))
+
+    def backward_array(self, gy):
+        x, params = self.inputs[0], self.inputs[1:]
+        x = Variable(x.data, requires_grad=x.requires_grad)
+        with using_config('enable_backprop', True):
+            y = self.fn(x)
+
+        gxs = grad(y, [x, *params], grad_outputs=gy)
+        return tuple(None if gx is None else gx.data for gx in gxs)
+
+    def jvp(self, xs, ys, txs):
+        # The Parameters are the objects fn reads, so their tangents are
+        # already in the table; only the copy of x needs one.
+        x = Variable(xs[0], requires_grad=False)
+        tangents = Config.tangents
+        if txs[0] is not None:
+            tangents[x] = txs[0]
+        with no_grad():
+            y = self.fn(x)
+        return tangents.get(y)
+
+    def batch_rule(self, inputs, batched):
+        if not batched[0] or any(batched[1:]):
+            raise NotImplementedError('vmap of checkpoint maps over its input only.')
+        return Checkpoint(vmap(self.fn))(*inputs)
+
+
+def checkpoint(fn, x, params=()):
+    return Checkpoint(fn)(x, *params)
+
+
+# ---------------------------------------------------------
+# conv2d / pooling
+# ---------------------------------------------------------
+from dezero.functions_conv import conv2d, pooling, average_pooling
+
+
+# ---------------------------------------------------------
+# recurrent cells: lstm / gru
+# ---------------------------------------------------------
+from dezero.functions_rnn import lstm, gru
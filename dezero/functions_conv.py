@@ -0,0 +1,346 @@
+import functools
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from dezero import utils
+from dezero.core import Function, Variable, add_tangents, matmul_array, zeros_array
+from dezero.functions import reshape, transpose, swapaxes, broadcast_to, matmul, sum
+
+
+# ---------------------------------------------------------
+# im2col / col2im
+# ---------------------------------------------------------
+class Conv2dPlan:
+    """Geometry of im2col for one (input shape, kernel, stride, pad).
+
+    Plans are cached by `get_conv_plan`, so repeated batches of the same
+    shape reuse the output size, the padded shape and the strided window
+    slices col2im adds the columns through.
+    """
+    __slots__ = ('x_shape', 'kernel_size', 'stride', 'pad', 'out_size',
+                 'padded_shape', 'col_shape', 'windows', 'disjoint')
+
+    def __init__(self, x_shape, kernel_size, stride, pad):
+        N, C, H, W = x_shape
+        KH, KW = kernel_size
+        SH, SW = stride
+        PH, PW = pad
+        OH = utils.get_conv_outsize(H, KH, SH, PH)
+        OW = utils.get_conv_outsize(W, KW, SW, PW)
+
+        self.x_shape = x_shape
+        self.kernel_size = kernel_size
+        self.stride = stride
+        self.pad = pad
+        self.out_size = (OH, OW)
+        self.padded_shape = (N, C, H + 2 * PH, W + 2 * PW)
+        self.col_shape = (N, C, OH, OW, KH, KW)
+        # pixels (i, j) of every window, as slices of the padded image
+        self.windows = [(i, j, slice(i, i + SH * OH, SH), slice(j, j + SW * OW, SW))
+                        for i in range(KH) for j in range(KW)]
+        # windows that do not overlap write each pixel at most once
+        self.disjoint = SH >= KH and SW >= KW
+
+    def unpad(self, img):
+        """(N, C, H + 2*PH, W + 2*PW) -> view of the (N, C, H, W) image"""
+        N, C, H, W = self.x_shape
+        PH, PW = self.pad
+        return img[:, :, PH:PH + H, PW:PW + W]
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_plan(x_shape, kernel_size, stride, pad):
+    return Conv2dPlan(x_shape, kernel_size, stride, pad)
+
+
+def get_conv_plan(x_shape, kernel_size, stride=1, pad=0):
+    return _cached_plan(tuple(x_shape), utils.pair(kernel_size),
+                        utils.pair(stride), utils.pair(pad))
+
+
+def im2col_array(x, plan, pad_value=0):
+    """Return the windows of x as a read-only (N, C, OH, OW, KH, KW) view.
+
+    Only the padding is copied; the windows are strides over the (padded)
+    image, so no gather index is built.
+    """
+    PH, PW = plan.pad
+    if PH or PW:
+        x = np.pad(x, ((0, 0), (0, 0), (PH, PH), (PW, PW)),
+                   mode='constant', constant_values=pad_value)
+    sN, sC, sH, sW = x.strides
+    SH, SW = plan.stride
+    return as_strided(x, plan.col_shape, (sN, sC, sH * SH, sW * SW, sH, sW),
+                      writeable=False)
+
+
+def col2im_array(col, plan):
+    """Sum the (N, C, OH, OW, KH, KW) windows back into an (N, C, H, W) image.
+
+    One strided add per kernel pixel (KH * KW in all) instead of np.add.at.
+    """
+    img = zeros_array(plan.padded_shape, col.dtype)
+    for i, j, h, w in plan.windows:
+        if plan.disjoint:
+            img[:, :, h, w] = col[:, :, :, :, i, j]
+        else:
+            img[:, :, h, w] += col[:, :, :, :, i, j]
+    return plan.unpad(img)
+
+
+class Im2col(Function):
+    __slots__ = ('plan',)
+
+    def __init__(self, plan):
+        self.plan = plan
+
+    def forward(self, x):
+        return im2col_array(x, self.plan)
+
+    def backward(self, gy):
+        return col2im(gy, self.plan)
+
+    def backward_array(self, gy):
+        return col2im_array(gy, self.plan)
+
+    def jvp(self, xs, ys, txs):
+        return self.forward(*txs)
+
+
+class Col2im(Function):
+    __slots__ = ('plan',)
+
+    def __init__(self, plan):
+        self.plan = plan
+
+    def forward(self, col):
+        return col2im_array(col, self.plan)
+
+    def backward(self, gx):
+        return im2col(gx, self.plan)
+
+    def backward_array(self, gx):
+        return im2col_array(gx, self.plan)
+
+    def jvp(self, xs, ys, txs):
+        return self.forward(*txs)
+
+
+def im2col(x, plan):
+    return Im2col(plan)(x)
+
+
+def col2im(col, plan):
+    return Col2im(plan)(col)
+
+
+def _fold_images(x, f):
+    """Apply f, written for (N, C, H, W) x, to x with more leading axes."""
+    y = f(reshape(x, (-1,) + x.shape[-3:]))
+    return reshape(y, x.shape[:-3] + y.shape[1:])
+
+
+# ---------------------------------------------------------
+# conv2d / pooling / average_pooling
+# ---------------------------------------------------------
+class Conv2d(Function):
+    """2-D convolution as a GEMM over the im2col matrix.
+
+    x is (N, C, H, W), W is (OC, C, KH, KW) and b is (OC,) or None. forward
+    copies the windows of x into an (N, C*KH*KW, OH*OW) column array, which
+    is kept for gW, and multiplies the (OC, C*KH*KW) weights by it with one
+    batched matmul. Both the copy and the output stay in x's (N, C, H, W)
+    layout, so no transpose is needed on either side. backward is two
+    batched GEMMs, a col2im and one reduction for gb.
+    """
+    __slots__ = ('stride', 'pad', 'plan', 'col')
+
+    def __init__(self, stride=1, pad=0):
+        self.stride = utils.pair(stride)
+        self.pad = utils.pair(pad)
+
+    def forward(self, x, W, b):
+        OC = W.shape[0]
+        self.plan = plan = get_conv_plan(x.shape, W.shape[2:], self.stride, self.pad)
+        N, (OH, OW) = x.shape[0], plan.out_size
+        col = im2col_array(x, plan).transpose(0, 1, 4, 5, 2, 3)
+        self.col = col = np.ascontiguousarray(col).reshape(N, -1, OH * OW)
+        y = matmul_array(W.reshape(OC, -1), col)
+        if b is not None:
+            y += b.reshape(-1, 1)
+        return y.reshape(N, OC, OH, OW)
+
+    def backward(self, gy):
+        x, W, b = self.inputs
+        N, OC, OH, OW = gy.shape
+        gy3 = reshape(gy, (N, OC, OH * OW))
+        gx = gW = gb = None
+        if x.requires_grad:
+            gcol = matmul(reshape(W, (OC, -1)).T, gy3)
+            gcol = reshape(gcol, (N,) + W.shape[1:] + (OH, OW))
+            gx = col2im(transpose(gcol, (0, 1, 4, 5, 2, 3)), self.plan)
+        if W.requires_grad:
+            col = transpose(im2col(x, self.plan), (0, 1, 4, 5, 2, 3))
+            col = reshape(col, (N, -1, OH * OW))
+            gW = reshape(sum(matmul(gy3, swapaxes(col, 1, 2)), axis=0), W.shape)
+        if b.data is not None and b.requires_grad:
+            gb = sum(gy3, axis=(0, 2))
+        return gx, gW, gb
+
+    def backward_array(self, gy):
+        x, W, b = self.inputs
+        N, OC, OH, OW = gy.shape
+        gy3 = gy.reshape(N, OC, OH * OW)
+        gx = gW = gb = None
+        if x.requires_grad:
+            gcol = matmul_array(W.data.reshape(OC, -1).T, gy3)
+            gcol = gcol.reshape((N,) + W.shape[1:] + (OH, OW))
+            gx = col2im_array(gcol.transpose(0, 1, 4, 5, 2, 3), self.plan)
+        if W.requires_grad:
+            gW = matmul_array(gy3, self.col.transpose(0, 2, 1))
+            gW = gW.sum(axis=0).reshape(W.shape)
+        if b.data is not None and b.requires_grad:
+            gb = gy3.sum(axis=(0, 2))
+        return gx, gW, gb
+
+    def jvp(self, xs, ys, txs):
+        (x, W, b), (tx, tW, tb) = xs, txs
+        f = Conv2d(self.stride, self.pad)
+        return add_tangents(ys[0].shape,
+                            None if tx is None else f.forward(tx, W, None),
+                            None if tW is None else f.forward(x, tW, None),
+                            None if tb is None else tb.reshape(-1, 1, 1))
+
+    def batch_rule(self, inputs, batched):
+        x, W, b = inputs
+        if batched[1] or batched[2]:
+            raise NotImplementedError('vmap of conv2d maps over x only.')
+        return _fold_images(x, lambda x: conv2d(x, W, b, self.stride, self.pad))
+
+
+def conv2d(x, W, b=None, stride=1, pad=0):
+    return Conv2d(stride, pad)(x, W, b)
+
+
+def _lowest(dtype):
+    """Padding value of max pooling: below every value of dtype, so integer
+    images keep their dtype."""
+    if dtype.kind in 'iu':
+        return np.iinfo(dtype).min
+    return -np.inf
+
+
+class Pooling(Function):
+    """Max pooling. The gradient goes to the first maximum of each window."""
+    __slots__ = ('kernel_size', 'stride', 'pad', 'plan', 'y')
+
+    def __init__(self, kernel_size, stride=1, pad=0):
+        self.kernel_size = utils.pair(kernel_size)
+        self.stride = utils.pair(stride)
+        self.pad = utils.pair(pad)
+
+    def forward(self, x):
+        self.plan = plan = get_conv_plan(x.shape, self.kernel_size, self.stride, self.pad)
+        col = im2col_array(x, plan, _lowest(x.dtype))
+        # one np.maximum per kernel pixel; an argmax over the tiny window
+        # axis is several times slower
+        y = None
+        for i, j, _, _ in plan.windows:
+            if y is None:
+                y = col[:, :, :, :, i, j].copy()
+            else:
+                np.maximum(y, col[:, :, :, :, i, j], out=y)
+        self.y = y
+        return y
+
+    def first_max(self, x):
+        """Yield (i, j, h, w, m) per kernel pixel (i, j): m marks the windows
+        whose first maximum is that pixel, h and w are the pixel's slices of
+        the padded image."""
+        col = im2col_array(x, self.plan, _lowest(x.dtype))
+        taken = np.zeros(self.y.shape, bool)
+        for i, j, h, w in self.plan.windows:
+            m = col[:, :, :, :, i, j] == self.y
+            m &= ~taken
+            taken |= m
+            yield i, j, h, w, m
+
+    def mask(self, x):
+        """One-hot (N, C, OH, OW, KH, KW) of the first maximum of each window."""
+        mask = np.zeros(self.plan.col_shape, self.y.dtype)
+        for i, j, _, _, m in self.first_max(x):
+            mask[:, :, :, :, i, j] = m
+        return mask
+
+    def backward(self, gy):
+        mask = Variable(self.mask(self.inputs[0].data), requires_grad=False)
+        gcol = reshape(gy, gy.shape + (1, 1)) * mask
+        return col2im(gcol, self.plan)
+
+    def backward_array(self, gy):
+        # col2im fused with the mask, without the (N, C, OH, OW, KH, KW) array
+        plan = self.plan
+        img = zeros_array(plan.padded_shape, gy.dtype)
+        for _, _, h, w, m in self.first_max(self.inputs[0].data):
+            if plan.disjoint:
+                img[:, :, h, w] = gy * m
+            else:
+                img[:, :, h, w] += gy * m
+        return plan.unpad(img)
+
+    def jvp(self, xs, ys, txs):
+        col = im2col_array(txs[0], self.plan) * self.mask(xs[0])
+        return col.sum(axis=(4, 5))
+
+    def batch_rule(self, inputs, batched):
+        return _fold_images(inputs[0], lambda x: pooling(
+            x, self.kernel_size, self.stride, self.pad))
+
+
+def pooling(x, kernel_size, stride=1, pad=0):
+    return Pooling(kernel_size, stride, pad)(x)
+
+
+class AveragePooling(Function):
+    """Average pooling. Padded pixels count as zeros."""
+    __slots__ = ('kernel_size', 'stride', 'pad', 'plan')
+
+    def __init__(self, kernel_size, stride=1, pad=0):
+        self.kernel_size = utils.pair(kernel_size)
+        self.stride = utils.pair(stride)
+        self.pad = utils.pair(pad)
+
+    def forward(self, x):
+        self.plan = plan = get_conv_plan(x.shape, self.kernel_size, self.stride, self.pad)
+        col = im2col_array(x, plan)
+        # the mean of integers is float, as in np.mean
+        dtype = x.dtype if x.dtype.kind == 'f' else np.float64
+        y = None
+        for i, j, _, _ in plan.windows:
+            if y is None:
+                y = col[:, :, :, :, i, j].astype(dtype)
+            else:
+                y += col[:, :, :, :, i, j]
+        y /= len(plan.windows)
+        return y
+
+    def backward(self, gy):
+        KH, KW = self.kernel_size
+        scale = np.array(1 / (KH * KW), gy.dtype)
+        gcol = reshape(gy, gy.shape + (1, 1)) * scale
+        return col2im(broadcast_to(gcol, self.plan.col_shape), self.plan)
+
+    def backward_array(self, gy):
+        KH, KW = self.kernel_size
+        gcol = (gy * np.array(1 / (KH * KW), gy.dtype))[..., None, None]
+        return col2im_array(np.broadcast_to(gcol, self.plan.col_shape), self.plan)
+
+    def jvp(self, xs, ys, txs):
+        return self.forward(*txs)
+
+    def batch_rule(self, inputs, batched):
+        return _fold_images(inputs[0], lambda x: average_pooling(
+            x, self.kernel_size, self.stride, self.pad))
+
+
+def average_pooling(x, kernel_size, stride=1, pad=0):
+    return AveragePooling(kernel_size, stride, pad)(x)
@@ -0,0 +1,223 @@
+import numpy as np
+from dezero.core import Function, Variable
+from dezero.functions import broadcast_to, concat, sigmoid, tanh
+
+
+def _sigmoid_array(x, out):
+    # tanh form as in Sigmoid, written into out
+    np.multiply(x, 0.5, out=out)
+    np.tanh(out, out=out)
+    out *= 0.5
+    out += 0.5
+    return out
+
+
+def _float_dtype(*xs):
+    # the gates are activated in place, so integer inputs get a float result
+    dtype = np.result_type(*xs)
+    return dtype if dtype.kind == 'f' else np.dtype(np.float64)
+
+
+def _split(x, n):
+    """Views of the n equal chunks of the last axis."""
+    H = x.shape[-1] // n
+    return [x[..., k * H:(k + 1) * H] for k in range(n)]
+
+
+def _broadcast_batched(inputs, batched):
+    # the cells expect inputs with the same leading axes
+    B = next(x.shape[0] for x, b in zip(inputs, batched) if b)
+    return [x if b else broadcast_to(x, (B,) + x.shape) for x, b in zip(inputs, batched)]
+
+
+# ---------------------------------------------------------
+# lstm / gru
+# ---------------------------------------------------------
+class LSTM(Function):
+    """One LSTM step on precomputed gates: c, h = lstm(c_prev, gates).
+
+    gates (N, 4H) holds the pre-activations of the cell input a and of the
+    input, forget and output gates i, f, o, in that order along the last
+    axis, and c_prev (N, H) the previous cell state:
+
+        c = tanh(a) * sigmoid(i) + sigmoid(f) * c_prev
+        h = sigmoid(o) * tanh(c)
+
+    The four activations and the cell update are one Function instead of a
+    dozen, and backward reuses the activated gates and tanh(c) kept by
+    forward.
+    """
+    __slots__ = ('acts', 'tanh_c')
+
+    def forward(self, c_prev, gates):
+        H = c_prev.shape[-1]
+        acts = np.empty(gates.shape, _float_dtype(c_prev, gates))
+        np.tanh(gates[..., :H], out=acts[..., :H])
+        _sigmoid_array(gates[..., H:], acts[..., H:])
+        a, i, f, o = _split(acts, 4)
+
+        c = f * c_prev
+        c += a * i
+        tanh_c = np.tanh(c)
+        h = o * tanh_c
+        self.acts, self.tanh_c = acts, tanh_c
+        return c, h
+
+    def backward(self, gc, gh):
+        # rebuilt from the inputs so that the gradients can be
+        # differentiated again
+        c_prev, gates = self.inputs
+        a, i, f, o = _split(gates, 4)
+        a, i, f, o = tanh(a), sigmoid(i), sigmoid(f), sigmoid(o)
+        tanh_c = tanh(a * i + f * c_prev)
+
+        if gh is None:
+            go = Variable(np.zeros_like(o.data), requires_grad=False)
+        else:
+            go = gh * tanh_c * o * (1 - o)
+            g = gh * o * (1 - tanh_c * tanh_c)
+            gc = g if gc is None else gc + g
+        ga = gc * i * (1 - a * a)
+        gi = gc * a * i * (1 - i)
+        gf = gc * c_prev * f * (1 - f)
+        return gc * f, concat([ga, gi, gf, go], axis=-1)
+
+    def backward_array(self, gc, gh):
+        c_prev = self.inputs[0].data
+        a, i, f, o = _split(self.acts, 4)
+        tanh_c = self.tanh_c
+
+        ggates = np.empty_like(self.acts)
+        ga, gi, gf, go = _split(ggates, 4)
+        if gh is None:
+            go[...] = 0
+        else:
+            np.multiply(gh, tanh_c, out=go)
+            go *= o * (1 - o)
+            g = gh * o
+            g *= 1 - tanh_c * tanh_c
+            if gc is not None:
+                g += gc
+            gc = g
+        np.multiply(gc, i, out=ga)
+        ga *= 1 - a * a
+        np.multiply(gc, a, out=gi)
+        gi *= i * (1 - i)
+        np.multiply(gc, c_prev, out=gf)
+        gf *= f * (1 - f)
+        return gc * f, ggates
+
+    def jvp(self, xs, ys, txs):
+        c_prev, gates = xs
+        tc_prev, tgates = txs
+        a, i, f, o = _split(self.acts, 4)
+        tc = np.zeros_like(c_prev) if tc_prev is None else f * tc_prev
+        if tgates is not None:
+            ta, ti, tf, to = _split(tgates, 4)
+            tc = tc + ta * (1 - a * a) * i + a * ti * i * (1 - i) + tf * f * (1 - f) * c_prev
+        th = o * (1 - self.tanh_c * self.tanh_c) * tc
+        if tgates is not None:
+            th += to * o * (1 - o) * self.tanh_c
+        return tc, th
+
+    def batch_rule(self, inputs, batched):
+        return LSTM()(*_broadcast_batched(inputs, batched))
+
+
+def lstm(c_prev, gates):
+    return LSTM()(c_prev, gates)
+
+
+class GRU(Function):
+    """One GRU step: h = gru(h_prev, gx, gh).
+
+    gx and gh (N, 3H) are the projections of the input and of h_prev (N, H),
+    each holding the reset gate r, the update gate z and the candidate n in
+    that order along the last axis. The reset gate scales the projection of
+    h_prev, so the two cannot be summed before the cell:
+
+        r = sigmoid(gx_r + gh_r)
+        z = sigmoid(gx_z + gh_z)
+        n = tanh(gx_n + r * gh_n)
+        h = (1 - z) * n + z * h_prev
+
+    forward keeps r, z and n for backward.
+    """
+    __slots__ = ('acts',)
+
+    def forward(self, h_prev, gx, gh):
+        acts = np.add(gx, gh, dtype=_float_dtype(h_prev, gx, gh))
+        H = h_prev.shape[-1]
+        rz = acts[..., :2 * H]
+        _sigmoid_array(rz, rz)
+        r, z, n = _split(acts, 3)
+        np.multiply(r, gh[..., 2 * H:], out=n)
+        n += gx[..., 2 * H:]
+        np.tanh(n, out=n)
+
+        h = h_prev - n
+        h *= z
+        h += n
+        self.acts = acts
+        return h
+
+    def backward(self, gy):
+        h_prev, gx, gh = self.inputs
+        gx_r, gx_z, gx_n = _split(gx, 3)
+        gh_r, gh_z, gh_n = _split(gh, 3)
+        r, z = sigmoid(gx_r + gh_r), sigmoid(gx_z + gh_z)
+        n = tanh(gx_n + r * gh_n)
+
+        gz = gy * (h_prev - n) * z * (1 - z)
+        gn = gy * (1 - z) * (1 - n * n)
+        gr = gn * gh_n * r * (1 - r)
+        return gy * z, concat([gr, gz, gn], axis=-1), concat([gr, gz, gn * r], axis=-1)
+
+    def backward_array(self, gy):
+        h_prev, gh = self.inputs[0].data, self.inputs[2].data
+        r, z, n = _split(self.acts, 3)
+
+        ggx = np.empty_like(self.acts)
+        gr, gz, gn = _split(ggx, 3)
+        np.subtract(h_prev, n, out=gz)
+        gz *= gy
+        gz *= z * (1 - z)
+        np.multiply(gy, 1 - z, out=gn)
+        gn *= 1 - n * n
+        np.multiply(gn, _split(gh, 3)[2], out=gr)
+        gr *= r * (1 - r)
+
+        ggh = ggx.copy()
+        _split(ggh, 3)[2] *= r
+        return gy * z, ggx, ggh
+
+    def jvp(self, xs, ys, txs):
+        h_prev, gx, gh = xs
+        th_prev, tgx, tgh = txs
+        r, z, n = _split(self.acts, 3)
+        t = np.zeros_like(self.acts)
+        if tgx is not None:
+            t += tgx
+        tgh_n = None
+        if tgh is not None:
+            t[..., :-n.shape[-1]] += tgh[..., :-n.shape[-1]]
+            tgh_n = _split(tgh, 3)[2]
+        tr, tz, tn = _split(t, 3)
+        tr *= r * (1 - r)
+        tz *= z * (1 - z)
+        tn += tr * _split(gh, 3)[2]
+        if tgh_n is not None:
+            tn += r * tgh_n
+        tn *= 1 - n * n
+
+        ty = tn + tz * (h_prev - n) - z * tn
+        if th_prev is not None:
+            ty += z * th_prev
+        return ty
+
+    def batch_rule(self, inputs, batched):
+        return GRU()(*_broadcast_batched(inputs, batched))
+
+
+def gru(h_prev, gx, gh):
+    return GRU()(h_prev, gx, gh)
@@ -7,6 +7,7 @@ import weakref
 import numpy as np
 import dezero.functions as F
 from dezero.core import Parameter
+from dezero.utils import pair
 
 
 class Layer:
@@ -97,3 +98,161 @@ class Linear(Layer):
         
         y = F.linear(x, self.W, self.b)
         return y
+
+
+class Conv2d(Layer):
+    def __init__(self, out_channels, kernel_size, stride=1, pad=0,
+                 nobias=False, dtype=np.float32, in_channels=None):
+        super().__init__()
+        self.in_channels = in_channels
+        self.out_channels = out_channels
+        self.kernel_size = kernel_size
+        self.stride = stride
+        self.pad = pad
+        self.dtype = dtype
+
+        self.W = Parameter(None, name='W')
+
+        # as in Linear, in_channels can be taken from the first input
+        if in_channels is not None:
+            self._init_W()
+
+        if nobias:
+            self.b = None
+        else:
+            self.b = Parameter(np.zeros(out_channels, dtype), name='b')
+
+    def _init_W(self):
+        C, OC = self.in_channels, self.out_channels
+        KH, KW = pair(self.kernel_size)
+        scale = np.sqrt(1 / (C * KH * KW))
+        W_data = (np.random.randn(OC, C, KH, KW) * scale).astype(self.dtype)
+        self.W.data = W_data
+
+    def forward(self, x):
+        if self.W.data is None:
+            self.in_channels = x.shape[1]
+            self._init_W()
+
+        y = F.conv2d(x, self.W, self.b, self.stride, self.pad)
+        return y
+
+
+class Recurrent(Layer):
+    """Base of the recurrent layers, which run one time step per call.
+
+    The state Variables named in `state` are kept across calls and start
+    as zeros. Call `reset_state` before a new sequence. For truncated
+    backprop, call `unchain` after each backward: the state keeps its value
+    but the next steps no longer extend the graph of the previous ones, so
+    the graph held in memory stays bounded however long the sequence is.
+    """
+    state = ('h',)
+
+    def reset_state(self):
+        for name in self.state:
+            setattr(self, name, None)
+
+    def unchain(self):
+        for name in self.state:
+            v = getattr(self, name)
+            if v is not None:
+                v.unchain()
+
+    def zero_state(self, x):
+        return np.zeros((x.shape[0], self.hidden_size), x.dtype)
+
+
+class RNN(Recurrent):
+    """h = tanh([x, h] @ W + b), with W the stacked input and hidden weights
+    so that each step is a single GEMM."""
+    n_gates = 1
+
+    def __init__(self, hidden_size, in_size=None, dtype=np.float32):
+        super().__init__()
+        self.hidden_size = hidden_size
+        self.in_size = in_size
+        self.dtype = dtype
+
+        self.W = Parameter(None, name='W')
+        if in_size is not None:
+            self._init_W()
+        self.b = Parameter(np.zeros(self.n_gates * hidden_size, dtype), name='b')
+        self.reset_state()
+
+    def _init_W(self):
+        # the input and hidden rows are scaled by their own fan-in, as two
+        # Linear layers would be
+        I, H = self.in_size, self.hidden_size
+        Wx = np.random.randn(I, self.n_gates * H) * np.sqrt(1 / I)
+        Wh = np.random.randn(H, self.n_gates * H) * np.sqrt(1 / H)
+        self.W.data = np.concatenate([Wx, Wh]).astype(self.dtype)
+
+    def step_input(self, x):
+        if self.W.data is None:
+            self.in_size = x.shape[1]
+            self._init_W()
+        h = self.zero_state(x) if self.h is None else self.h
+        return F.concat([x, h], axis=1)
+
+    def forward(self, x):
+        self.h = F.tanh(F.linear(self.step_input(x), self.W, self.b))
+        return self.h
+
+
+class LSTM(RNN):
+    """LSTM whose four gates come from one GEMM of [x, h] with W (I + H, 4H)
+    and go through a single `F.lstm` node."""
+    n_gates = 4
+    state = ('h', 'c')
+
+    def forward(self, x):
+        gates = F.linear(self.step_input(x), self.W, self.b)
+        c = self.zero_state(x) if self.c is None else self.c
+        self.c, self.h = F.lstm(c, gates)
+        return self.h
+
+
+class GRU(Recurrent):
+    """GRU with the three gates of x in Wx (I, 3H) and those of h in
+    Wh (H, 3H). The reset gate scales the projection of h alone, so the two
+    are separate GEMMs, and the gates are a single `F.gru` node."""
+
+    def __init__(self, hidden_size, in_size=None, dtype=np.float32):
+        super().__init__()
+        self.hidden_size = hidden_size
+        self.in_size = in_size
+        self.dtype = dtype
+
+        self.Wx = Parameter(None, name='Wx')
+        H = hidden_size
+        Wh_data = np.random.randn(H, 3 * H) * np.sqrt(1 / H)
+        self.Wh = Parameter(Wh_data.astype(dtype), name='Wh')
+        if in_size is not None:
+            self._init_W()
+        self.b = Parameter(np.zeros(3 * H, dtype), name='b')
+        self.reset_state()
+
+    def _init_W(self):
+        I, H = self.in_size, self.hidden_size
+        Wx_data = np.random.randn(I, 3 * H) * np.sqrt(1 / I)
+        self.Wx.data = Wx_data.astype(self.dtype)
+
+    def forward(self, x):
+        if self.Wx.data is None:
+            self.in_size = x.shape[1]
+            self._init_W()
+        h = self.zero_state(x) if self.h is None else self.h
+        gx = F.linear(x, self.Wx, self.b)
+        self.h = F.gru(h, gx, F.matmul(h, self.Wh))
+        return self.h
+
+
+# drop the activations inside a layer after forward and recompute them in backward
+class Checkpoint(Layer):
+    def __init__(self, layer):
+        super().__init__()
+        self.layer = layer
+
+    def forward(self, x):
+        return F.checkpoint(self.layer, x, list(self.layer.params()))
@@ -0,0 +1,139 @@
+import threading
+from collections import deque
+import numpy as np
+
+
+class _Lease:
+    """Owner of a pooled buffer while arrays use it.
+
+    `MemoryPool.empty` builds its array from the lease's array interface,
+    so the lease is the base of that array and (directly or through it) of
+    every view of it. When the last of them is gone the lease is freed and
+    queues the buffer for the pool to take back. Ownership is tracked by
+    the objects themselves, not by reference counts, so a buffer is never
+    handed out again while an array still uses it, on any interpreter; on
+    one without reference counting it just comes back later, when the
+    garbage collector frees the lease.
+    """
+    __slots__ = ('released', 'size', 'buf', '__array_interface__')
+
+    def __init__(self, released, size, buf, address, shape, dtype):
+        self.released = released
+        self.size = size
+        self.buf = buf
+        self.__array_interface__ = {'shape': shape, 'typestr': dtype.str,
+                                    'data': (address, False), 'version': 3}
+
+    def __del__(self):
+        # deque.append is atomic, so this may run in any thread or in the
+        # middle of a pool method
+        self.released.append((self.size, self.buf))
+
+
+class MemoryPool:
+    """Size-bucketed pool of ndarray buffers.
+
+    `empty` returns an array backed by a pooled byte buffer. The buffer
+    comes back to the pool as soon as nothing uses it any more, i.e. when
+    the Variable holding the array (as `.data` or `.grad`) and every view
+    of it are gone (see `_Lease`). Nothing has to be released by hand.
+
+    Buffer sizes are rounded up to a power of two, so an array can reuse a
+    buffer freed by an array of a slightly different shape or dtype.
+
+    A pool may be shared by several threads; its bookkeeping is done under
+    a lock.
+
+    Args:
+        max_bytes (int or None): Upper bound on the bytes of free buffers
+            kept for reuse. Free buffers beyond it are evicted, largest size
+            class first. Buffers in use are never evicted.
+    """
+    MIN_BYTES = 512
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.free = {}    # size class -> [(buffer, address)]
+        self.released = deque()  # (size class, buffer) freed by leases
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_held = 0
+        self.bytes_in_use = 0
+
+    def empty(self, shape, dtype=np.float64):
+        dtype = np.dtype(dtype)
+        shape = (shape,) if isinstance(shape, int) else tuple(shape)
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        size = self._size_class(nbytes)
+
+        with self.lock:
+            self.collect()
+            free = self.free.get(size)
+            if free:
+                self.hits += 1
+                buf, address = free.pop()
+                self.bytes_held -= size
+            else:
+                self.misses += 1
+                buf = np.empty(size, dtype=np.uint8)
+                address = buf.ctypes.data
+            self.bytes_in_use += size
+            self.evict()
+        return np.asarray(_Lease(self.released, size, buf, address, shape, dtype))
+
+    def zeros(self, shape, dtype=np.float64):
+        x = self.empty(shape, dtype)
+        x.fill(0)
+        return x
+
+    def ones_like(self, x):
+        y = self.empty(x.shape, x.dtype)
+        y.fill(1)
+        return y
+
+    def collect(self):
+        """Take back every buffer whose lease has been freed."""
+        released = self.released
+        if not released:
+            return
+        with self.lock:
+            while released:
+                size, buf = released.popleft()
+                self.free.setdefault(size, []).append((buf, buf.ctypes.data))
+                self.bytes_in_use -= size
+                self.bytes_held += size
+
+    def evict(self):
+        if self.max_bytes is None:
+            return
+        with self.lock:
+            for size in sorted(self.free, reverse=True):
+                free = self.free[size]
+                while free and self.bytes_held > self.max_bytes:
+                    # oldest buffer of the size class first
+                    free.pop(0)
+                    self.bytes_held -= size
+                    self.evictions += 1
+                if self.bytes_held <= self.max_bytes:
+                    break
+
+    def clear(self):
+        """Drop every free buffer. Buffers in use are left alone."""
+        with self.lock:
+            self.collect()
+            self.free.clear()
+            self.bytes_held = 0
+
+    def stats(self):
+        self.collect()
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'bytes_held': self.bytes_held,
+                'bytes_in_use': self.bytes_in_use}
+
+    def _size_class(self, nbytes):
+        size = self.MIN_BYTES
+        while size < nbytes:
+            size *= 2
+        return size
@@ -3,6 +3,7 @@ if '__file__' in globals():
     import sys
     sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+import functools
 import dezero.functions as F
 import dezero.layers as L
 from dezero import utils
@@ -16,9 +17,14 @@ class Model(L.Layer):
 
 # generalise the model to be a multi-layer perceptron (MLP)
 class MLP(Model):
-    def __init__(self, full_connect_output_sizes, activation=F.sigmoid_simple):
+    # checkpoint: number of layers per checkpointed segment. Only the outputs
+    # of the segments are kept after forward; the activations inside them are
+    # recomputed in backward. None keeps every activation.
+    def __init__(self, full_connect_output_sizes, activation=F.sigmoid,
+                 checkpoint=None):
         super().__init__()
         self.activation = activation
+        self.checkpoint = checkpoint
         self.layers = []
 
         for i, out_size in enumerate(full_connect_output_sizes):
@@ -27,6 +33,20 @@ class MLP(Model):
             self.layers.append(layer)
 
     def forward(self, x):
-        for l in self.layers[:-1]:
-            x = self.activation(l(x))
-        return self.layers[-1](x)
+        if self.checkpoint is None:
+            return self._forward_layers(x, 0, len(self.layers))
+
+        for start in range(0, len(self.layers), self.checkpoint):
+            stop = min(start + self.checkpoint, len(self.layers))
+            params = [p for l in self.layers[start:stop] for p in l.params()]
+            segment = functools.partial(self._forward_layers, start=start, stop=stop)
+            x = F.checkpoint(segment, x, params)
+        return x
+
+    def _forward_layers(self, x, start, stop):
+        last = len(self.layers) - 1
+        for i in range(start, stop):
+            x = self.layers[i](x)
+            if i != last:
+                x = self.activation(x)
+        return x
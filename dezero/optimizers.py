@@ -1,4 +1,5 @@
 import numpy as np
+from dezero.core import HessianVectorProduct, no_grad
 
 # integrate all optimisation steps as a class
 class Optimizer:
@@ -52,3 +53,96 @@ class MomentumSGD(Optimizer):
         v *= self.momentum
         v -= self.lr * param.grad.data
         param.data += v
+
+
+# Truncated Newton: each update solves (H + damping * I) d = -g for the
+# Newton direction d with a few conjugate gradient iterations, using only
+# Hessian-vector products, then halves the step lr * d until the loss
+# decreases enough (at most max_backtracks times). Unlike the optimizers
+# above it needs the loss itself, so update takes a function that
+# recomputes it.
+class NewtonCG(Optimizer):
+    def __init__(self, lr=1.0, cg_iters=10, damping=1e-4, tol=1e-10,
+                 max_backtracks=10):
+        super().__init__()
+        self.lr = lr
+        self.cg_iters = cg_iters
+        self.damping = damping
+        self.tol = tol
+        self.max_backtracks = max_backtracks
+
+    def update(self, loss_fn):
+        loss = loss_fn()
+        # collected after the forward pass, which may initialize them
+        params = list(self.target.params())
+        hvp = HessianVectorProduct(loss, params)
+        shapes = [p.data.shape for p in params]
+
+        def matvec(v):
+            hv = hvp(unflatten(v, shapes))
+            return flatten([h.data for h in hv]) + self.damping * v
+
+        g = flatten(hvp.gradient())
+        d = conjugate_gradient(matvec, -g, self.cg_iters, self.tol)
+        ds = unflatten(d, shapes)
+        origins = [p.data.copy() for p in params]
+
+        # backtracking line search (Armijo condition)
+        f0 = float(loss.data)
+        slope = g @ d
+        lr = self.lr
+        for _ in range(self.max_backtracks + 1):
+            for param, origin, di in zip(params, origins, ds):
+                param.data = origin + lr * di
+            with no_grad():
+                f1 = float(loss_fn().data)
+            if f1 <= f0 + 1e-4 * lr * slope:
+                break
+            lr *= 0.5
+        else:
+            # no step was shown to decrease the loss: keep the parameters
+            for param, origin in zip(params, origins):
+                param.data = origin
+        return loss
+
+
+def conjugate_gradient(matvec, b, max_iter=10, tol=1e-10):
+    """Approximately solve A x = b for a symmetric A given by matvec.
+
+    Stops early when the squared residual drops below tol or A shows
+    non-positive curvature along a search direction; in the latter case the
+    current iterate (or b itself on the first iteration, i.e. the steepest
+    descent direction of a Newton system) is returned.
+    """
+    x = np.zeros_like(b)
+    r = b.copy()
+    p = r.copy()
+    rr = r @ r
+    for i in range(max_iter):
+        if rr < tol:
+            break
+        Ap = matvec(p)
+        pAp = p @ Ap
+        if pAp <= 0:
+            return b if i == 0 else x
+        alpha = rr / pAp
+        x += alpha * p
+        r -= alpha * Ap
+        rr_new = r @ r
+        p = r + (rr_new / rr) * p
+        rr = rr_new
+    return x
+
+
+def flatten(arrays):
+    return np.concatenate([np.ravel(a) for a in arrays])
+
+
+def unflatten(v, shapes):
+    arrays = []
+    offset = 0
+    for shape in shapes:
+        size = int(np.prod(shape))
+        arrays.append(v[offset:offset + size].reshape(shape))
+        offset += size
+    return arrays
@@ -0,0 +1,366 @@
+import weakref
+import numpy as np
+import dezero.functions as F
+from dezero.core import (Variable, Parameter, Function, Add, Sub, Mul, Div,
+                         Neg, Pow, GradientAccumulator, as_array, backward_step,
+                         no_grad, ones_like_array)
+
+
+class StaticGraph:
+    """Capture one forward+backward of ``fn`` and replay it on new arrays.
+
+    The first call runs ``fn`` eagerly, calls ``backward()`` on the loss it
+    returns and records every Function of the graph into a flat tape that is
+    already in execution order. Later calls with inputs of the same shapes and
+    dtypes feed the new arrays through that tape: ``Function.forward`` and
+    ``Function.backward_array`` are run directly on ndarrays, so no Function,
+    Variable or weakref is created and no topological ordering is done per
+    step.
+
+    When the input shapes or dtypes differ from the captured ones (e.g. the
+    last, smaller mini-batch) the call falls back to eager mode and the tape
+    is kept for the next matching call.
+
+    Gradients accumulate into ``Parameter.grad`` exactly like
+    ``loss.backward()``, so call ``model.cleargrads()`` before each step as
+    usual. The replayed loss is the same Variable object on every call.
+
+    The tape only records what happened on the captured call: Python control
+    flow that depends on the data, or arrays read through ``.data`` while the
+    graph is built (e.g. the labels indexing ``softmax_cross_entropy_simple``),
+    are frozen into it.
+
+    With ``fuse=True`` chains of elementwise ops in the tape are merged by
+    `fuse_elementwise` after the capture.
+    """
+    def __init__(self, fn, fuse=False):
+        self.fn = fn
+        self.fuse = fuse
+        self.tape = None
+        self.signature = None
+        self.inputs = None
+        self.loss = None
+        self.leaves = None
+
+    def __call__(self, *inputs):
+        arrays = [as_array(x.data if isinstance(x, Variable) else x) for x in inputs]
+        signature = tuple((x.shape, x.dtype) for x in arrays)
+
+        if self.tape is None:
+            return self._capture(arrays, signature)
+        if signature != self.signature:
+            return self._eager(arrays)
+        return self._replay(arrays)
+
+    def _eager(self, arrays):
+        loss = self.fn(*[Variable(x, requires_grad=False) for x in arrays])
+        loss.backward()
+        return loss
+
+    def _capture(self, arrays, signature):
+        inputs = [Variable(x, requires_grad=False) for x in arrays]
+        loss = self.fn(*inputs)
+        loss.backward()
+
+        funcs = []
+        seen_set = set()
+        stack = [loss.creator]
+        while stack:
+            f = stack.pop()
+            if f is None or f in seen_set:
+                continue
+            seen_set.add(f)
+            funcs.append(f)
+            stack.extend(x.creator for x in f.inputs)
+
+        # A Function's generation is larger than the generations of all the
+        # Functions that produced its inputs, so sorting by generation gives
+        # a valid forward order and its reverse a valid backward order.
+        funcs.sort(key=lambda f: f.generation)
+
+        # The tape holds the outputs strongly so that they survive between
+        # steps; outputs that were already dropped (unused results of
+        # multi-output functions) are recorded as None.
+        self.tape = [(f, [output() for output in f.outputs]) for f in funcs]
+        if self.fuse:
+            self.tape = fuse_elementwise(self.tape, keep=[loss])
+        self.leaves = [x for f in funcs for x in f.inputs
+                       if x.creator is None and x.requires_grad and
+                       not isinstance(x, Parameter)]
+        self.signature = signature
+        self.inputs = inputs
+        self.loss = loss
+        return loss
+
+    def _replay(self, arrays):
+        for x, data in zip(self.inputs, arrays):
+            x.data = data
+
+        with no_grad():
+            for f, outputs in self.tape:
+                ys = f.forward(*[x.data for x in f.inputs])
+                if not isinstance(ys, tuple):
+                    ys = (ys,)
+                for output, y in zip(outputs, ys):
+                    if output is not None:
+                        output.data = as_array(y)
+
+            # Only Parameters accumulate across steps; any other leaf that
+            # takes a gradient is fresh on every eager step, so clear it.
+            for x in self.leaves:
+                x.grad = None
+
+            loss = self.loss
+            grads = GradientAccumulator()
+            grads.add(loss, ones_like_array(loss.data))
+            for f, _ in reversed(self.tape):
+                backward_step(f, grads)
+            grads.write_leaf_grads()
+
+        return loss
+
+
+def capture(fn, fuse=False):
+    return StaticGraph(fn, fuse)
+
+
+# ---------------------------------------------------------
+# elementwise fusion
+# ---------------------------------------------------------
+_UNARY_UFUNCS = {
+    Neg: np.negative,
+    F.Exp: np.exp,
+    F.Log: np.log,
+    F.Sin: np.sin,
+    F.Cos: np.cos,
+    F.Tanh: np.tanh,
+}
+
+_BINARY_UFUNCS = {
+    Add: np.add,
+    Sub: np.subtract,
+    Mul: np.multiply,
+    Div: np.divide,
+}
+
+
+class ElementwiseStage:
+    """One elementwise op of a fused chain, applied to the running value.
+
+    `const` is the Variable holding the other operand of a binary op (it is
+    read at run time, so replays see its current data) or the exponent of a
+    Pow. `const_first` tells whether it is the left operand.
+    """
+    __slots__ = ('kind', 'ufunc', 'const', 'const_first')
+
+    def __init__(self, kind, ufunc, const=None, const_first=False):
+        self.kind = kind
+        self.ufunc = ufunc
+        self.const = const
+        self.const_first = const_first
+
+    def operand(self):
+        return self.const if self.kind is Pow else self.const.data
+
+    def forward(self, x, out=None):
+        if self.const is None:
+            return self.ufunc(x, out=out)
+        c = self.operand()
+        if self.const_first:
+            return self.ufunc(c, x, out=out)
+        return self.ufunc(x, c, out=out)
+
+    def result_type(self, x):
+        if self.const is None:
+            return x.dtype if x.dtype.kind == 'f' else None
+        return np.result_type(x, self.operand())
+
+    def derivative(self, x, y):
+        """Return dy/dx as (scale, array, fresh).
+
+        array is None when the derivative is just scale, and fresh tells
+        whether array was allocated here (and may therefore be overwritten).
+        """
+        kind = self.kind
+        if kind is Neg:
+            return -1, None, False
+        if kind is F.Exp:
+            return 1, y, False
+        if kind is F.Log:
+            return 1, 1 / x, True
+        if kind is F.Sin:
+            return 1, np.cos(x), True
+        if kind is F.Cos:
+            return -1, np.sin(x), True
+        if kind is F.Tanh:
+            return 1, 1 - y * y, True
+        if kind is Pow:
+            c = self.const
+            return c, x ** (c - 1), True
+
+        if kind is Add:
+            return 1, None, False
+        if kind is Sub:
+            return (-1 if self.const_first else 1), None, False
+        if kind is Mul:
+            return 1, self.operand(), False
+        # Div: d(x / c) = 1 / c, d(c / x) = -c / x^2 = -y / x
+        if self.const_first:
+            return -1, y / x, True
+        return 1, 1 / self.operand(), True
+
+
+class FusedElementwise(Function):
+    """A chain of elementwise ops run as a single Function.
+
+    forward writes every stage into the output buffer in place, so the
+    intermediate results of the chain are never materialized as separate
+    Variables. Only the chain input is kept (as `inputs[0]`); backward
+    recomputes the stages from it and multiplies their derivatives together.
+    The product is treated as a constant by `backward`, so a fused graph is
+    meant for first-order gradients only.
+    """
+    __slots__ = ('stages',)
+
+    def __init__(self, stages):
+        self.stages = stages
+
+    def forward(self, x):
+        y = None
+        for stage in self.stages:
+            if y is not None and stage.result_type(y) == y.dtype:
+                stage.forward(y, out=y)
+            else:
+                # The first stage (or a dtype change) allocates a fresh array
+                # which the following stages can then overwrite.
+                y = np.asarray(stage.forward(x if y is None else y))
+        return y
+
+    def derivative(self, x):
+        """Recompute the chain from x and return dy/dx as (scale, array, fresh)."""
+        scale, deriv, fresh = 1, None, False
+        last = len(self.stages) - 1
+        for i, stage in enumerate(self.stages):
+            # The last stage's result is the saved output.
+            y = self.outputs[0]().data if i == last else stage.forward(x)
+            s, d, d_fresh = stage.derivative(x, y)
+            scale *= s
+            if d is None:
+                pass
+            elif deriv is None:
+                deriv, fresh = d, d_fresh
+            else:
+                deriv, fresh = _multiply(deriv, fresh, d, d_fresh), True
+            x = y
+        return scale, deriv, fresh
+
+    def backward(self, gy):
+        x, = self.inputs
+        scale, deriv, _ = self.derivative(x.data)
+        if deriv is not None:
+            gy = gy * Variable(as_array(deriv), requires_grad=False)
+        return gy * scale if scale != 1 else gy
+
+    def backward_array(self, gy):
+        scale, deriv, fresh = self.derivative(self.inputs[0].data)
+        gx = gy if deriv is None else _multiply(deriv, fresh, gy, False)
+        return gx * scale if scale != 1 else gx
+
+    def jvp(self, xs, ys, txs):
+        scale, deriv, fresh = self.derivative(xs[0])
+        ty = txs[0] if deriv is None else _multiply(deriv, fresh, txs[0], False)
+        return ty * scale if scale != 1 else ty
+
+
+def _multiply(a, a_fresh, b, b_fresh):
+    """a * b, written into whichever operand was allocated by the caller."""
+    for out, fresh, other in ((a, a_fresh, b), (b, b_fresh, a)):
+        if fresh and np.result_type(out, other) == out.dtype and \
+                np.broadcast_shapes(out.shape, other.shape) == out.shape:
+            return np.multiply(out, other, out=out)
+    return a * b
+
+
+def _elementwise_stage(f, output):
+    """Return (input Variable, ElementwiseStage) if f can join a fused chain."""
+    kind = type(f)
+    if kind in _UNARY_UFUNCS:
+        return f.inputs[0], ElementwiseStage(kind, _UNARY_UFUNCS[kind])
+    if kind is Pow:
+        return f.inputs[0], ElementwiseStage(kind, np.power, f.c)
+    if kind in _BINARY_UFUNCS:
+        x0, x1 = f.inputs
+        # The other operand must be a constant (no gradient is propagated to
+        # it) and must not change the shape of the chain's value.
+        for x, c, const_first in ((x0, x1, False), (x1, x0, True)):
+            if not c.requires_grad and x.shape == output.shape:
+                return x, ElementwiseStage(kind, _BINARY_UFUNCS[kind], c, const_first)
+    return None
+
+
+def fuse_elementwise(tape, keep=()):
+    """Merge chains of elementwise ops of a tape into FusedElementwise nodes.
+
+    A chain is a run of unary ops (or binary ops with a constant operand)
+    where every intermediate result has exactly one consumer, the next op of
+    the chain. Chains of two or more ops are replaced by one Function whose
+    output is the last op's output Variable.
+
+    Args:
+        tape (list): (Function, outputs) pairs in forward order, as built by
+            `StaticGraph`.
+        keep (iterable): Variables that must stay materialized.
+
+    Returns:
+        list: The new tape.
+    """
+    keep = {id(x) for x in keep}
+    uses = {}
+    for f, _ in tape:
+        for x in f.inputs:
+            uses[id(x)] = uses.get(id(x), 0) + 1
+
+    stages = {}
+    for f, outputs in tape:
+        if len(outputs) == 1 and outputs[0] is not None:
+            stage = _elementwise_stage(f, outputs[0])
+            if stage is not None:
+                stages[f] = stage
+
+    # producer of each fusable output, to walk chains backwards
+    producer = {id(outputs[0]): f for f, outputs in tape if f in stages}
+
+    chains = {}
+    fused = set()
+    for f, outputs in reversed(tape):
+        if f not in stages or f in fused:
+            continue
+        chain = [f]
+        x = stages[f][0]
+        while id(x) in producer and uses.get(id(x)) == 1 and id(x) not in keep:
+            g = producer[id(x)]
+            if g in fused:
+                break
+            chain.append(g)
+            x = stages[g][0]
+        if len(chain) > 1:
+            chain.reverse()
+            fused.update(chain)
+            chains[chain[-1]] = chain
+
+    new_tape = []
+    for f, outputs in tape:
+        if f not in fused:
+            new_tape.append((f, outputs))
+        elif f in chains:
+            chain = chains[f]
+            y = outputs[0]
+            node = FusedElementwise([stages[g][1] for g in chain])
+            node.inputs = [stages[chain[0]][0]]
+            node.outputs = [weakref.ref(y)]
+            node.generation = f.generation
+            # Point the output at the fused node so that the original chain
+            # (and its intermediate arrays) can be freed.
+            y.creator = node
+            new_tape.append((node, outputs))
+    return new_tape
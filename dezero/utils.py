@@ -73,18 +73,40 @@ def plot_dot_graph(output, verbose=True, to_file='graph.png'):
     subprocess.run(cmd, shell=True)
 
 
-def reshape_sum_backward(gy, shape, axis, keepdims):
-    pivot_shape: tuple = (shape[0], 1)
+def reshape_sum_backward(gy, x_shape, axis, keepdims):
+    """Reshape gradient appropriately for dezero.functions.sum's backward.
 
-    if not gy.shape:
-        gy = gy.reshape((1,))
+    The summed axes are put back as size-1 dimensions, so the result
+    broadcasts to `x_shape` without copying.
 
-    if axis == 0:
-        return gy.tile(pivot_shape)
-    elif axis == 1:
-        return gy.reshape(pivot_shape)
-    else: # when axis is None
+    Args:
+        gy (dezero.Variable or ndarray): Gradient variable from the output by
+            backprop.
+        x_shape (tuple): Shape used at sum function's forward.
+        axis (None or int or tuple of ints): Axis used at sum function's
+            forward.
+        keepdims (bool): Keepdims used at sum function's forward.
+
+    Returns:
+        dezero.Variable or ndarray: Gradient variable which is reshaped
+        appropriately.
+    """
+    ndim = len(x_shape)
+    if axis is None:
+        shape = (1,) * ndim
+    elif keepdims:
+        shape = gy.shape
+    else:
+        tupled_axis = (axis,) if isinstance(axis, int) else axis
+        actual_axis = sorted(a if a >= 0 else a + ndim for a in tupled_axis)
+        shape = list(gy.shape)
+        for a in actual_axis:
+            shape.insert(a, 1)
+        shape = tuple(shape)
+
+    if gy.shape == shape:
         return gy
+    return gy.reshape(shape)
 
 # Chainer's version
 def sum_to(x, shape):  
@@ -127,4 +149,18 @@ def sum_to(x, shape):
 #             y = y.squeeze()
 #         else:
 #             raise ValueError(f"{x} can't be summed up into the shape {shape}.")
-#     return y
\ No newline at end of file
+#     return y
+
+
+def get_conv_outsize(input_size, kernel_size, stride, pad):
+    return (input_size + pad * 2 - kernel_size) // stride + 1
+
+
+def pair(x):
+    if isinstance(x, int):
+        return (x, x)
+    elif isinstance(x, tuple):
+        assert len(x) == 2
+        return x
+    else:
+        raise ValueError
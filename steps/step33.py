@@ -4,6 +4,7 @@ if '__file__' in globals():
     sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 import numpy as np
+import dezero
 from dezero import Variable
 
 
@@ -29,5 +30,20 @@ def newton():
 
         x.data -= gx.data / gx2.data
 
+
+# the same iteration with dezero.grad: no .grad is written, so no cleargrad()
+def newton_with_grad():
+    x = Variable(np.array(2.0))
+    iters = 10
+
+    for i in range(iters):
+        print(i, x)
+
+        y = f(x)
+        gx = dezero.grad(y, x, create_graph=True)
+        gx2 = dezero.grad(gx, x)
+
+        x.data -= gx.data / gx2.data
+
 if __name__ == "__main__":
     newton()
@@ -20,7 +20,6 @@ max_iter = 10000
 hidden_size = 10
 
 # define model
-# TODO: sigmoid_simple -> sigmoid
 class TwoLayerNet(Model):
     def __init__(self, hidden_size, out_size):
         super().__init__()
@@ -28,7 +27,7 @@ class TwoLayerNet(Model):
         self.l2 = L.Linear(out_size)
 
     def forward(self, x):
-        y = F.sigmoid_simple(self.l1(x))
+        y = F.sigmoid(self.l1(x))
         y = self.l2(y)
         return y
     
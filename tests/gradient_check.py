@@ -0,0 +1,12 @@
+import numpy as np
+
+
+def numerical_grad(f, x, eps=1e-6):
+    """Central-difference gradient of f, which maps an ndarray x to a
+    scalar, computed one element of x at a time."""
+    gx = np.zeros_like(x)
+    for i in np.ndindex(x.shape):
+        e = np.zeros_like(x)
+        e[i] = eps
+        gx[i] = (f(x + e) - f(x - e)) / (2 * eps)
+    return gx
@@ -0,0 +1,104 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable
+from dezero.models import MLP
+from gradient_check import numerical_grad
+
+
+class ActivationTest(unittest.TestCase):
+    def check_against(self, f, reference, x):
+        np.random.seed(0)
+        gy = np.random.randn(*x.shape)
+        x0, x1 = Variable(x), Variable(x)
+        y0, y1 = f(x0), reference(x1)
+        self.assertTrue(np.allclose(y0.data, y1.data))
+
+        gx0 = dezero.grad(y0, x0, grad_outputs=gy, create_graph=True)
+        gx1 = dezero.grad(y1, x1, grad_outputs=gy, create_graph=True)
+        self.assertTrue(np.allclose(gx0.data, gx1.data))
+        # second order through the graph backward
+        ggx0 = dezero.grad(gx0, x0, grad_outputs=gy)
+        ggx1 = dezero.grad(gx1, x1, grad_outputs=gy)
+        self.assertTrue(np.allclose(ggx0.data, ggx1.data))
+
+    def test_sigmoid(self):
+        x = np.random.randn(3, 4)
+        self.check_against(F.sigmoid, F.sigmoid_simple, x)
+        y = F.sigmoid(np.array([-1000.0, 1000.0]))
+        self.assertTrue(np.array_equal(y.data, [0.0, 1.0]))
+
+    def test_softmax(self):
+        x = np.random.randn(3, 4)
+        self.check_against(F.softmax, F.softmax_simple, x)
+        y = F.softmax(np.array([[1000.0, 0.0]]))
+        self.assertTrue(np.allclose(y.data, [[1.0, 0.0]]))
+        x = np.array([[2, 0, 1]])
+        y = F.softmax(x)
+        self.assertTrue(np.allclose(y.data, F.softmax_simple(x.astype(np.float64)).data))
+
+    def test_single_node(self):
+        x = Variable(np.random.randn(2, 3))
+        self.assertIsInstance(F.sigmoid(x).creator, F.Sigmoid)
+        self.assertIsInstance(F.softmax(x).creator, F.Softmax)
+
+
+class ReLUFamilyTest(unittest.TestCase):
+    def check_grad(self, f):
+        np.random.seed(0)
+        x = np.random.randn(3, 4)
+        gy = np.random.randn(3, 4)
+        v = Variable(x)
+        y = f(v)
+        y.grad = Variable(gy)
+        y.backward()
+        gx_num = numerical_grad(lambda x: np.sum(f(x).data * gy), x)
+        self.assertTrue(np.allclose(v.grad.data, gx_num))
+        v = Variable(x)
+        gx = dezero.grad(f(v), v, grad_outputs=gy, create_graph=True)
+        self.assertTrue(np.allclose(gx.data, gx_num))
+
+    def test_relu(self):
+        self.check_grad(F.relu)
+        y = F.relu(Variable(np.array([-1.0, 0.0, 2.0])))
+        self.assertTrue(np.array_equal(y.data, [0.0, 0.0, 2.0]))
+        self.assertEqual(y.creator.mask.dtype, np.bool_)
+
+    def test_leaky_relu(self):
+        self.check_grad(F.leaky_relu)
+        y = F.leaky_relu(np.array([-1.0, 2.0]), slope=0.1)
+        self.assertTrue(np.allclose(y.data, [-0.1, 2.0]))
+
+    def test_elu(self):
+        self.check_grad(F.elu)
+        self.check_grad(lambda x: F.elu(x, alpha=0.5))
+
+    def test_gelu(self):
+        self.check_grad(F.gelu)
+        self.assertAlmostEqual(float(F.gelu(np.array(1.0)).data), 0.8411919906)
+
+    def test_integer_input(self):
+        x = np.array([-2, 0, 1, 3])
+        for f in (F.relu, F.leaky_relu, F.elu, F.gelu):
+            v = Variable(x.astype(np.float64))
+            F.sum(f(v)).backward()
+            expected = v.grad.data
+            for create_graph in (False, True):
+                v = Variable(x)
+                gx = dezero.grad(F.sum(f(v)), v, create_graph=create_graph)
+                self.assertTrue(np.allclose(gx.data, expected), f)
+
+    def test_mlp_activation(self):
+        np.random.seed(0)
+        model = MLP((8, 1), activation=F.relu)
+        y = model(np.random.rand(4, 3))
+        self.assertIsInstance(y.creator.inputs[0].creator, F.ReLU)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,125 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero.functions as F
+from dezero import Variable, Function, Parameter
+
+
+class Split(Function):
+    calls = 0
+
+    def forward(self, x):
+        return x[:1], x[1:]
+
+    def backward(self, gy0, gy1):
+        Split.calls += 1
+        return Variable(np.concatenate([gy0.data, gy1.data]))
+
+
+class BackwardTest(unittest.TestCase):
+    def test_diamond(self):
+        # y = (x^2)^2 + (x^2)^2: both branches share a generation
+        x = Variable(np.array(2.0))
+        a = x ** 2
+        y = a ** 2 + a ** 2
+        y.backward()
+        self.assertEqual(x.grad.data, 64.0)
+
+    def test_deep_chain(self):
+        x = Variable(np.array(1.0))
+        y = x
+        for _ in range(5000):
+            y = y + x
+        y.backward()
+        self.assertEqual(x.grad.data, 5001.0)
+
+    def test_multi_output(self):
+        Split.calls = 0
+        x = Variable(np.array([1.0, 2.0, 3.0]))
+        a, b = Split()(x)
+        y = F.sum(a * 2.0) + F.sum(b * 3.0)
+        y.backward()
+        # Split's backward runs once, after both of its outputs got their grad
+        self.assertEqual(Split.calls, 1)
+        self.assertEqual(x.grad.data.tolist(), [2.0, 3.0, 3.0])
+
+    def test_create_graph_matches_array_path(self):
+        def f(x, W):
+            y = F.tanh(F.matmul(x, W)) * 2.0 - F.exp(x[:, :1]) / (1.0 + x ** 2)
+            y = F.sin(y) + F.cos(F.reshape(y, (3, 2))).T.reshape((2, 3))
+            return F.sum(F.log(F.clip(y ** 2, 1e-3, 10.0)), axis=0)
+
+        x_data = np.random.rand(2, 3)
+        W_data = np.random.rand(3, 3)
+        grads = []
+        for create_graph in (True, False):
+            x, W = Variable(x_data), Variable(W_data)
+            y = F.sum(f(x, W))
+            y.backward(create_graph=create_graph)
+            grads.append((x.grad.data, W.grad.data))
+        self.assertTrue(np.allclose(grads[0][0], grads[1][0]))
+        self.assertTrue(np.allclose(grads[0][1], grads[1][1]))
+
+    def test_requires_grad(self):
+        W = Parameter(np.random.rand(3, 2))
+        x = np.random.rand(4, 3)
+        t = np.random.rand(4, 2)
+        h = F.matmul(x, x.T)  # data only: not recorded
+        self.assertIsNone(h.creator)
+        self.assertFalse(h.requires_grad)
+
+        loss = F.mean_squared_error(t, F.matmul(h, F.matmul(x, W)))
+        self.assertTrue(loss.requires_grad)
+        loss.backward()
+        self.assertEqual(W.grad.shape, W.shape)
+        self.assertIsNone(h.grad)
+
+        matmul = loss.creator.inputs[1].creator
+        self.assertIsNone(matmul.backward_array(np.ones((4, 2)))[0])
+
+
+class GradientAccumulatorTest(unittest.TestCase):
+    def test_fan_out(self):
+        # x feeds four Functions; its contributions are summed
+        x_data = np.random.rand(3)
+        x = Variable(x_data)
+        y = F.sum(x * x) + F.sum(F.exp(x)) + F.sum(x)
+        y.backward()
+        self.assertTrue(np.allclose(x.grad.data, 2 * x_data + np.exp(x_data) + 1))
+
+    def test_shared_pass_through(self):
+        # Add hands the same gy to a and b; the second contribution to a
+        # must not be added into that array, which b also holds
+        a, b = Variable(np.ones(3)), Variable(np.ones(3))
+        s = a + b
+        y = s + a * 2.0
+        y.backward(retain_grad=True)
+        self.assertTrue(np.array_equal(a.grad.data, [3.0, 3.0, 3.0]))
+        self.assertTrue(np.array_equal(b.grad.data, [1.0, 1.0, 1.0]))
+        self.assertTrue(np.array_equal(s.grad.data, [1.0, 1.0, 1.0]))
+
+    def test_seed_not_modified(self):
+        x = Variable(np.array([1.0, 2.0]))
+        y = x + x
+        seed = np.array([5.0, 7.0])
+        y.grad = Variable(seed)
+        y.backward()
+        self.assertTrue(np.array_equal(x.grad.data, [10.0, 14.0]))
+        self.assertTrue(np.array_equal(seed, [5.0, 7.0]))
+
+    def test_leaf(self):
+        x = Variable(np.array(2.0))
+        x.backward()
+        self.assertEqual(x.grad.data, 1.0)
+
+        x = Variable(np.array(2.0))
+        x.grad = Variable(np.array(5.0))
+        x.backward()
+        self.assertEqual(x.grad.data, 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
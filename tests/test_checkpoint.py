@@ -0,0 +1,76 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+import dezero.layers as L
+from dezero import Variable
+from dezero.models import MLP
+
+
+def mlp_grads(checkpoint, x, t):
+    np.random.seed(0)
+    model = MLP((5, 6, 7, 2), checkpoint=checkpoint)
+    loss = F.mean_squared_error(model(x), t)
+    loss.backward()
+    return [model.__dict__[f'l{i}'].W.grad.data for i in range(4)]
+
+
+class CheckpointTest(unittest.TestCase):
+    def test_mlp_segments(self):
+        x, t = np.random.rand(8, 3), np.random.rand(8, 2)
+        expected = mlp_grads(None, x, t)
+        for checkpoint in (1, 2, 3, 4):
+            for g, e in zip(mlp_grads(checkpoint, x, t), expected):
+                self.assertTrue(np.allclose(g, e))
+
+    def test_layer(self):
+        x = Variable(np.random.rand(8, 3))
+        layer = L.Linear(4)
+        y = F.sum(F.tanh(L.Checkpoint(layer)(x)))
+        y.backward()
+        gx, gW = x.grad.data, layer.W.grad.data
+
+        x.cleargrad()
+        layer.cleargrads()
+        y = F.sum(F.tanh(layer(x)))
+        y.backward()
+        self.assertTrue(np.allclose(gx, x.grad.data))
+        self.assertTrue(np.allclose(gW, layer.W.grad.data))
+
+    def test_double_backward(self):
+        np.random.seed(0)
+        x_data = np.random.rand(4, 3)
+        layer = L.Linear(5, in_size=3, dtype=np.float64)
+        results = []
+        for f in (layer, L.Checkpoint(layer)):
+            x = Variable(x_data)
+            y = F.sum(F.tanh(f(x)) ** 3)
+            gx, gW = dezero.grad(y, [x, layer.W], create_graph=True)
+            z = F.sum(gx * gx) + F.sum(gW * gW)
+            results.append(dezero.grad(z, [x, layer.W]))
+        for g, expected in zip(results[1], results[0]):
+            self.assertIsNotNone(g)
+            self.assertTrue(np.allclose(g.data, expected.data))
+
+        def loss(x):
+            return F.sum(F.tanh(L.Checkpoint(layer)(x)) ** 3)
+        hv = dezero.hvp(loss, x_data, np.ones_like(x_data))
+        hv_plain = dezero.hvp(lambda x: F.sum(F.tanh(layer(x)) ** 3), x_data,
+                              np.ones_like(x_data))
+        self.assertTrue(np.allclose(hv.data, hv_plain.data))
+        self.assertFalse(np.allclose(hv.data, 0))
+
+    def test_activations_are_dropped(self):
+        model = MLP((5, 5, 5, 1), checkpoint=4)
+        y = model(np.random.rand(2, 3))
+        # The whole model is a single checkpointed node over the input.
+        self.assertEqual(type(y.creator).__name__, 'Checkpoint')
+        self.assertIsNone(y.creator.inputs[0].creator)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
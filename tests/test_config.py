@@ -0,0 +1,64 @@
+import os
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable
+from dezero.core import Config
+from dezero.models import MLP
+
+
+class ConfigTest(unittest.TestCase):
+    def test_using_config_restores(self):
+        with dezero.no_grad():
+            self.assertFalse(Config.enable_backprop)
+            with dezero.using_config('enable_backprop', True):
+                self.assertTrue(Config.enable_backprop)
+            self.assertFalse(Config.enable_backprop)
+        self.assertTrue(Config.enable_backprop)
+
+    def test_unknown_setting(self):
+        with self.assertRaises(AttributeError):
+            with dezero.using_config('no_such_setting', True):
+                pass
+
+    def test_threads_are_isolated(self):
+        np.random.seed(0)
+        model = MLP((8, 2))
+        x = np.random.rand(4, 3)
+        model(x)  # initialise the weights before sharing the model
+        n_threads = 8
+        barrier = threading.Barrier(n_threads)
+
+        def infer():
+            barrier.wait()
+            for _ in range(300):
+                with dezero.no_grad():
+                    y = model(x)
+                    if y.creator is not None or Config.enable_backprop:
+                        return False
+            return True
+
+        def train():
+            barrier.wait()
+            for _ in range(300):
+                y = F.sum(model(Variable(x)))
+                if y.creator is None or not Config.enable_backprop:
+                    return False
+            return True
+
+        with ThreadPoolExecutor(n_threads) as executor:
+            futures = [executor.submit(infer if i % 2 else train)
+                       for i in range(n_threads)]
+            results = [f.result() for f in futures]
+        self.assertTrue(all(results))
+        self.assertTrue(Config.enable_backprop)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,165 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+import dezero.layers as L
+from dezero import Variable
+from dezero.functions_conv import get_conv_plan
+from gradient_check import numerical_grad
+
+
+def conv2d_reference(x, W, b, stride, pad):
+    N, C, H, W_ = x.shape
+    OC, _, KH, KW = W.shape
+    x = np.pad(x, ((0, 0), (0, 0), (pad, pad), (pad, pad)))
+    OH = (H + 2 * pad - KH) // stride + 1
+    OW = (W_ + 2 * pad - KW) // stride + 1
+    y = np.zeros((N, OC, OH, OW))
+    for i in range(OH):
+        for j in range(OW):
+            window = x[:, :, i * stride:i * stride + KH, j * stride:j * stride + KW]
+            y[:, :, i, j] = np.tensordot(window, W, ((1, 2, 3), (1, 2, 3)))
+    return y if b is None else y + b.reshape(1, -1, 1, 1)
+
+
+def pooling_reference(x, k, stride, pad, reduce):
+    N, C, H, W = x.shape
+    x = np.pad(x, ((0, 0), (0, 0), (pad, pad), (pad, pad)),
+               constant_values=-np.inf if reduce is np.max else 0)
+    OH = (H + 2 * pad - k) // stride + 1
+    OW = (W + 2 * pad - k) // stride + 1
+    y = np.zeros((N, C, OH, OW))
+    for i in range(OH):
+        for j in range(OW):
+            window = x[:, :, i * stride:i * stride + k, j * stride:j * stride + k]
+            y[:, :, i, j] = reduce(window, axis=(2, 3))
+    return y
+
+
+class Conv2dTest(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+
+    def test_forward_backward(self):
+        for stride, pad in ((1, 0), (1, 1), (2, 1), (3, 0)):
+            x_data = np.random.randn(2, 3, 7, 6)
+            W_data = np.random.randn(4, 3, 3, 2)
+            b_data = np.random.randn(4)
+            y_data = conv2d_reference(x_data, W_data, b_data, stride, pad)
+            gy = np.random.randn(*y_data.shape)
+
+            def loss(x=x_data, W=W_data, b=b_data):
+                return np.sum(conv2d_reference(x, W, b, stride, pad) * gy)
+            gx_num = numerical_grad(lambda x: loss(x=x), x_data)
+            gW_num = numerical_grad(lambda W: loss(W=W), W_data)
+
+            for create_graph in (False, True):
+                x, W, b = Variable(x_data), Variable(W_data), Variable(b_data)
+                y = F.conv2d(x, W, b, stride=stride, pad=pad)
+                self.assertTrue(np.allclose(y.data, y_data))
+                gx, gW, gb = dezero.grad(y, [x, W, b], grad_outputs=gy,
+                                         create_graph=create_graph)
+                self.assertTrue(np.allclose(gx.data, gx_num, atol=1e-5))
+                self.assertTrue(np.allclose(gW.data, gW_num, atol=1e-5))
+                self.assertTrue(np.allclose(gb.data, gy.sum(axis=(0, 2, 3))))
+
+    def test_double_backward(self):
+        x = Variable(np.random.randn(1, 2, 4, 4))
+        W = Variable(np.random.randn(3, 2, 2, 2))
+        y = F.sum(F.conv2d(x, W, pad=1) ** 2)
+        gx, = dezero.grad(y, [x], create_graph=True)
+        gW, = dezero.grad(F.sum(gx * gx), [W])
+
+        def f(W):
+            x_ = x.data
+            gx_ = numerical_grad(lambda x: np.sum(conv2d_reference(x, W, None, 1, 1) ** 2), x_)
+            return np.sum(gx_ * gx_)
+        self.assertTrue(np.allclose(gW.data, numerical_grad(f, W.data, eps=1e-4), rtol=1e-3))
+
+    def test_float32(self):
+        x = Variable(np.random.randn(2, 3, 5, 5).astype(np.float32))
+        conv = L.Conv2d(4, 3, pad=1)
+        y = conv(x)
+        self.assertEqual(y.shape, (2, 4, 5, 5))
+        F.sum(y).backward()
+        for v in (y, x.grad, conv.W.grad, conv.b.grad):
+            self.assertEqual(v.dtype, np.float32)
+
+    def test_plan_cache(self):
+        p = get_conv_plan((8, 3, 32, 32), 3, 1, 1)
+        self.assertIs(p, get_conv_plan((8, 3, 32, 32), (3, 3), (1, 1), (1, 1)))
+        self.assertIsNot(p, get_conv_plan((4, 3, 32, 32), 3, 1, 1))
+
+    def test_jvp(self):
+        x, W = np.random.randn(2, 3, 5, 5), np.random.randn(4, 3, 3, 3)
+        tx, tW = np.random.randn(*x.shape), np.random.randn(*W.shape)
+        _, ty = dezero.jvp(lambda x, W: F.conv2d(x, W, pad=1), [x, W], [tx, tW])
+        expected = conv2d_reference(tx, W, None, 1, 1) + conv2d_reference(x, tW, None, 1, 1)
+        self.assertTrue(np.allclose(ty.data, expected))
+
+    def test_vmap(self):
+        x, W = np.random.randn(3, 2, 2, 5, 5), np.random.randn(4, 2, 3, 3)
+        y = dezero.vmap(lambda x: F.conv2d(x, W))(x)
+        for i in range(3):
+            self.assertTrue(np.allclose(y.data[i], conv2d_reference(x[i], W, None, 1, 0)))
+
+
+class PoolingTest(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+
+    def check(self, f, reduce):
+        for k, stride, pad in ((2, 2, 0), (3, 1, 1), (3, 2, 1)):
+            x_data = np.random.randn(2, 3, 6, 7)
+            y_data = pooling_reference(x_data, k, stride, pad, reduce)
+            gy = np.random.randn(*y_data.shape)
+            gx_num = numerical_grad(
+                lambda x: np.sum(pooling_reference(x, k, stride, pad, reduce) * gy), x_data)
+            for create_graph in (False, True):
+                x = Variable(x_data)
+                y = f(x, k, stride, pad)
+                self.assertTrue(np.allclose(y.data, y_data))
+                gx, = dezero.grad(y, [x], grad_outputs=gy, create_graph=create_graph)
+                self.assertTrue(np.allclose(gx.data, gx_num, atol=1e-5))
+
+    def test_max(self):
+        self.check(F.pooling, np.max)
+
+    def test_average(self):
+        self.check(F.average_pooling, np.mean)
+
+    def test_max_ties(self):
+        x = Variable(np.array([[[[1., 1.], [0., 1.]]]]))
+        y = F.pooling(x, 2, 2)
+        y.backward()
+        self.assertTrue(np.array_equal(x.grad.data, [[[[1., 0.], [0., 0.]]]]))
+
+    def test_integer_input(self):
+        x_data = np.random.randint(0, 256, (2, 3, 6, 7)).astype(np.uint8)
+        for f, reduce in ((F.pooling, np.max), (F.average_pooling, np.mean)):
+            x, x_float = Variable(x_data), Variable(x_data.astype(np.float64))
+            y, y_float = f(x, 3, 2, 1), f(x_float, 3, 2, 1)
+            self.assertTrue(np.array_equal(y.data, y_float.data))
+            self.assertTrue(np.allclose(y.data, pooling_reference(
+                x_data.astype(np.float64), 3, 2, 1, reduce)))
+            self.assertEqual(y.dtype, np.uint8 if f is F.pooling else np.float64)
+            gy = np.random.rand(*y.shape)
+            gx, = dezero.grad(y, [x], grad_outputs=gy)
+            gx_float, = dezero.grad(y_float, [x_float], grad_outputs=gy)
+            self.assertTrue(np.allclose(gx.data, gx_float.data))
+
+    def test_float32(self):
+        for f in (F.pooling, F.average_pooling):
+            x = Variable(np.random.randn(2, 3, 4, 4).astype(np.float32))
+            y = f(x, 2, 2)
+            F.sum(y).backward()
+            self.assertEqual(y.dtype, np.float32)
+            self.assertEqual(x.grad.dtype, np.float32)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
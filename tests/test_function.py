@@ -0,0 +1,81 @@
+import os
+import sys
+import unittest
+import weakref
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero.functions as F
+from dezero import Variable, Function, Parameter, no_grad
+from dezero.models import MLP
+
+
+class Scale(Function):
+    # no __slots__: instances get a __dict__ as before
+    def __init__(self, c):
+        self.c = c
+
+    def forward(self, x):
+        self.x_shape = x.shape
+        return x * self.c
+
+    def backward(self, gy):
+        return gy * self.c
+
+
+class SlotsTest(unittest.TestCase):
+    def test_function_without_slots(self):
+        x = Variable(np.array([1.0, 2.0]))
+        f = Scale(3.0)
+        y = f(x)
+        y.backward()
+        self.assertEqual(f.x_shape, (2,))
+        self.assertTrue(np.array_equal(y.data, [3.0, 6.0]))
+        self.assertTrue(np.array_equal(x.grad.data, [3.0, 3.0]))
+
+    def test_no_unknown_attributes(self):
+        for v in (Variable(np.array(1.0)), Parameter(np.array(1.0))):
+            with self.assertRaises(AttributeError):
+                v.unknown = 1
+        with self.assertRaises(AttributeError):
+            F.Sin().unknown = 1
+
+
+class NoGradTest(unittest.TestCase):
+    def test_nothing_recorded(self):
+        x = Variable(np.array([1.0, 2.0]))
+        f = F.Sin()
+        with no_grad():
+            y = f(x)
+        self.assertIsNone(y.creator)
+        self.assertFalse(y.requires_grad)
+        self.assertEqual(weakref.getweakrefcount(y), 0)
+        self.assertEqual(weakref.getweakrefcount(x), 0)
+        for name in ('inputs', 'outputs', 'generation'):
+            self.assertFalse(hasattr(f, name))
+
+    def test_multiple_outputs(self):
+        class Split(Function):
+            def forward(self, x):
+                return x[:1], x[1:]
+
+        with no_grad():
+            a, b = Split()(Variable(np.array([1.0, 2.0, 3.0])))
+        self.assertIsNone(a.creator)
+        self.assertTrue(np.array_equal(b.data, [2.0, 3.0]))
+
+    def test_matches_backprop_path(self):
+        np.random.seed(0)
+        model = MLP((10, 3), activation=F.tanh)
+        x = np.random.rand(4, 5)
+        y = model(x)
+        with no_grad():
+            y_no_grad = model(x)
+        self.assertIsNotNone(y.creator)
+        self.assertIsNone(y_no_grad.creator)
+        self.assertTrue(np.array_equal(y.data, y_no_grad.data))
+        self.assertEqual(y.dtype, y_no_grad.dtype)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
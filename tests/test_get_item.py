@@ -0,0 +1,76 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable
+
+
+def reference(shape, slices, gy):
+    gx = np.zeros(shape)
+    np.add.at(gx, slices, gy)
+    return gx
+
+
+class GetItemTest(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.x = np.random.rand(6, 5, 4).astype(np.float32)
+
+    def check(self, slices):
+        for create_graph in (False, True):
+            x = Variable(self.x)
+            y = F.get_item(x, slices)
+            self.assertTrue(np.array_equal(y.data, self.x[slices]))
+            gy = np.asarray(np.random.rand(*y.shape), dtype=np.float32)
+            gx, = dezero.grad(y, [x], grad_outputs=gy, create_graph=create_graph)
+            self.assertEqual(gx.dtype, np.float32)
+            self.assertTrue(np.allclose(gx.data, reference(self.x.shape, slices, gy),
+                                        atol=1e-6))
+
+    def test_basic(self):
+        for slices in (1, -1, slice(1, 4), (slice(None), 2),
+                       (Ellipsis, slice(None, None, 2)), (None, 3, slice(1, 3)),
+                       (2, 3, 1)):
+            self.check(slices)
+
+    def test_mask(self):
+        self.check(self.x > 0.5)
+        self.check(self.x[:, 0, 0] > 0.5)
+
+    def test_integer_arrays(self):
+        for slices in (np.array([0, 2, 5]), [1, 1, 4, 1], np.array([-1, 5, 0, 0]),
+                       np.array([[0, 1], [1, 3]]), np.array([], dtype=int),
+                       (slice(None), np.array([4, 0, 4])),
+                       (np.arange(6), np.array([1, 1, 0, 4, 2, 1])),
+                       (np.array([0, 0, 5]), np.array([2, 2, -1]), Ellipsis),
+                       (slice(None), slice(None), np.array([3, 3, 3]))):
+            self.check(slices)
+
+    def test_fallback(self):
+        for slices in ((np.array([0, 0]), slice(None), np.array([1, 1])),
+                       (2, np.array([1, 1, 3])),
+                       (np.array([True, False, True, False, True, True]), 1)):
+            self.check(slices)
+
+    def test_1d(self):
+        x = Variable(np.random.rand(10).astype(np.float32))
+        t = np.array([3, 3, 9, 0, 3])
+        y = x[t]
+        y.backward()
+        self.assertEqual(x.grad.dtype, np.float32)
+        self.assertTrue(np.allclose(x.grad.data, np.bincount(t, minlength=10)))
+
+    def test_label_gather(self):
+        x = Variable(np.random.rand(4, 3))
+        t = np.array([2, 0, 2, 1])
+        y = F.sum(x[np.arange(4), t])
+        y.backward()
+        self.assertTrue(np.array_equal(x.grad.data, np.eye(3)[t]))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
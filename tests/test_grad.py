@@ -0,0 +1,58 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable, Function, Parameter
+
+
+class Counted(Function):
+    calls = 0
+
+    def forward(self, x):
+        return x * 2
+
+    def backward(self, gy):
+        Counted.calls += 1
+        return gy * 2
+
+
+class GradTest(unittest.TestCase):
+    def test_second_order(self):
+        x = Variable(np.array(2.0))
+        y = x ** 4 - 2 * x ** 2
+        gx = dezero.grad(y, x, create_graph=True)
+        gx2 = dezero.grad(gx, x)
+        self.assertEqual(gx.data, 24.0)
+        self.assertEqual(gx2.data, 44.0)
+        self.assertIsNone(x.grad)
+
+    def test_pruned(self):
+        Counted.calls = 0
+        x = Variable(np.array(3.0))
+        W = Parameter(np.array(5.0))
+        y = x * x + Counted()(W)
+        gx, = dezero.grad(y, [x])
+        self.assertEqual(gx.data, 6.0)
+        self.assertEqual(Counted.calls, 0)
+        self.assertIsNone(W.grad)
+
+    def test_intermediate_and_grad_outputs(self):
+        x = Variable(np.random.rand(3, 2))
+        h = F.tanh(x)
+        y = F.sum(h * 3.0, axis=0)
+        gy = np.array([1.0, 2.0])
+        gh, gx = dezero.grad(y, [h, x], grad_outputs=[gy])
+        self.assertTrue(np.allclose(gh.data, np.ones((3, 1)) * gy * 3.0))
+        self.assertTrue(np.allclose(gx.data, gh.data * (1 - h.data ** 2)))
+
+    def test_unreachable(self):
+        x, z = Variable(np.array(1.0)), Variable(np.array(1.0))
+        self.assertIsNone(dezero.grad(x * 2.0, z))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,94 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable, optimizers
+from dezero.core import HessianVectorProduct
+from dezero.models import MLP
+
+
+class HvpTest(unittest.TestCase):
+    def test_matches_hessian(self):
+        np.random.seed(0)
+        A = np.random.rand(3, 3)
+        A = A + A.T
+        x = Variable(np.random.rand(1, 3))
+
+        def f(x):
+            return F.sum(F.matmul(x, A) * x) / 2 + F.sum(x ** 3)
+
+        v = np.random.rand(1, 3)
+        H = A + np.diag(6 * x.data[0])
+        hv = dezero.hvp(f, x, v)
+        self.assertTrue(np.allclose(hv.data, v @ H))
+
+    def test_reuse_graph(self):
+        x = Variable(np.array([1.0, 2.0]))
+        product = HessianVectorProduct(F.sum(x ** 3), x)
+        for v in np.eye(2):
+            self.assertTrue(np.allclose(product(v).data, 6 * x.data * v))
+        self.assertTrue(np.allclose(product.gradient()[0], 3 * x.data ** 2))
+
+    def test_linear_input_has_zero_hessian(self):
+        x0, x1 = Variable(np.array(2.0)), Variable(np.array(3.0))
+        h0, h1 = dezero.hvp(lambda a, b: a ** 2 + b, [x0, x1], [1.0, 1.0])
+        self.assertEqual(h0.data, 2.0)
+        self.assertEqual(h1.data, 0.0)
+
+
+class NewtonCGTest(unittest.TestCase):
+    def test_quadratic_in_one_step(self):
+        np.random.seed(0)
+        x = np.random.rand(20, 3)
+        y = x @ np.array([[1.0], [-2.0], [3.0]]) + 0.5
+        model = dezero.models.Model()
+        model.l1 = dezero.layers.Linear(1)
+
+        def loss_fn():
+            return F.mean_squared_error(model.l1(x), y)
+
+        optimizer = optimizers.NewtonCG(damping=0).setup(model)
+        optimizer.update(loss_fn)
+        self.assertLess(float(loss_fn().data), 1e-8)
+
+    def test_no_accepted_step_keeps_params(self):
+        np.random.seed(0)
+        x = np.random.rand(20, 3)
+        y = x @ np.array([[1.0], [-2.0], [3.0]])
+        model = dezero.models.Model()
+        model.l1 = dezero.layers.Linear(1)
+
+        def loss_fn():
+            return F.mean_squared_error(model.l1(x), y)
+
+        # every trial step overshoots the minimum by far
+        optimizer = optimizers.NewtonCG(lr=1e6, max_backtracks=2).setup(model)
+        before = float(loss_fn().data)
+        origins = [p.data.copy() for p in model.params()]
+        optimizer.update(loss_fn)
+        for p, origin in zip(model.params(), origins):
+            self.assertTrue(np.array_equal(p.data, origin))
+        self.assertEqual(float(loss_fn().data), before)
+
+    def test_mlp_loss_decreases(self):
+        np.random.seed(0)
+        x = np.random.rand(50, 1)
+        y = np.sin(2 * np.pi * x)
+        model = MLP((10, 1))
+        optimizer = optimizers.NewtonCG(damping=1e-2).setup(model)
+
+        def loss_fn():
+            return F.mean_squared_error(model(x), y)
+
+        first = float(optimizer.update(loss_fn).data)
+        for _ in range(20):
+            last = float(optimizer.update(loss_fn).data)
+        self.assertLess(last, first)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
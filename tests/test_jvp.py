@@ -0,0 +1,68 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable
+from dezero.models import MLP
+
+
+def numerical_jvp(f, x, v, eps=1e-6):
+    y0 = f(Variable(x - eps * v)).data
+    y1 = f(Variable(x + eps * v)).data
+    return (y1 - y0) / (2 * eps)
+
+
+class JvpTest(unittest.TestCase):
+    def test_elementwise(self):
+        np.random.seed(0)
+        x = np.random.rand(4, 3)
+        v = np.random.rand(4, 3)
+
+        def f(x):
+            y = F.tanh(x) * F.exp(x) / (x + 2) - x ** 3 + F.sin(x) * F.cos(x)
+            return F.sum(y - F.log(x + 1), axis=0)
+
+        y, ty = dezero.jvp(f, [x], [v])
+        self.assertTrue(np.allclose(y.data, f(Variable(x)).data))
+        self.assertTrue(np.allclose(ty.data, numerical_jvp(f, x, v)))
+
+    def test_mlp_loss(self):
+        np.random.seed(0)
+        model = MLP((5, 2))
+        x = np.random.rand(4, 3)
+        v = np.random.rand(4, 3)
+
+        def f(x):
+            return F.mean_squared_error(model(x), np.ones((4, 2)))
+
+        y, ty = dezero.jvp(f, [x], [v])
+        self.assertTrue(np.allclose(ty.data, numerical_jvp(f, x, v)))
+        # no graph is built
+        self.assertIsNone(y.creator)
+
+    def test_matches_reverse_mode(self):
+        np.random.seed(0)
+        x = Variable(np.random.rand(3))
+        W = np.random.rand(3, 2)
+        x0 = Variable(np.random.rand(3))
+
+        def f(x0, x1):
+            return F.matmul(F.reshape(x0 * x1, (1, 3)), W)
+
+        v = np.random.rand(3)
+        _, ty = dezero.jvp(f, [x0, x], [None, v])
+        y = f(x0, x)
+        rows = [dezero.grad(y, x, grad_outputs=np.eye(2)[[i]]).data for i in range(2)]
+        self.assertTrue(np.allclose(ty.data[0], np.stack(rows) @ v))
+
+    def test_constant_output(self):
+        _, ty = dezero.jvp(lambda x: Variable(np.ones(2)) * 3, [np.ones(2)], [np.ones(2)])
+        self.assertTrue(np.array_equal(ty.data, np.zeros(2)))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,57 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+import dezero.layers as L
+from dezero import Variable, Parameter
+
+
+class LinearTest(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.x = np.random.rand(2, 3, 4)
+        self.W = np.random.rand(4, 5)
+        self.b = np.random.rand(5)
+        self.gy = np.random.rand(2, 3, 5)
+
+    def check_grads(self, gx, gW, gb):
+        x, W, gy = self.x, self.W, self.gy
+        self.assertTrue(np.allclose(gx, gy @ W.T))
+        self.assertTrue(np.allclose(gW, np.einsum('abi,abo->io', x, gy)))
+        self.assertTrue(np.allclose(gb, gy.sum(axis=(0, 1))))
+
+    def test_leading_axes(self):
+        x, W, b = Variable(self.x), Parameter(self.W), Parameter(self.b)
+        y = F.linear(x, W, b)
+        self.assertTrue(np.allclose(y.data, self.x @ self.W + self.b))
+        y.grad = Variable(self.gy)
+        y.backward()
+        self.check_grads(x.grad.data, W.grad.data, b.grad.data)
+
+    def test_create_graph(self):
+        x, W, b = Variable(self.x), Parameter(self.W), Parameter(self.b)
+        gxs = dezero.grad(F.linear(x, W, b), [x, W, b], grad_outputs=self.gy,
+                          create_graph=True)
+        self.check_grads(*[gx.data for gx in gxs])
+
+    def test_nobias(self):
+        layer = L.Linear(3, nobias=True)
+        x = Variable(np.random.rand(4, 2))
+        y = layer(x)
+        F.sum(y).backward()
+        self.assertTrue(np.allclose(y.data, x.data @ layer.W.data))
+        self.assertEqual([p.name for p in layer.params()], ['W'])
+        self.assertEqual(layer.W.grad.shape, (2, 3))
+
+    def test_single_node(self):
+        y = F.linear(Variable(self.x), Parameter(self.W), Parameter(self.b))
+        self.assertIsInstance(y.creator, F.Linear)
+        self.assertTrue(all(x.creator is None for x in y.creator.inputs))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,139 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable
+from gradient_check import numerical_grad
+
+
+SHAPES = [((3,), (3, 4)), ((2, 3), (3,)), ((3,), (3,)), ((2, 3), (3, 4)),
+          ((5, 2, 3), (3, 4)), ((2, 3), (5, 3, 4)), ((5, 2, 3), (5, 3, 4)),
+          ((5, 1, 2, 3), (4, 3, 2)), ((5, 2, 3), (3,)), ((3,), (5, 3, 4))]
+
+
+class MatMulTest(unittest.TestCase):
+    def test_shapes(self):
+        np.random.seed(0)
+        for x_shape, W_shape in SHAPES:
+            x_data = np.random.rand(*x_shape)
+            W_data = np.random.rand(*W_shape)
+            y_data = np.matmul(x_data, W_data)
+            gy = np.asarray(np.random.rand(*y_data.shape))
+            gx_num = numerical_grad(lambda x: np.sum(np.matmul(x, W_data) * gy), x_data)
+            gW_num = numerical_grad(lambda W: np.sum(np.matmul(x_data, W) * gy), W_data)
+            for create_graph in (False, True):
+                x, W = Variable(x_data), Variable(W_data)
+                y = F.matmul(x, W)
+                self.assertTrue(np.allclose(y.data, y_data))
+                gx, gW = dezero.grad(y, [x, W], grad_outputs=gy, create_graph=create_graph)
+                self.assertTrue(np.allclose(gx.data, gx_num), (x_shape, W_shape))
+                self.assertTrue(np.allclose(gW.data, gW_num), (x_shape, W_shape))
+
+    def test_double_backward(self):
+        x = Variable(np.random.rand(4, 2, 3))
+        W = Variable(np.random.rand(4, 3, 2))
+        y = F.sum(F.matmul(x, W) ** 2)
+        gx, = dezero.grad(y, [x], create_graph=True)
+        gW, = dezero.grad(F.sum(gx), [W])
+        gW_num = numerical_grad(
+            lambda W: np.sum(2 * np.matmul(np.matmul(x.data, W), np.swapaxes(W, -1, -2))),
+            W.data)
+        self.assertTrue(np.allclose(gW.data, gW_num))
+
+    def test_vmap(self):
+        x = np.random.rand(5, 2, 3)
+        W = np.random.rand(5, 3, 4)
+        y = dezero.vmap(F.matmul)(x, W)
+        self.assertTrue(np.allclose(y.data, x @ W))
+        y = dezero.vmap(F.matmul, in_axes=(None, 0))(x[0], W)
+        self.assertTrue(np.allclose(y.data, x[0] @ W))
+        y = dezero.vmap(F.matmul)(x[:, 0], W)
+        self.assertTrue(np.allclose(y.data, (x[:, :1] @ W)[:, 0]))
+
+    def test_vmap_shapes(self):
+        np.random.seed(0)
+        B = 4
+        for x_shape, W_shape in SHAPES:
+            for in_axes in ((0, 0), (0, None), (None, 0)):
+                x = np.random.rand(*((B,) if in_axes[0] == 0 else ()) + x_shape)
+                W = np.random.rand(*((B,) if in_axes[1] == 0 else ()) + W_shape)
+                xv, Wv = Variable(x), Variable(W)
+                y = dezero.vmap(F.matmul, in_axes=in_axes)(xv, Wv)
+                gy = np.asarray(np.random.rand(*y.shape))
+                gx, gW = dezero.grad(y, [xv, Wv], grad_outputs=gy)
+
+                # the same through one matmul per example
+                xv2, Wv2 = Variable(x), Variable(W)
+                ys = [F.matmul(xv2[i] if in_axes[0] == 0 else xv2,
+                               Wv2[i] if in_axes[1] == 0 else Wv2) for i in range(B)]
+                gx2, gW2 = dezero.grad(ys, [xv2, Wv2], grad_outputs=list(gy))
+                case = (x_shape, W_shape, in_axes)
+                self.assertEqual(y.shape, (B,) + np.matmul(np.ones(x_shape),
+                                                           np.ones(W_shape)).shape, case)
+                for i in range(B):
+                    self.assertTrue(np.allclose(y.data[i], ys[i].data), case)
+                self.assertTrue(np.allclose(gx.data, gx2.data), case)
+                self.assertTrue(np.allclose(gW.data, gW2.data), case)
+
+    def test_vmap_backward(self):
+        x_data, W_data = np.random.rand(4, 5, 2, 3), np.random.rand(4, 5, 3, 2)
+        x, W = Variable(x_data), Variable(W_data)
+        y = dezero.vmap(F.matmul)(x, W)
+        self.assertTrue(np.allclose(y.data, x_data @ W_data))
+        gy = np.random.rand(*y.shape)
+        gx, gW = dezero.grad(y, [x, W], grad_outputs=gy)
+        self.assertTrue(np.allclose(gx.data, gy @ np.swapaxes(W_data, -1, -2)))
+        self.assertTrue(np.allclose(gW.data, np.swapaxes(x_data, -1, -2) @ gy))
+
+
+class TransposeTest(unittest.TestCase):
+    def test_axes(self):
+        x_data = np.random.rand(2, 3, 4)
+        for axes in (None, (1, 0, 2), (2, 0, 1), (-1, 0, -2)):
+            for create_graph in (False, True):
+                x = Variable(x_data)
+                y = F.transpose(x, axes)
+                self.assertTrue(np.array_equal(y.data, np.transpose(x_data, axes)))
+                gy = np.random.rand(*y.shape)
+                gx, = dezero.grad(y, [x], grad_outputs=gy, create_graph=create_graph)
+                inv = None if axes is None else np.argsort([a % 3 for a in axes])
+                self.assertTrue(np.array_equal(gx.data, np.transpose(gy, inv)))
+
+    def test_swapaxes(self):
+        x = Variable(np.random.rand(2, 3, 4))
+        y = F.swapaxes(x, 0, -1)
+        self.assertTrue(np.array_equal(y.data, np.swapaxes(x.data, 0, -1)))
+        gy = np.random.rand(*y.shape)
+        y.grad = Variable(gy)
+        y.backward()
+        self.assertTrue(np.array_equal(x.grad.data, np.swapaxes(gy, 0, -1)))
+
+    def test_swapaxes_vmap(self):
+        x = Variable(np.random.rand(5, 2, 3, 4))
+        y = dezero.vmap(lambda x: F.swapaxes(x, 0, -1))(x)
+        self.assertTrue(np.array_equal(y.data, np.swapaxes(x.data, 1, 3)))
+        gy = np.random.rand(*y.shape)
+        gx, = dezero.grad(y, [x], grad_outputs=gy)
+        self.assertTrue(np.array_equal(gx.data, np.swapaxes(gy, 1, 3)))
+
+    def test_variable_transpose(self):
+        x = Variable(np.random.rand(2, 3, 4))
+        self.assertEqual(x.transpose().shape, (4, 3, 2))
+        self.assertEqual(x.transpose(1, 2, 0).shape, (3, 4, 2))
+        self.assertEqual(x.transpose((1, 2, 0)).shape, (3, 4, 2))
+        self.assertEqual(x.T.shape, (4, 3, 2))
+
+    def test_vmap(self):
+        x = np.random.rand(5, 2, 3, 4)
+        y = dezero.vmap(lambda x: F.transpose(x, (2, 0, 1)))(x)
+        self.assertTrue(np.array_equal(y.data, x.transpose(0, 3, 1, 2)))
+        y = dezero.vmap(F.transpose)(x)
+        self.assertTrue(np.array_equal(y.data, x.transpose(0, 3, 2, 1)))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,110 @@
+import os
+import sys
+import threading
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable, MemoryPool
+from dezero.models import MLP
+
+
+class MemoryPoolTest(unittest.TestCase):
+    def test_buffer_reused_after_release(self):
+        pool = MemoryPool()
+        x = pool.empty((10, 10))
+        view = x.T
+        del x
+        pool.empty((10, 10))
+        self.assertEqual(pool.stats()['misses'], 2)  # still viewed
+
+        del view
+        y = pool.empty((16, 16), np.float32)  # same size class
+        self.assertEqual(y.shape, (16, 16))
+        self.assertEqual(y.dtype, np.float32)
+        self.assertEqual(pool.stats()['hits'], 1)
+
+    def test_referenced_buffer_not_reissued(self):
+        pool = MemoryPool()
+        x = pool.empty((10, 10))
+        x.fill(1)
+        held = [x]                        # an extra reference
+        view = x.T.reshape(-1)[::2]       # and a view of a view
+        del x
+        for _ in range(2):
+            ys = [pool.empty((10, 10)) for _ in range(4)]
+            for y in ys:
+                self.assertFalse(np.shares_memory(y, view))
+                y.fill(0)
+            self.assertTrue((view == 1).all())
+            del ys
+            held.clear()                  # the view alone still uses it
+
+        hits = pool.stats()['hits']
+        del view
+        pool.empty((10, 10))
+        self.assertEqual(pool.stats()['hits'], hits + 1)
+
+    def test_shared_between_threads(self):
+        pool = MemoryPool()
+        errors = []
+
+        def work(value):
+            for _ in range(200):
+                xs = [pool.empty(100) for _ in range(3)]
+                for x in xs:
+                    x.fill(value)
+                if any((x != value).any() for x in xs):
+                    errors.append(value)
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(pool.stats()['bytes_in_use'], 0)
+
+    def test_max_bytes_evicts(self):
+        pool = MemoryPool(max_bytes=2048)
+        xs = [pool.empty(256) for _ in range(3)]  # 2048 bytes each
+        del xs
+        pool.collect()
+        pool.evict()
+        stats = pool.stats()
+        self.assertEqual(stats['bytes_held'], 2048)
+        self.assertEqual(stats['evictions'], 2)
+
+    def test_training_step_matches(self):
+        np.random.seed(0)
+        model = MLP((10, 1))
+        x = np.random.rand(8, 3)
+        t = np.random.rand(8, 1)
+
+        def step():
+            model.cleargrads()
+            loss = F.mean_squared_error(model(x), t)
+            loss.backward()
+            return loss.data.copy(), [p.grad.data.copy() for p in model.params()]
+
+        expected = step()
+        pool = MemoryPool()
+        with dezero.using_memory_pool(pool):
+            for _ in range(3):
+                loss, grads = step()
+                self.assertTrue(np.allclose(loss, expected[0]))
+                for g, e in zip(grads, expected[1]):
+                    self.assertTrue(np.allclose(g, e))
+        self.assertGreater(pool.stats()['hits'], 0)
+
+    def test_inactive_outside_block(self):
+        with dezero.using_memory_pool():
+            pass
+        y = Variable(np.ones(3)) * 2
+        self.assertIsNone(y.data.base)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
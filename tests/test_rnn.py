@@ -0,0 +1,258 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+import dezero.layers as L
+from dezero import Variable
+from gradient_check import numerical_grad
+
+
+def sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+def lstm_reference(c, gates):
+    a, i, f, o = np.split(gates, 4, axis=-1)
+    c = np.tanh(a) * sigmoid(i) + sigmoid(f) * c
+    return c, sigmoid(o) * np.tanh(c)
+
+
+def gru_reference(h, gx, gh):
+    H = h.shape[-1]
+    r = sigmoid(gx[..., :H] + gh[..., :H])
+    z = sigmoid(gx[..., H:2 * H] + gh[..., H:2 * H])
+    n = np.tanh(gx[..., 2 * H:] + r * gh[..., 2 * H:])
+    return (1 - z) * n + z * h
+
+
+def count_funcs(y):
+    funcs, stack = set(), [y.creator]
+    while stack:
+        f = stack.pop()
+        if f is None or f in funcs:
+            continue
+        funcs.add(f)
+        stack.extend(x.creator for x in f.inputs)
+    return len(funcs)
+
+
+class ConcatTest(unittest.TestCase):
+    def test_forward_backward(self):
+        xs_data = [np.random.rand(2, 3), np.random.rand(2, 1), np.random.rand(2, 4)]
+        gy = np.random.rand(2, 8)
+        for create_graph in (False, True):
+            xs = [Variable(x) for x in xs_data]
+            y = F.concat(xs, axis=-1)
+            self.assertTrue(np.array_equal(y.data, np.concatenate(xs_data, axis=1)))
+            gxs = dezero.grad(y, xs, grad_outputs=gy, create_graph=create_graph)
+            for gx, expected in zip(gxs, np.split(gy, [3, 4], axis=1)):
+                self.assertTrue(np.array_equal(gx.data, expected))
+
+    def test_vmap(self):
+        x, h = np.random.rand(5, 2, 3), np.random.rand(2, 4)
+        y = dezero.vmap(lambda x: F.concat([x, h], axis=1))(x)
+        for i in range(5):
+            self.assertTrue(np.array_equal(y.data[i], np.concatenate([x[i], h], axis=1)))
+
+
+class LSTMTest(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+
+    def test_forward_backward(self):
+        c_data, g_data = np.random.randn(2, 3), np.random.randn(2, 12)
+        gc, gh = np.random.randn(2, 3), np.random.randn(2, 3)
+        for grad_outputs in ([gc, gh], [gc, None], [None, gh]):
+            def loss(c, g):
+                return sum(np.sum(y * gy) for y, gy in zip(lstm_reference(c, g), grad_outputs)
+                           if gy is not None)
+            gc_num = numerical_grad(lambda c: loss(c, g_data), c_data)
+            gg_num = numerical_grad(lambda g: loss(c_data, g), g_data)
+
+            for create_graph in (False, True):
+                c, g = Variable(c_data), Variable(g_data)
+                ys = F.lstm(c, g)
+                for y, expected in zip(ys, lstm_reference(c_data, g_data)):
+                    self.assertTrue(np.allclose(y.data, expected))
+                outputs = [y for y, gy in zip(ys, grad_outputs) if gy is not None]
+                gys = [gy for gy in grad_outputs if gy is not None]
+                gx_c, gx_g = dezero.grad(outputs, [c, g], grad_outputs=gys,
+                                         create_graph=create_graph)
+                self.assertTrue(np.allclose(gx_c.data, gc_num))
+                self.assertTrue(np.allclose(gx_g.data, gg_num))
+
+    def test_jvp(self):
+        c, g = np.random.randn(2, 3), np.random.randn(2, 12)
+        tc, tg = np.random.randn(*c.shape), np.random.randn(*g.shape)
+        _, (tc_out, th_out) = dezero.jvp(F.lstm, [c, g], [tc, tg])
+        eps = 1e-6
+        (c1, h1), (c0, h0) = lstm_reference(c + eps * tc, g + eps * tg), \
+            lstm_reference(c - eps * tc, g - eps * tg)
+        self.assertTrue(np.allclose(tc_out.data, (c1 - c0) / (2 * eps)))
+        self.assertTrue(np.allclose(th_out.data, (h1 - h0) / (2 * eps)))
+
+    def test_vmap(self):
+        c, g = np.random.randn(2, 3), np.random.randn(4, 2, 12)
+        c_out, h_out = dezero.vmap(F.lstm, in_axes=(None, 0))(c, g)
+        for i in range(4):
+            expected = lstm_reference(c, g[i])
+            self.assertTrue(np.allclose(c_out.data[i], expected[0]))
+            self.assertTrue(np.allclose(h_out.data[i], expected[1]))
+
+    def test_integer_input(self):
+        c, g = np.random.randint(-2, 3, (2, 3)), np.random.randint(-2, 3, (2, 12))
+        gc, gh = np.random.randn(2, 3), np.random.randn(2, 3)
+        grads = []
+        for dtype in (None, np.float64):
+            xs = [Variable(c if dtype is None else c.astype(dtype)),
+                  Variable(g if dtype is None else g.astype(dtype))]
+            ys = F.lstm(*xs)
+            self.assertEqual(ys[1].dtype, np.float64)
+            grads.append(dezero.grad(ys, xs, grad_outputs=[gc, gh]))
+        for g_int, g_float in zip(*grads):
+            self.assertTrue(np.allclose(g_int.data, g_float.data))
+
+
+class GRUTest(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+
+    def test_forward_backward(self):
+        args = [np.random.randn(2, 3), np.random.randn(2, 9), np.random.randn(2, 9)]
+        gy = np.random.randn(2, 3)
+        for create_graph in (False, True):
+            xs = [Variable(a) for a in args]
+            y = F.gru(*xs)
+            self.assertTrue(np.allclose(y.data, gru_reference(*args)))
+            gxs = dezero.grad(y, xs, grad_outputs=gy, create_graph=create_graph)
+            for k, gx in enumerate(gxs):
+                def loss(v, k=k):
+                    a = list(args)
+                    a[k] = v
+                    return np.sum(gru_reference(*a) * gy)
+                self.assertTrue(np.allclose(gx.data, numerical_grad(loss, args[k])))
+
+    def test_integer_input(self):
+        args = [np.random.randint(-2, 3, (2, 3)), np.random.randint(-2, 3, (2, 9)),
+                np.random.randint(-2, 3, (2, 9))]
+        y = F.gru(*args)
+        self.assertEqual(y.dtype, np.float64)
+        self.assertTrue(np.allclose(y.data, gru_reference(*args)))
+        xs = [Variable(a) for a in args]
+        gxs = dezero.grad(F.gru(*xs), xs, grad_outputs=np.ones((2, 3)))
+        xs = [Variable(a.astype(np.float64)) for a in args]
+        for gx, expected in zip(gxs, dezero.grad(F.gru(*xs), xs, grad_outputs=np.ones((2, 3)))):
+            self.assertTrue(np.allclose(gx.data, expected.data))
+
+    def test_jvp(self):
+        args = [np.random.randn(2, 3), np.random.randn(2, 9), np.random.randn(2, 9)]
+        ts = [np.random.randn(*a.shape) for a in args]
+        _, ty = dezero.jvp(F.gru, args, ts)
+        eps = 1e-6
+        y1 = gru_reference(*[a + eps * t for a, t in zip(args, ts)])
+        y0 = gru_reference(*[a - eps * t for a, t in zip(args, ts)])
+        self.assertTrue(np.allclose(ty.data, (y1 - y0) / (2 * eps)))
+
+
+class RecurrentLayerTest(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+
+    def run_reference(self, layer, xs):
+        h = np.zeros((xs.shape[1], layer.hidden_size))
+        c = np.zeros_like(h)
+        hs = []
+        for x in xs:
+            if isinstance(layer, L.GRU):
+                h = gru_reference(h, x @ layer.Wx.data + layer.b.data, h @ layer.Wh.data)
+            elif isinstance(layer, L.LSTM):
+                c, h = lstm_reference(c, np.concatenate([x, h], axis=1) @ layer.W.data
+                                      + layer.b.data)
+            else:
+                h = np.tanh(np.concatenate([x, h], axis=1) @ layer.W.data + layer.b.data)
+            hs.append(h)
+        return hs
+
+    def test_sequence(self):
+        xs = np.random.randn(4, 2, 3)
+        for cls in (L.RNN, L.LSTM, L.GRU):
+            layer = cls(5, dtype=np.float64)
+            hs = [layer(x) for x in xs]
+            for h, expected in zip(hs, self.run_reference(layer, xs)):
+                self.assertTrue(np.allclose(h.data, expected), cls.__name__)
+
+            # the gradient through all the steps
+            layer.cleargrads()
+            F.sum(hs[-1]).backward()
+            for param in layer.params():
+                def loss(data, param=param):
+                    saved, param.data = param.data, data
+                    y = np.sum(self.run_reference(layer, xs)[-1])
+                    param.data = saved
+                    return y
+                self.assertTrue(np.allclose(param.grad.data, numerical_grad(loss, param.data)),
+                                (cls.__name__, param.name))
+
+    def test_reset_state(self):
+        x = np.random.randn(2, 3)
+        for cls in (L.RNN, L.LSTM, L.GRU):
+            layer = cls(4, in_size=3, dtype=np.float64)
+            y0 = layer(x)
+            self.assertFalse(np.allclose(layer(x).data, y0.data))
+            layer.reset_state()
+            self.assertTrue(np.allclose(layer(x).data, y0.data))
+
+    def test_funcs_per_step(self):
+        x = np.random.randn(2, 3).astype(np.float32)
+        for cls in (L.RNN, L.LSTM, L.GRU):
+            layer = cls(4)
+            layer(x)
+            n = count_funcs(layer.h)
+            layer(x)
+            self.assertEqual(count_funcs(layer.h) - n, 3, cls.__name__)
+
+    def test_truncated_bptt(self):
+        xs = np.random.randn(12, 2, 3).astype(np.float32)
+        for cls in (L.RNN, L.LSTM, L.GRU):
+            layer = cls(4)
+            counts = []
+            for t, x in enumerate(xs):
+                y = layer(x)
+                if t % 4 == 3:
+                    loss = F.sum(y)
+                    counts.append(count_funcs(loss))
+                    layer.cleargrads()
+                    loss.backward()
+                    layer.unchain()
+            # every window builds the same graph instead of a growing one
+            self.assertEqual(len(set(counts[1:])), 1, cls.__name__)
+            self.assertLessEqual(counts[1], counts[0] + 1)
+
+    def test_unchain_backward(self):
+        x = Variable(np.random.randn(2, 3))
+        h = F.tanh(F.tanh(x))
+        y = F.sum(h)
+        y.unchain_backward()
+        self.assertIsNone(y.creator)
+        self.assertIsNone(h.creator)
+        self.assertTrue(np.allclose(h.data, np.tanh(np.tanh(x.data))))
+
+    def test_float32(self):
+        x = np.random.randn(2, 3).astype(np.float32)
+        for cls in (L.RNN, L.LSTM, L.GRU):
+            layer = cls(4)
+            layer(x)
+            y = layer(x)
+            F.sum(y).backward()
+            self.assertEqual(y.dtype, np.float32)
+            for param in layer.params():
+                self.assertEqual(param.dtype, np.float32)
+                self.assertEqual(param.grad.dtype, np.float32)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
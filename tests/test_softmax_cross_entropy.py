@@ -0,0 +1,75 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable
+
+
+class SoftmaxCrossEntropyTest(unittest.TestCase):
+    def test_matches_simple(self):
+        np.random.seed(0)
+        x = np.random.randn(5, 4)
+        t = np.array([0, 3, 1, 2, 2])
+
+        x0, x1 = Variable(x), Variable(x)
+        y0 = F.softmax_cross_entropy(x0, t)
+        y1 = F.softmax_cross_entropy_simple(x1, t)
+        y0.backward()
+        y1.backward()
+        self.assertTrue(np.allclose(y0.data, y1.data))
+        self.assertTrue(np.allclose(x0.grad.data, x1.grad.data))
+
+    def test_create_graph(self):
+        np.random.seed(0)
+        x = Variable(np.random.randn(3, 4))
+        t = np.array([1, 0, 3])
+        gx = dezero.grad(F.softmax_cross_entropy(x, t), x, create_graph=True)
+        p = np.exp(x.data) / np.exp(x.data).sum(axis=1, keepdims=True)
+        self.assertTrue(np.allclose(gx.data, (p - np.eye(4)[t]) / 3))
+        self.assertIsNotNone(gx.creator)
+
+    def test_integer_logits(self):
+        x = np.array([[2, 0, 1], [0, 3, 1]])
+        t = np.array([0, 2])
+        y = F.softmax_cross_entropy(x, t)
+        expected = F.softmax_cross_entropy_simple(x.astype(np.float64), t)
+        self.assertTrue(np.allclose(y.data, expected.data))
+
+    def test_large_logits(self):
+        x = Variable(np.array([[1000.0, 0.0], [0.0, 1000.0]]))
+        y = F.softmax_cross_entropy(x, np.array([1, 1]))
+        y.backward()
+        self.assertTrue(np.isfinite(y.data))
+        self.assertAlmostEqual(float(y.data), 500.0)
+        self.assertTrue(np.allclose(x.grad.data, [[0.5, -0.5], [0.0, 0.0]]))
+
+
+    def test_vmap(self):
+        np.random.seed(0)
+        xs = np.random.randn(4, 3, 5)
+        ts = np.random.randint(0, 5, (4, 3))
+        for in_axes in ((0, 0), (0, None), (None, 0)):
+            x = Variable(xs if in_axes[0] == 0 else xs[0])
+            t = ts if in_axes[1] == 0 else ts[0]
+            y = dezero.vmap(F.softmax_cross_entropy, in_axes=in_axes)(x, t)
+            gx = dezero.grad(F.sum(y), x)
+            gx_expected = np.zeros_like(x.data)
+            for i in range(4):
+                xi = Variable(xs[i] if in_axes[0] == 0 else xs[0])
+                ti = ts[i] if in_axes[1] == 0 else ts[0]
+                yi = F.softmax_cross_entropy_simple(xi, ti)
+                yi.backward()
+                self.assertTrue(np.allclose(y.data[i], yi.data), in_axes)
+                if in_axes[0] == 0:
+                    gx_expected[i] = xi.grad.data
+                else:
+                    gx_expected += xi.grad.data
+            self.assertTrue(np.allclose(gx.data, gx_expected), in_axes)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
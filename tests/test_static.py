@@ -0,0 +1,61 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero.functions as F
+from dezero.models import MLP
+from dezero.static import capture
+
+
+def eager_grads(model, x, t):
+    model.cleargrads()
+    loss = F.mean_squared_error(model(x), t)
+    loss.backward()
+    return loss.data, [p.grad.data.copy() for p in model.params()]
+
+
+class StaticGraphTest(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.model = MLP((10, 1))
+        self.step = capture(lambda x, t: F.mean_squared_error(self.model(x), t))
+        self.x = np.random.rand(20, 1)
+        self.t = np.sin(2 * np.pi * self.x)
+
+    def check_step(self, x, t):
+        self.model.cleargrads()
+        loss = self.step(x, t)
+        grads = [p.grad.data.copy() for p in self.model.params()]
+        expected_loss, expected_grads = eager_grads(self.model, x, t)
+        self.assertTrue(np.allclose(loss.data, expected_loss))
+        for g, expected in zip(grads, expected_grads):
+            self.assertTrue(np.allclose(g, expected))
+
+    def test_replay(self):
+        self.check_step(self.x, self.t)
+        x = np.random.rand(20, 1)
+        self.check_step(x, np.cos(x))
+        self.assertIsNotNone(self.step.tape)
+
+    def test_shape_change_falls_back_to_eager(self):
+        self.check_step(self.x, self.t)
+        tape = self.step.tape
+        self.check_step(self.x[:7], self.t[:7])
+        self.assertIs(self.step.tape, tape)
+        self.check_step(self.x, self.t)
+
+    def test_fuse_elementwise(self):
+        # sigmoid_simple is a chain of four elementwise Functions
+        self.model.activation = F.sigmoid_simple
+        step = capture(lambda x, t: F.mean_squared_error(self.model(x), t), fuse=True)
+        self.step = step
+        self.check_step(self.x, self.t)
+        self.check_step(np.random.rand(20, 1), self.t)
+        names = [type(f).__name__ for f, _ in step.tape]
+        self.assertEqual(names, ['Linear', 'FusedElementwise', 'Linear', 'MeanSquaredError'])
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,94 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable
+
+
+AXES = [None, 0, 1, -1, (0, 2), (2, 0), (-3, -1), (0, 1, 2)]
+
+
+class SumTest(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.x = np.random.rand(2, 3, 4)
+
+    def check(self, axis, keepdims, create_graph):
+        x = Variable(self.x)
+        y = F.sum(x, axis=axis, keepdims=keepdims)
+        expected = self.x.sum(axis=axis, keepdims=keepdims)
+        self.assertTrue(np.allclose(y.data, expected))
+
+        gy = np.asarray(np.random.rand(*expected.shape))
+        gx, = dezero.grad(y, [x], grad_outputs=gy, create_graph=create_graph)
+        if axis is not None and not keepdims:
+            gy = np.expand_dims(gy, axis)
+        self.assertEqual(gx.shape, self.x.shape)
+        self.assertTrue(np.allclose(gx.data, np.broadcast_to(gy, self.x.shape)))
+
+    def test_axes(self):
+        for axis in AXES:
+            for keepdims in (False, True):
+                for create_graph in (False, True):
+                    self.check(axis, keepdims, create_graph)
+
+    def test_backward_is_a_view(self):
+        x = Variable(np.random.rand(1000, 50))
+        F.sum(x, axis=0).backward()
+        self.assertEqual(x.grad.data.strides[0], 0)
+
+    def test_mean(self):
+        x = Variable(self.x)
+        y = F.mean(x, axis=(0, 2), keepdims=True)
+        self.assertTrue(np.allclose(y.data, self.x.mean(axis=(0, 2), keepdims=True)))
+        y.backward()
+        self.assertTrue(np.allclose(x.grad.data, np.full(self.x.shape, 1 / 8)))
+
+        x = Variable(self.x.astype(np.float32))
+        y = F.mean(x, axis=1)
+        y.backward()
+        self.assertEqual(y.dtype, np.float32)
+        self.assertEqual(x.grad.dtype, np.float32)
+        self.assertEqual(F.mean(np.arange(4)).data, 1.5)
+
+
+class MaxTest(unittest.TestCase):
+    def test_forward_backward(self):
+        np.random.seed(0)
+        x_data = np.random.rand(2, 3, 4)
+        for f, ref in ((F.max, np.max), (F.min, np.min)):
+            for axis in AXES:
+                for create_graph in (False, True):
+                    x = Variable(x_data)
+                    y = f(x, axis=axis)
+                    self.assertTrue(np.allclose(y.data, ref(x_data, axis=axis)))
+                    gx, = dezero.grad(F.sum(y), [x], create_graph=create_graph)
+                    y_keep = ref(x_data, axis=axis, keepdims=True)
+                    self.assertTrue(np.allclose(gx.data, x_data == y_keep))
+
+    def test_ties(self):
+        x = Variable(np.array([[1., 3., 3.], [2., 0., 1.]]))
+        y = F.max(x, axis=1, keepdims=True)
+        y.backward()
+        self.assertTrue(np.array_equal(x.grad.data, [[0, 1, 1], [1, 0, 0]]))
+
+    def test_jvp(self):
+        x = np.array([[1., 5., 2.], [4., 0., 3.]])
+        t = np.random.rand(2, 3)
+        _, ty = dezero.jvp(lambda x: F.max(x, axis=0), [x], [t])
+        self.assertTrue(np.allclose(ty.data, [t[1, 0], t[0, 1], t[1, 2]]))
+
+    def test_vmap(self):
+        x = np.random.rand(5, 3, 4)
+        y = dezero.vmap(lambda x: F.max(x, axis=-1))(x)
+        self.assertTrue(np.allclose(y.data, x.max(axis=-1)))
+        y = dezero.vmap(lambda x: F.sum(x, axis=(0, 1)))(x)
+        self.assertTrue(np.allclose(y.data, x.sum(axis=(1, 2))))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,55 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable
+
+
+def tile_grad(x_shape, reps, gy):
+    """Sum of the gy blocks, one per tile."""
+    reps = (reps,) if isinstance(reps, int) else tuple(reps)
+    ndim = max(len(reps), len(x_shape))
+    reps = (1,) * (ndim - len(reps)) + reps
+    shape = (1,) * (ndim - len(x_shape)) + tuple(x_shape)
+    gx = np.zeros(shape)
+    for block in np.ndindex(*reps):
+        gx += gy[tuple(slice(b * n, (b + 1) * n) for b, n in zip(block, shape))]
+    return gx.reshape(x_shape)
+
+
+class TileTest(unittest.TestCase):
+    def test_backward(self):
+        np.random.seed(0)
+        cases = [((3,), 2), ((3,), (2, 2)), ((2, 3), (2, 1)), ((2, 3), (1, 3)),
+                 ((2, 3), 2), ((2, 1, 3), (2, 3, 1)), ((4, 5), (2, 1, 3)),
+                 ((2, 3), (1, 1)), ((), 3)]
+        for shape, reps in cases:
+            for create_graph in (False, True):
+                x = Variable(np.asarray(np.random.rand(*shape)))
+                y = F.tile(x, reps)
+                self.assertTrue(np.array_equal(y.data, np.tile(x.data, reps)))
+                gy = np.random.rand(*y.shape)
+                gx, = dezero.grad(y, [x], grad_outputs=gy, create_graph=create_graph)
+                self.assertEqual(gx.shape, shape)
+                self.assertTrue(np.allclose(gx.data, tile_grad(shape, reps, gy)))
+
+    def test_double_backward(self):
+        x = Variable(np.array([1., 2., 3.]))
+        y = F.sum(F.tile(x, (2, 2)) ** 2)
+        gx, = dezero.grad(y, [x], create_graph=True)
+        self.assertTrue(np.allclose(gx.data, 8 * x.data))
+        ggx, = dezero.grad(F.sum(gx), [x])
+        self.assertTrue(np.allclose(ggx.data, 8.))
+
+    def test_variable_tile(self):
+        x = Variable(np.random.rand(2, 3))
+        x.tile((3, 1)).backward()
+        self.assertTrue(np.allclose(x.grad.data, 3.))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,74 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import dezero
+import dezero.functions as F
+from dezero import Variable
+from dezero.models import MLP
+
+
+class VmapTest(unittest.TestCase):
+    def test_scalar_function_gradients(self):
+        x = Variable(np.array([0.5, 1.0, 2.0]))
+        y = dezero.vmap(lambda x: x ** 4 - 2 * x ** 2)(x)
+        y.backward()
+        self.assertTrue(np.allclose(x.grad.data, 4 * x.data ** 3 - 4 * x.data))
+
+    def test_matches_loop(self):
+        np.random.seed(0)
+        model = MLP((6, 3))
+        x, t = np.random.rand(4, 2, 5), np.random.rand(4, 2, 3)
+        model(x[0])  # Linear reads the input size from .shape
+
+        def loss(x, t):
+            return F.mean_squared_error(model(x), t)
+
+        xb = Variable(x)
+        losses = dezero.vmap(loss)(xb, t)
+        F.sum(losses).backward()
+        for i in range(4):
+            xi = Variable(x[i])
+            y = loss(xi, t[i])
+            y.backward()
+            self.assertTrue(np.allclose(losses.data[i], y.data))
+            self.assertTrue(np.allclose(xb.grad.data[i], xi.grad.data))
+
+    def test_per_example_weights(self):
+        np.random.seed(0)
+        x = np.random.rand(3, 1, 4)
+        W = Variable(np.random.rand(3, 4, 2))
+
+        def f(x, W):
+            return F.sum(F.tanh(F.matmul(x, W)))
+
+        F.sum(dezero.vmap(f)(x, W)).backward()
+        for i in range(3):
+            Wi = Variable(W.data[i])
+            f(x[i], Wi).backward()
+            self.assertTrue(np.allclose(W.grad.data[i], Wi.grad.data))
+
+    def test_tensor_ops(self):
+        np.random.seed(0)
+        x = np.random.rand(3, 3)
+
+        def f(x):
+            y = F.sum(F.broadcast_to(x[1:], (2, 2)), axis=0)
+            return y + F.sum_to(F.tile(x, (2,)), (1,))
+
+        y = dezero.vmap(f)(x)
+        expected = np.stack([f(Variable(xi)).data for xi in x])
+        self.assertTrue(np.allclose(y.data, expected))
+
+    def test_in_axes_none(self):
+        c = np.ones((2, 1))
+        y = dezero.vmap(lambda a, c: a * c, in_axes=(0, None))(np.arange(3.0), c)
+        self.assertEqual(y.shape, (3, 2, 1))
+        with self.assertRaises(ValueError):
+            dezero.vmap(lambda a: a, in_axes=1)(np.ones((2, 3)))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)